@@ -3,8 +3,10 @@ from greetor import greetor_agent
 from cropprice_agent import price_agent
 from crop_doctor import crop_doctor
 from farmer_mood import farmer_agent
+from telemetry import instrument_agents
+from .router import IntentRouterAgent, register_router_metrics
 
-root_agent = LlmAgent(
+coordinator_agent = LlmAgent(
     name="farming_coordinator",
     description="A coordinator agent for farming tasks",
     instruction="You are farming Assisntant. Delegate the greetings to greetor_agent, Delegate the crop price related queries to price_agent, Delegate the crop disease related queries to crop_doctor, Delegate mental health queries related to farmer_mood",
@@ -12,3 +14,20 @@ root_agent = LlmAgent(
     sub_agents=[greetor_agent, price_agent, crop_doctor, farmer_agent]
 )
 
+# Rule-based pre-routing: confident matches skip the coordinator's LLM delegation call
+root_agent = IntentRouterAgent(
+    name="farming_router",
+    coordinator=coordinator_agent,
+    routes={
+        "greeting": greetor_agent,
+        "mood": farmer_agent,
+        "price": price_agent,
+        "crop_image": crop_doctor,
+    },
+)
+
+# Model and tool latency/token histograms for the coordinator and every sub-agent, served at /metrics
+instrument_agents(root_agent)
+
+# Rule hit rate and the delegation latency it saves, also served at /metrics
+register_router_metrics(root_agent.stats)
@@ -0,0 +1,217 @@
+import threading
+import time
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai import types
+from reply_pool.lexicon import FILLERS, MOODS, is_greeting, tokenize
+from telemetry import REGISTRY, get_logger
+
+log = get_logger(__name__)
+
+
+PRICE_WORDS = {
+    "price", "prices", "rate", "rates", "mandi", "msp", "bhav", "bhaav", "daam", "dam", "kimat", "keemat",
+    "bele", "dhara", "भाव", "दाम", "कीमत", "मंडी", "रेट", "ಬೆಲೆ", "ದರ", "ಮಂಡಿ",
+}
+
+# Any of these makes a price question ambiguous (e.g. the price of a pesticide for a disease)
+DISEASE_WORDS = {
+    "disease", "diseased", "blight", "rust", "pest", "pests", "fungus", "insect", "keeda", "rog", "spray",
+    "pesticide", "रोग", "कीड़ा", "बीमारी", "ರೋಗ", "ಕೀಟ",
+}
+
+# Rule hits are timed through classify(); coordinator routes until its transfer_to_agent call
+DELEGATION_LATENCY = REGISTRY.histogram(
+    "agent_delegation_duration_seconds", "Time to pick the agent that handles a request, by route and target."
+)
+
+
+def classify(content: Optional[types.Content]):
+    """
+    Classify a user message with keyword rules.
+
+    Args:
+        content: The user's message.
+
+    Returns:
+        The intent ("greeting", "mood", "price" or "crop_image"), or None if the rules are not confident.
+    """
+    if content is None or not content.parts:
+        return None
+
+    has_image = any(
+        part.inline_data is not None and (part.inline_data.mime_type or "").startswith("image/")
+        for part in content.parts
+    )
+    text = " ".join(part.text for part in content.parts if part.text)
+    tokens = [token for token in tokenize(text) if token not in FILLERS]
+    phrase = " ".join(tokens)
+    words = set(tokens)
+
+    has_price = bool(words & PRICE_WORDS)
+    has_disease = bool(words & DISEASE_WORDS)
+
+    if has_image:
+        return "crop_image" if not has_price else None
+    if phrase in MOODS:
+        return "mood"
+    if is_greeting(text):
+        return "greeting"
+    if has_price and not has_disease:
+        return "price"
+    return None
+
+
+class RouterStats:
+    """Counts rule hits and estimates the LLM delegation latency they saved."""
+
+    # Weight of the newest sample in the moving average of the delegation hop
+    EMA_ALPHA = 0.2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hits = {}
+        self.fallbacks = 0
+        self.delegation_hop_sec = None
+
+    def record_hit(self, intent: str):
+        with self._lock:
+            self.requests += 1
+            self.hits[intent] = self.hits.get(intent, 0) + 1
+
+    def record_fallback(self, hop_sec: Optional[float]):
+        with self._lock:
+            self.requests += 1
+            self.fallbacks += 1
+            if hop_sec is not None:
+                if self.delegation_hop_sec is None:
+                    self.delegation_hop_sec = hop_sec
+                else:
+                    self.delegation_hop_sec += self.EMA_ALPHA * (hop_sec - self.delegation_hop_sec)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hit_count = sum(self.hits.values())
+            return {
+                "requests": self.requests,
+                "hits": dict(self.hits),
+                "routes": {**self.hits, "coordinator": self.fallbacks},
+                "hit_rate": hit_count / self.requests if self.requests else 0.0,
+                # Each hit skips one coordinator call; the measured hop is what that call costs on average
+                "latency_saved_per_hit_sec": self.delegation_hop_sec,
+                "latency_saved_per_request_sec": (
+                    self.delegation_hop_sec * hit_count / self.requests
+                    if self.requests and self.delegation_hop_sec is not None else None
+                ),
+            }
+
+
+def register_router_metrics(stats: RouterStats):
+    """Serve the hit rate and estimated latency savings of a router on /metrics."""
+    REGISTRY.gauge(
+        "agent_router_requests", "Requests seen by the intent router, by route.",
+        lambda: {(("route", route),): count for route, count in stats.snapshot()["routes"].items()},
+    )
+    REGISTRY.gauge(
+        "agent_router_hit_rate", "Share of requests routed without the coordinator's LLM call.",
+        lambda: stats.snapshot()["hit_rate"],
+    )
+    REGISTRY.gauge(
+        "agent_router_delegation_hop_seconds", "Moving average of the coordinator's delegation call in seconds.",
+        lambda: stats.snapshot()["latency_saved_per_hit_sec"],
+    )
+    REGISTRY.gauge(
+        "agent_router_latency_saved_per_request_seconds", "Estimated delegation latency saved per request in seconds.",
+        lambda: stats.snapshot()["latency_saved_per_request_sec"],
+    )
+
+
+def _can_return_to(agent: BaseAgent, ancestor: BaseAgent) -> bool:
+    """Whether `agent` may transfer back up to `ancestor`, the check ADK applies before resuming an agent."""
+    while agent is not None and agent is not ancestor:
+        if getattr(agent, "disallow_transfer_to_parent", True):
+            return False
+        agent = agent.parent_agent
+    return agent is ancestor
+
+
+class IntentRouterAgent(BaseAgent):
+    """
+    Sends confidently classified messages straight to a sub-agent of the coordinator.
+
+    `routes` maps the intents returned by classify() to the agent that handles
+    them. Other messages go to the sub-agent that replied last, as ADK would
+    do under an LLM root: the router is not an LlmAgent, so the runner always
+    starts at the router and would otherwise send every follow-up back
+    through the coordinator. Everything else goes to the LLM coordinator.
+    """
+
+    coordinator: LlmAgent
+    routes: dict
+    stats: RouterStats
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name: str, coordinator: LlmAgent, routes: dict):
+        super().__init__(
+            name=name,
+            description=coordinator.description,
+            coordinator=coordinator,
+            routes=routes,
+            stats=RouterStats(),
+            sub_agents=[coordinator],
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        started = time.perf_counter()
+        intent = classify(ctx.user_content)
+        target = self.routes.get(intent)
+
+        if target is not None:
+            DELEGATION_LATENCY.observe(time.perf_counter() - started, route="rule", target=target.name)
+            self.stats.record_hit(intent)
+            log.info(
+                "router.rule_hit", intent=intent, target=target.name,
+                saved_hop_sec=round(self.stats.delegation_hop_sec or 0, 2),
+            )
+            async for event in target.run_async(ctx):
+                yield event
+            return
+
+        active = self._active_sub_agent(ctx)
+        if active is not None:
+            DELEGATION_LATENCY.observe(time.perf_counter() - started, route="follow_up", target=active.name)
+            self.stats.record_hit("follow_up")
+            async for event in active.run_async(ctx):
+                yield event
+            return
+
+        started = time.perf_counter()
+        hop_sec = None
+        async for event in self.coordinator.run_async(ctx):
+            if hop_sec is None and event.author == self.coordinator.name:
+                for call in event.get_function_calls():
+                    if call.name == "transfer_to_agent":
+                        hop_sec = time.perf_counter() - started
+                        DELEGATION_LATENCY.observe(
+                            hop_sec, route="coordinator", target=(call.args or {}).get("agent_name", "unknown")
+                        )
+                        break
+            yield event
+        self.stats.record_fallback(hop_sec)
+
+    def _active_sub_agent(self, ctx: InvocationContext) -> Optional[BaseAgent]:
+        """The coordinator's sub-agent that replied last, if it is allowed to keep the conversation."""
+        for event in reversed(ctx.session.events):
+            if event.author == "user" or event.actions.agent_state is not None or event.actions.end_of_agent:
+                continue
+            if event.author in (self.name, self.coordinator.name):
+                return None
+            agent = self.coordinator.find_sub_agent(event.author)
+            if agent is not None:
+                return agent if _can_return_to(agent, self.coordinator) else None
+        return None
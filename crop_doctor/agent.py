@@ -1,4 +1,6 @@
 from google.adk.agents import LlmAgent
+from image_pipeline.callbacks import shrink_request_images
+from .image_cache import cached_diagnosis
 from .tools import store_crop_analysis
 
 crop_doctor = LlmAgent(
@@ -16,5 +18,9 @@ crop_doctor = LlmAgent(
         "3. Call store_crop_analysis with the exact text. "
         "4. IMMEDIATELY exit the conversation afterwards."
     ),
-    tools=[store_crop_analysis]
+    tools=[store_crop_analysis],
+    # Near-duplicate photos are answered from previously stored analyses
+    before_agent_callback=cached_diagnosis,
+    # Oriented, downsized JPEG instead of the full-resolution upload
+    before_model_callback=shrink_request_images
 )
\ No newline at end of file
@@ -0,0 +1,251 @@
+import asyncio
+import io
+import os
+import threading
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+from PIL import Image
+
+from telemetry import REGISTRY, get_logger
+
+log = get_logger(__name__)
+
+
+# Max Hamming distance (out of 64 bits) for two images to count as the same photo
+DEFAULT_MAX_DISTANCE = 6
+# Documents indexed per lock acquisition while loading, so add() is not held up for the whole stream
+LOAD_BATCH_SIZE = 500
+# Session state key carrying the hash of the uploaded image from the callback to store_crop_analysis
+IMAGE_HASH_STATE_KEY = "temp:crop_image_hash"
+
+
+def dhash(image_bytes: bytes) -> int:
+    """
+    Compute the 64-bit difference hash of an image.
+
+    The image is reduced to 9x8 grayscale and each bit records whether a
+    pixel is brighter than its right neighbour, so re-encodes, resizes and
+    small crops of the same photo land within a few bits of each other.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        pixels = list(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for Hamming-distance range queries."""
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key: int, value):
+        if self._root is None:
+            self._root = (key, value, {})
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = hamming(key, node[0])
+            if distance == 0:
+                return  # Keep the first analysis stored for a hash
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (key, value, {})
+                self._size += 1
+                return
+            node = child
+
+    def nearest(self, key: int, max_distance: int):
+        """
+        Return (distance, value) of the closest key within max_distance, or None.
+        """
+        if self._root is None:
+            return None
+        best = None
+        stack = [self._root]
+        while stack:
+            node_key, value, children = stack.pop()
+            distance = hamming(key, node_key)
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, value)
+                if distance == 0:
+                    break
+            # Triangle inequality: only subtrees within max_distance of this node's distance can match
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return best
+
+
+class DiagnosisCache:
+    """
+    Maps perceptual hashes of analysed crop photos to their stored analysis.
+
+    Built from the `crop_analysis` collection on first use (see load()) and
+    extended as new analyses are stored. `max_distance` is the similarity
+    threshold.
+    """
+
+    def __init__(self, db_factory, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self._db_factory = db_factory
+        self.max_distance = max_distance
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self):
+        """
+        Index the hashes stored in `crop_analysis`. Idempotent.
+
+        Streams the whole collection, so async callers should run it in a
+        thread (see cached_diagnosis). Lookups wait for it; add() only waits
+        for the batch being indexed.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                docs = self._db_factory().collection("crop_analysis").select(["analysis", "image_hash"]).stream()
+                batch = []
+                for doc in docs:
+                    data = doc.to_dict()
+                    if data.get("image_hash") and data.get("analysis"):
+                        batch.append((int(data["image_hash"], 16), {"doc_id": doc.id, "analysis": data["analysis"]}))
+                    if len(batch) >= LOAD_BATCH_SIZE:
+                        self._add_all(batch)
+                        batch = []
+                self._add_all(batch)
+                log.info("diagnosis_cache.loaded", images=len(self._tree))
+            except Exception as e:
+                # Start empty; the cache fills as new analyses are stored
+                log.error("diagnosis_cache.load_failed", error=str(e))
+            self._loaded = True
+
+    def _add_all(self, entries: list):
+        with self._lock:
+            for key, value in entries:
+                self._tree.add(key, value)
+
+    def lookup(self, image_hash: int):
+        """Return the stored {doc_id, analysis} for a near-duplicate image, or None."""
+        self.load()
+        with self._lock:
+            match = self._tree.nearest(image_hash, self.max_distance)
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return match[1]
+
+    def add(self, image_hash: int, doc_id: str, analysis: str):
+        # No load() here: a later load skips hashes that are already indexed
+        with self._lock:
+            self._tree.add(image_hash, {"doc_id": doc_id, "analysis": analysis})
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "indexed_images": len(self._tree),
+                "max_distance": self.max_distance,
+            }
+
+
+_diagnosis_cache = None
+_diagnosis_cache_lock = threading.Lock()
+
+
+def get_diagnosis_cache() -> DiagnosisCache:
+    """Return the process-wide diagnosis cache; CROP_DOCTOR_HASH_MAX_DISTANCE sets the threshold."""
+    global _diagnosis_cache
+    if _diagnosis_cache is None:
+        with _diagnosis_cache_lock:
+            if _diagnosis_cache is None:
+                from .tools import get_db
+
+                _diagnosis_cache = DiagnosisCache(
+                    get_db, max_distance=int(os.getenv("CROP_DOCTOR_HASH_MAX_DISTANCE", DEFAULT_MAX_DISTANCE))
+                )
+                _register_metrics(_diagnosis_cache)
+    return _diagnosis_cache
+
+
+def _register_metrics(cache: DiagnosisCache):
+    def lookups():
+        stats = cache.stats()
+        return {(("result", "hit"),): stats["hits"], (("result", "miss"),): stats["misses"]}
+
+    REGISTRY.gauge("crop_diagnosis_cache_lookups", "Diagnosis cache lookups, by result.", lookups)
+    REGISTRY.gauge(
+        "crop_diagnosis_cache_hit_rate", "Share of crop photos answered from a stored analysis.",
+        lambda: cache.stats()["hit_rate"],
+    )
+    REGISTRY.gauge(
+        "crop_diagnosis_cache_images", "Crop photo hashes in the diagnosis cache.",
+        lambda: cache.stats()["indexed_images"],
+    )
+
+
+def _image_bytes(content: Optional[types.Content]) -> Optional[bytes]:
+    if content is None or not content.parts:
+        return None
+    for part in content.parts:
+        if part.inline_data is not None and (part.inline_data.mime_type or "").startswith("image/"):
+            return part.inline_data.data
+    return None
+
+
+async def cached_diagnosis(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for crop_doctor.
+
+    Returns the stored analysis of a near-duplicate photo without calling the
+    model. On a miss, leaves the image hash in state so store_crop_analysis can
+    index the new analysis under it. Decoding the photo and the first load of
+    the cache run in a worker thread, off the event loop.
+    """
+    image_bytes = _image_bytes(callback_context.user_content)
+    if image_bytes is None:
+        return None
+    try:
+        image_hash = await asyncio.to_thread(dhash, image_bytes)
+    except Exception as e:
+        log.warning("diagnosis_cache.hash_failed", error=str(e))
+        return None
+
+    cache = get_diagnosis_cache()
+    if not cache.loaded:
+        await asyncio.to_thread(cache.load)
+    match = cache.lookup(image_hash)
+    if match is not None:
+        log.info("diagnosis_cache.hit", doc_id=match["doc_id"])
+        return types.Content(role="model", parts=[types.Part(text=match["analysis"])])
+
+    callback_context.state[IMAGE_HASH_STATE_KEY] = f"{image_hash:016x}"
+    return None
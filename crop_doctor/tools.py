@@ -1,31 +1,49 @@
 import hashlib
 from typing import Dict
 from google.cloud import firestore
+from google.adk.tools.tool_context import ToolContext
 from dotenv import load_dotenv
+from .image_cache import IMAGE_HASH_STATE_KEY, get_diagnosis_cache
+from .writer import get_crop_analysis_writer
 
 load_dotenv()
 
-db = firestore.Client()
+# Created on first use: gRPC clients must not be created before the server forks its workers
+_db = None
+
+
+def get_db() -> firestore.Client:
+    global _db
+    if _db is None:
+        _db = firestore.Client()
+    return _db
+
 
 class _Done(Exception):
     """Signals the ADK runtime that the turn is complete."""
     pass
 
-def store_crop_analysis(analysis_text: str) -> Dict[str, str]:
+def store_crop_analysis(analysis_text: str, tool_context: ToolContext = None) -> Dict[str, str]:
     """
-    Persist the analysis text in Firestore only once (idempotent),
+    Queue the analysis text for Firestore, created once per doc ID (idempotent),
     then raise _Done to force an immediate exit.
+    The write happens in the background writer, off the request path.
+    The perceptual hash of the analysed image is stored alongside so
+    near-duplicate uploads can be answered from the diagnosis cache.
     """
     doc_id = hashlib.sha256(analysis_text.encode()).hexdigest()[:20]
-    ref = db.collection("crop_analysis").document(doc_id)
-
-    if not ref.get().exists:
-        ref.set(
-            {   
-                "analysis": analysis_text,
-                "timestamp": firestore.SERVER_TIMESTAMP,
-            }
-        )
+    image_hash = tool_context.state.get(IMAGE_HASH_STATE_KEY) if tool_context is not None else None
+
+    record = {
+        "analysis": analysis_text,
+        "timestamp": firestore.SERVER_TIMESTAMP,
+    }
+    if image_hash:
+        record["image_hash"] = image_hash
+    get_crop_analysis_writer().submit(doc_id, record)
+
+    if image_hash:
+        get_diagnosis_cache().add(int(image_hash, 16), doc_id, analysis_text)
 
     # Stop the turn right here
     raise _Done({"doc_id": doc_id})
\ No newline at end of file
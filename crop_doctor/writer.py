@@ -0,0 +1,206 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+from google.api_core.exceptions import AlreadyExists
+from google.rpc import code_pb2
+
+from telemetry import REGISTRY, get_logger, timed
+
+log = get_logger(__name__)
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL_SEC = 1.0
+# How long a caller waits for queue space before writing inline instead
+DEFAULT_PUT_TIMEOUT_SEC = 0.5
+
+
+class CropAnalysisWriter:
+    """
+    Writes crop analyses to Firestore from a background thread.
+
+    Documents are queued by submit() and committed in batches through a
+    BulkWriter with create(), so a document ID that already exists is a
+    no-op instead of a get-then-set round trip. The queue is bounded: when
+    it stays full for `put_timeout_sec`, the caller writes its document
+    inline, which slows producers down to the rate Firestore accepts.
+    Pending writes are flushed on close() and at interpreter exit.
+
+    Args:
+        db_factory: Returns the Firestore client.
+        collection: Collection the documents are written to.
+        queue_size: Max documents waiting to be written.
+        batch_size: Max documents per BulkWriter flush.
+        flush_interval_sec: Max time a document waits for its batch to fill.
+        put_timeout_sec: Max time submit() blocks on a full queue.
+    """
+
+    def __init__(
+        self,
+        db_factory,
+        collection: str = "crop_analysis",
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval_sec: float = DEFAULT_FLUSH_INTERVAL_SEC,
+        put_timeout_sec: float = DEFAULT_PUT_TIMEOUT_SEC,
+    ):
+        self._db_factory = db_factory
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.put_timeout_sec = put_timeout_sec
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        self.stats = {"queued": 0, "written": 0, "duplicates": 0, "failed": 0, "inline_writes": 0, "batches": 0}
+        # Threads do not survive fork: forked workers start their own writer on first submit
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def submit(self, doc_id: str, record: dict):
+        """Queue a document for creation; writes it inline if the queue stays full."""
+        if self._closed:
+            self._write_inline(doc_id, record)
+            return
+        self._ensure_started()
+        try:
+            self._queue.put((doc_id, record), timeout=self.put_timeout_sec)
+            self._count("queued")
+        except queue.Full:
+            self._write_inline(doc_id, record)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting queued writes and flush everything still pending."""
+        self._closed = True
+        thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="crop-analysis-writer", daemon=True)
+                    self._thread.start()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._thread = None
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            pending = {first[0]: first[1]}
+            deadline = time.monotonic() + self.flush_interval_sec
+            while len(pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                # The same analysis text maps to the same doc ID; keep the first record queued for it
+                pending.setdefault(item[0], item[1])
+            self._flush(pending)
+
+        # Drain whatever was queued behind the stop marker
+        pending = {}
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                pending.setdefault(item[0], item[1])
+        if pending:
+            self._flush(pending)
+
+    def _flush(self, pending: dict):
+        duplicates = 0
+
+        def on_error(failure, _bulk_writer) -> bool:
+            nonlocal duplicates
+            if failure.code == code_pb2.ALREADY_EXISTS:
+                duplicates += 1
+                return False
+            # Let BulkWriter retry transient errors with its own backoff
+            return failure.attempts < 5
+
+        try:
+            with timed("firestore_write", store="crop_analysis", mode="batch"):
+                db = self._db_factory()
+                bulk_writer = db.bulk_writer()
+                bulk_writer.on_write_error(on_error)
+                collection = db.collection(self.collection)
+                for doc_id, record in pending.items():
+                    bulk_writer.create(collection.document(doc_id), record)
+                bulk_writer.close()
+            self._count("batches")
+            self._count("duplicates", duplicates)
+            self._count("written", len(pending) - duplicates)
+        except Exception as e:
+            self._count("failed", len(pending))
+            log.exception("crop_analysis.batch_write_failed", records=len(pending), error=str(e))
+
+    def _write_inline(self, doc_id: str, record: dict):
+        self._count("inline_writes")
+        try:
+            with timed("firestore_write", store="crop_analysis", mode="inline"):
+                try:
+                    self._db_factory().collection(self.collection).document(doc_id).create(record)
+                except AlreadyExists:
+                    # A duplicate is a completed write, not a failed one
+                    self._count("duplicates")
+                    return
+            self._count("written")
+        except Exception as e:
+            self._count("failed")
+            log.exception("crop_analysis.write_failed", doc_id=doc_id, error=str(e))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_crop_analysis_writer() -> CropAnalysisWriter:
+    """
+    Return the process-wide crop analysis writer.
+
+    CROP_WRITER_QUEUE_SIZE, CROP_WRITER_BATCH_SIZE, CROP_WRITER_FLUSH_SEC and
+    CROP_WRITER_PUT_TIMEOUT_SEC tune it.
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from .tools import get_db
+
+                _writer = CropAnalysisWriter(
+                    get_db,
+                    queue_size=int(os.getenv("CROP_WRITER_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)),
+                    batch_size=int(os.getenv("CROP_WRITER_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+                    flush_interval_sec=float(os.getenv("CROP_WRITER_FLUSH_SEC", DEFAULT_FLUSH_INTERVAL_SEC)),
+                    put_timeout_sec=float(os.getenv("CROP_WRITER_PUT_TIMEOUT_SEC", DEFAULT_PUT_TIMEOUT_SEC)),
+                )
+                atexit.register(_writer.close)
+                REGISTRY.gauge("crop_writer_queue_depth", "Crop analyses waiting to be written.", _writer.depth)
+    return _writer
@@ -1,6 +1,6 @@
 from google.adk.agents import LlmAgent
 from .prompts import return_price_instructions
-from .tools import call_price_api_data
+from .tools import call_price_api_data_async
 
 
 cropprice_agent = LlmAgent(
@@ -8,5 +8,5 @@ cropprice_agent = LlmAgent(
     description="Crop_price_agent",
     instruction=return_price_instructions(),
     model="gemini-2.5-pro",
-    tools = [call_price_api_data]
+    tools = [call_price_api_data_async]
 )
\ No newline at end of file
@@ -0,0 +1,171 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Status codes worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and requests are short-circuited."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing.
+
+    After `failure_threshold` consecutive failures the breaker opens and every
+    call is rejected for `reset_timeout_sec`. After that a single trial call is
+    let through (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_sec: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout_sec:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout_sec or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class PooledHttpClient:
+    """
+    Shared HTTP client with a connection pool, timeouts, jittered retries and a circuit breaker.
+
+    Args:
+        connect_timeout: Seconds to wait for a TCP connection.
+        read_timeout: Seconds to wait between bytes of the response.
+        max_retries: Retries after the first attempt for connection errors,
+            timeouts and RETRY_STATUSES responses.
+        backoff_base: Base delay of the exponential backoff, in seconds.
+        backoff_max: Upper bound of a single backoff delay, in seconds.
+        pool_size: Connections kept alive per host.
+        breaker: CircuitBreaker guarding the upstream.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        pool_size: int = 10,
+        breaker: CircuitBreaker = None,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        # Retries are handled below so they can share the breaker and jitter
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spread retries from many workers over the whole window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get_json(self, url: str, params: dict = None):
+        """
+        Send a GET request and decode the JSON body.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+            requests.exceptions.RequestException: If the request still fails after all retries.
+            ValueError: If the body is not valid JSON.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {url}, skipping request")
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    response.close()
+                    time.sleep(self._backoff(attempt))
+                    continue
+                response.raise_for_status()
+                payload = response.json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt < self.max_retries:
+                    time.sleep(self._backoff(attempt))
+                    continue
+                self.breaker.record_failure()
+                raise
+            except requests.exceptions.HTTPError as http_err:
+                # Client errors are our fault, not the upstream's
+                if http_err.response is not None and http_err.response.status_code < 500 \
+                        and http_err.response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            return payload
+
+
+_price_api_client = None
+_price_api_client_lock = threading.Lock()
+
+
+def get_price_api_client() -> PooledHttpClient:
+    """
+    Return the process-wide client for the data.gov.in price API.
+
+    DATA_GOV_CONNECT_TIMEOUT, DATA_GOV_READ_TIMEOUT and DATA_GOV_MAX_RETRIES
+    override the defaults.
+    """
+    global _price_api_client
+    if _price_api_client is None:
+        with _price_api_client_lock:
+            if _price_api_client is None:
+                _price_api_client = PooledHttpClient(
+                    connect_timeout=float(os.getenv("DATA_GOV_CONNECT_TIMEOUT", 3.05)),
+                    read_timeout=float(os.getenv("DATA_GOV_READ_TIMEOUT", 10.0)),
+                    max_retries=int(os.getenv("DATA_GOV_MAX_RETRIES", 3)),
+                )
+    return _price_api_client
@@ -0,0 +1,363 @@
+import os
+import tempfile
+import threading
+import time
+
+from google.api_core.exceptions import NotFound
+from google.cloud import storage
+
+from telemetry import get_logger, timed
+
+from .price_deltas import DEFAULT_COMPACT_ROWS, DEFAULT_DELTA_PREFIX, DeltaIngestor, GCSDeltaSource, LocalDeltaSource
+from .price_snapshot import is_snapshot, read_snapshot, snapshot_path_for, snapshots_supported
+from .price_table import LayeredSnapshot, PriceSnapshot, read_price_table
+
+log = get_logger(__name__)
+
+
+DEFAULT_BUCKET = "crop_price"
+DEFAULT_FILE = "crop_price.csv"
+DEFAULT_TTL_SEC = 300.0
+# Downloaded snapshots are kept here, named by generation, so workers on one host map the same file
+SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), "crop_price_snapshots")
+
+
+class GCSPriceSource:
+    """Crop price file stored as a blob in a Google Cloud Storage bucket."""
+
+    def __init__(self, bucket_name: str = DEFAULT_BUCKET, file_name: str = DEFAULT_FILE):
+        self.bucket_name = bucket_name
+        self.file_name = file_name
+        self._client = None
+        # Pooled connections must not be shared with forked workers
+        os.register_at_fork(after_in_child=self._reset_client)
+
+    def _reset_client(self):
+        self._client = None
+
+    def _blob(self):
+        # One client per source, reused across refreshes
+        if self._client is None:
+            self._client = storage.Client()
+        return self._client.bucket(self.bucket_name).blob(self.file_name)
+
+    def version(self):
+        """Return the blob generation and ETag, or None if the blob does not exist."""
+        blob = self._blob()
+        try:
+            blob.reload()
+        except NotFound:
+            return None
+        return f"{blob.generation}:{blob.etag}"
+
+    def load(self):
+        """
+        Download and parse the blob.
+
+        Snapshots are downloaded to SNAPSHOT_DIR once per generation and
+        memory-mapped; CSV/Excel files are parsed from memory.
+
+        Returns:
+            A (version, DataFrame) tuple, or (None, None) if the blob does not exist.
+        """
+        blob = self._blob()
+        try:
+            blob.reload()
+            version = f"{blob.generation}:{blob.etag}"
+            # Pin the download to the generation we just saw so version and content match
+            if is_snapshot(self.file_name):
+                with timed("gcs_download", source="gcs"):
+                    path = self._download_snapshot(blob)
+                with timed("price_table_parse", format="snapshot"):
+                    return version, read_snapshot(path)
+            with timed("gcs_download", source="gcs"):
+                file_content = blob.download_as_bytes(if_generation_match=blob.generation)
+        except NotFound:
+            return None, None
+        with timed("price_table_parse", format=self.file_name.lower().rsplit(".", 1)[-1]):
+            return version, read_price_table(file_content, self.file_name)
+
+    def _download_snapshot(self, blob) -> str:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = os.path.join(SNAPSHOT_DIR, f"{self.bucket_name}-{blob.generation}-{self.file_name}")
+        if not os.path.exists(path):
+            fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".tmp")
+            os.close(fd)
+            try:
+                blob.download_to_filename(tmp_path, if_generation_match=blob.generation)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return path
+
+
+class LocalFilePriceSource:
+    """Crop price file on the local disk, mainly for offline runs and tests."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file_name = os.path.basename(path)
+
+    def version(self):
+        """Return the file mtime and size, or None if the file does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def load(self):
+        """
+        Read and parse the file, memory-mapping it if it is a snapshot.
+
+        Returns:
+            A (version, DataFrame) tuple, or (None, None) if the file does not exist.
+        """
+        version = self.version()
+        if version is None:
+            return None, None
+        if is_snapshot(self.file_name):
+            with timed("price_table_parse", format="snapshot"):
+                return version, read_snapshot(self.path)
+        with open(self.path, "rb") as price_file:
+            file_content = price_file.read()
+        with timed("price_table_parse", format=self.file_name.lower().rsplit(".", 1)[-1]):
+            return version, read_price_table(file_content, self.file_name)
+
+
+class FallbackPriceSource:
+    """
+    Serves the columnar snapshot when it exists and falls back to the CSV/Excel file otherwise.
+    """
+
+    def __init__(self, snapshot, fallback):
+        self.snapshot = snapshot
+        self.fallback = fallback
+        self.file_name = fallback.file_name
+
+    def version(self):
+        """Return the version of whichever source would be loaded, or None if neither exists."""
+        if snapshots_supported():
+            version = self.snapshot.version()
+            if version is not None:
+                return f"{self.snapshot.file_name}@{version}"
+        version = self.fallback.version()
+        return f"{self.fallback.file_name}@{version}" if version is not None else None
+
+    def load(self):
+        """
+        Load the snapshot, or the fallback file if the snapshot is missing or unreadable.
+
+        Returns:
+            A (version, DataFrame) tuple, or (None, None) if neither exists.
+        """
+        if snapshots_supported():
+            try:
+                version, frame = self.snapshot.load()
+                if version is not None:
+                    return f"{self.snapshot.file_name}@{version}", frame
+            except Exception as e:
+                log.warning("price_table.snapshot_failed", file=self.snapshot.file_name, error=str(e))
+        version, frame = self.fallback.load()
+        return (f"{self.fallback.file_name}@{version}", frame) if version is not None else (None, None)
+
+
+class PriceTableCache:
+    """
+    Keeps the parsed crop price table in memory and serves every call from that snapshot.
+
+    The first call loads the table synchronously. After that a daemon thread
+    revalidates the source every `ttl_sec` seconds and only downloads and
+    re-parses it when its version (GCS generation/ETag, or mtime/size for local
+    files) has changed. A refresh swaps in a new snapshot, so callers must treat
+    the returned snapshot as read-only.
+
+    With a DeltaIngestor, every refresh also picks up new daily delta files and
+    layers them over the base table, so a refresh costs time proportional to
+    the new deltas. Once the delta grows past the ingestor's `compact_rows`, a
+    background thread folds it into a new base table.
+    """
+
+    def __init__(self, source, ttl_sec: float = DEFAULT_TTL_SEC, deltas: DeltaIngestor = None):
+        self.source = source
+        self.ttl_sec = ttl_sec
+        self.deltas = deltas
+        self._lock = threading.Lock()
+        self._base = None
+        self._snapshot = None
+        self._checked_at = None
+        self._stop = threading.Event()
+        self._refresher = None
+        self._compactor = None
+        # Threads do not survive fork: forked workers keep the loaded snapshot and restart their own refresher
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def get_snapshot(self):
+        """
+        Return the cached price snapshot, loading it on first use.
+
+        Returns:
+            The cached PriceSnapshot or LayeredSnapshot, or None if the source file does not exist.
+        """
+        if self._snapshot is None and self._is_stale():
+            with self._lock:
+                if self._snapshot is None and self._is_stale():
+                    self._refresh_locked()
+        self._start_refresher()
+        return self._snapshot
+
+    def get_frame(self):
+        """Return the cached price table, or None if the source file does not exist."""
+        snapshot = self.get_snapshot()
+        return snapshot.frame if snapshot is not None else None
+
+    def refresh(self) -> bool:
+        """
+        Revalidate the source, reload the table if it changed and apply new deltas.
+
+        Returns:
+            True if a new snapshot was swapped in, False otherwise.
+        """
+        with self._lock:
+            return self._refresh_locked()
+
+    def stop(self):
+        """Stop the background refresh thread."""
+        self._stop.set()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+        self._compactor = None
+
+    def _is_stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.ttl_sec
+
+    def _refresh_locked(self) -> bool:
+        self._checked_at = time.monotonic()
+        base_changed = self._reload_base_locked()
+        if self._base is None:
+            return False
+
+        deltas_changed = False
+        if self.deltas is not None:
+            try:
+                deltas_changed = self.deltas.ingest()
+            except Exception as e:
+                # Serve the base table (and deltas applied so far) rather than nothing
+                log.exception("price_deltas.ingest_failed", error=str(e))
+        if not base_changed and not deltas_changed:
+            return False
+
+        if self.deltas is not None and self.deltas.frame is not None:
+            self._snapshot = LayeredSnapshot(self._base, self.deltas.frame)
+            if self.deltas.needs_compaction():
+                self._start_compactor()
+        else:
+            self._snapshot = self._base
+        return True
+
+    def _reload_base_locked(self) -> bool:
+        if self._base is not None and self.source.version() == self._base.version:
+            return False
+
+        version, frame = self.source.load()
+        if version is None:
+            log.warning("price_table.not_found", file=self.source.file_name)
+            return False
+
+        # Build the indexes before swapping so readers never see a half-built snapshot
+        self._base = PriceSnapshot(frame, version)
+        log.info("price_table.loaded", records=len(self._base.frame), version=version)
+        if self.deltas is not None:
+            # Re-apply every delta on top of the new base; the record key keeps this idempotent
+            self.deltas.reset()
+        return True
+
+    def _start_compactor(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact, name="price-cache-compact", daemon=True)
+        self._compactor.start()
+
+    def _compact(self):
+        """Fold the delta layer into a new base table without blocking readers or refreshes."""
+        with self._lock:
+            snapshot = self._snapshot
+        if not isinstance(snapshot, LayeredSnapshot):
+            return
+
+        try:
+            compacted = PriceSnapshot(snapshot.frame, snapshot.version)
+        except Exception as e:
+            log.exception("price_deltas.compact_failed", error=str(e))
+            return
+
+        with self._lock:
+            # A refresh that landed meanwhile wins; the next one will compact again
+            if self._snapshot is not snapshot:
+                return
+            self._base = self._snapshot = compacted
+            self.deltas.frame = None
+        log.info("price_deltas.compacted", records=len(compacted))
+
+    def _start_refresher(self):
+        if self._refresher is not None or self.ttl_sec <= 0:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="price-cache-refresh", daemon=True)
+                self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.ttl_sec):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the last good snapshot
+                log.exception("price_table.refresh_failed", error=str(e))
+
+
+_price_cache = None
+_price_cache_lock = threading.Lock()
+
+
+def get_price_cache() -> PriceTableCache:
+    """
+    Return the process-wide price table cache.
+
+    Set CROP_PRICE_LOCAL_PATH to serve a local file instead of the GCS blob
+    (CROP_PRICE_BUCKET / CROP_PRICE_FILE). In both cases an Arrow snapshot with
+    the same name (see price_snapshot.py) is preferred over the CSV/Excel file
+    when it exists. CROP_PRICE_CACHE_TTL sets the revalidation interval in seconds.
+
+    Daily delta files are read from CROP_PRICE_DELTA_PREFIX in the bucket, or
+    from CROP_PRICE_DELTA_DIR for a local file, and compacted into the base
+    table once they hold CROP_PRICE_DELTA_COMPACT_ROWS records.
+    """
+    global _price_cache
+    if _price_cache is None:
+        with _price_cache_lock:
+            if _price_cache is None:
+                local_path = os.getenv("CROP_PRICE_LOCAL_PATH")
+                delta_dir = os.getenv("CROP_PRICE_DELTA_DIR")
+                if local_path:
+                    source = LocalFilePriceSource(local_path)
+                    if not is_snapshot(local_path):
+                        source = FallbackPriceSource(LocalFilePriceSource(snapshot_path_for(local_path)), source)
+                    delta_source = LocalDeltaSource(delta_dir) if delta_dir else None
+                else:
+                    bucket_name = os.getenv("CROP_PRICE_BUCKET", DEFAULT_BUCKET)
+                    file_name = os.getenv("CROP_PRICE_FILE", DEFAULT_FILE)
+                    source = GCSPriceSource(bucket_name, file_name)
+                    if not is_snapshot(file_name):
+                        source = FallbackPriceSource(GCSPriceSource(bucket_name, snapshot_path_for(file_name)), source)
+                    delta_source = GCSDeltaSource(bucket_name, os.getenv("CROP_PRICE_DELTA_PREFIX", DEFAULT_DELTA_PREFIX))
+                deltas = None
+                if delta_source is not None:
+                    deltas = DeltaIngestor(delta_source, int(os.getenv("CROP_PRICE_DELTA_COMPACT_ROWS", DEFAULT_COMPACT_ROWS)))
+                ttl_sec = float(os.getenv("CROP_PRICE_CACHE_TTL", DEFAULT_TTL_SEC))
+                _price_cache = PriceTableCache(source, ttl_sec=ttl_sec, deltas=deltas)
+    return _price_cache
@@ -0,0 +1,113 @@
+import os
+
+import pandas as pd
+from google.cloud import storage
+
+from telemetry import get_logger
+
+from .price_table import read_price_table, record_keys
+
+log = get_logger(__name__)
+
+
+DELTA_EXTENSIONS = ('csv', 'xlsx', 'xls')
+DEFAULT_DELTA_PREFIX = "deltas/"
+DEFAULT_COMPACT_ROWS = 20000
+
+
+def _is_delta_file(name: str) -> bool:
+    return name.lower().split('.')[-1] in DELTA_EXTENSIONS
+
+
+class GCSDeltaSource:
+    """Daily delta files stored under a prefix of a Google Cloud Storage bucket."""
+
+    def __init__(self, bucket_name: str, prefix: str = DEFAULT_DELTA_PREFIX):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self._client = None
+        os.register_at_fork(after_in_child=self._reset_client)
+
+    def _reset_client(self):
+        self._client = None
+
+    def _storage_client(self):
+        if self._client is None:
+            self._client = storage.Client()
+        return self._client
+
+    def list(self) -> list:
+        """Return (name, version) of every delta file, in name order."""
+        blobs = self._storage_client().list_blobs(self.bucket_name, prefix=self.prefix)
+        return sorted((blob.name, str(blob.generation)) for blob in blobs if _is_delta_file(blob.name))
+
+    def load(self, name: str, version: str) -> pd.DataFrame:
+        blob = self._storage_client().bucket(self.bucket_name).blob(name)
+        return read_price_table(blob.download_as_bytes(if_generation_match=int(version)), name)
+
+
+class LocalDeltaSource:
+    """Daily delta files in a local directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def list(self) -> list:
+        """Return (name, version) of every delta file, in name order."""
+        if not os.path.isdir(self.directory):
+            return []
+        deltas = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and _is_delta_file(entry.name):
+                stat = entry.stat()
+                deltas.append((entry.name, f"{stat.st_mtime_ns}:{stat.st_size}"))
+        return sorted(deltas)
+
+    def load(self, name: str, version: str) -> pd.DataFrame:
+        with open(os.path.join(self.directory, name), "rb") as delta_file:
+            return read_price_table(delta_file.read(), name)
+
+
+class DeltaIngestor:
+    """
+    Accumulates daily delta files into one de-duplicated delta table.
+
+    Files are applied in name order (name them by arrival date), and a file
+    is read again only if its version changes. Within the delta table the
+    last row for a record key wins. Each ingest only reads the new files and
+    re-deduplicates the delta table, which compaction keeps small.
+    """
+
+    def __init__(self, source, compact_rows: int = DEFAULT_COMPACT_ROWS):
+        self.source = source
+        self.compact_rows = compact_rows
+        self.frame = None
+        self._applied = {}
+
+    def reset(self):
+        """Forget every applied delta, e.g. after a new base table was loaded."""
+        self.frame = None
+        self._applied = {}
+
+    def needs_compaction(self) -> bool:
+        return self.frame is not None and len(self.frame) >= self.compact_rows
+
+    def ingest(self) -> bool:
+        """
+        Read delta files that were added or changed since the last call.
+
+        Returns:
+            True if the delta table changed.
+        """
+        pending = [(name, version) for name, version in self.source.list() if self._applied.get(name) != version]
+        if not pending:
+            return False
+
+        frames = [self.source.load(name, version) for name, version in pending]
+        if self.frame is not None:
+            frames.insert(0, self.frame)
+        combined = pd.concat(frames, ignore_index=True)
+        self.frame = combined[~record_keys(combined).duplicated(keep='last')].reset_index(drop=True)
+        self._applied.update(pending)
+        log.info("price_deltas.applied", files=len(pending), pending_records=len(self.frame))
+        return True
@@ -0,0 +1,71 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+
+# CropPriceFilters fields that are matched against text columns of the price table
+INDEXED_FIELDS = ("state", "district", "market", "variety", "grade")
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+def normalize_key(value) -> str:
+    """Casefold a filter value and collapse its whitespace so lookups ignore case and spacing."""
+    return " ".join(str(value).split()).casefold()
+
+
+class PriceIndex:
+    """
+    Lookup indexes over the text filter columns of a price table.
+
+    For every indexed column this keeps a map from normalized value to the
+    sorted row positions holding it, plus the sorted list of distinct values
+    for prefix and substring lookups. Row positions are returned in table
+    order so the results of several lookups can be intersected directly.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self._positions = {}
+        self._keys = {}
+
+        for field_name in INDEXED_FIELDS:
+            if field_name not in frame.columns:
+                continue
+            column = frame[field_name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # Snapshot columns are dictionary-encoded: normalize the categories, group the codes
+                categories = pd.Series(column.cat.categories).map(lambda value: normalize_key(value) if isinstance(value, str) else None)
+                codes = column.cat.codes.to_numpy()
+                normalized = pd.Series(np.where(codes >= 0, categories.to_numpy()[codes], None))
+            elif pd.api.types.is_string_dtype(column.dtype):
+                normalized = column.map(lambda value: normalize_key(value) if isinstance(value, str) else None)
+            else:
+                continue
+            groups = normalized.groupby(normalized.to_numpy(), sort=True).indices
+            self._positions[field_name] = {key: np.asarray(rows, dtype=np.intp) for key, rows in groups.items()}
+            self._keys[field_name] = sorted(self._positions[field_name])
+
+    def has(self, field_name: str) -> bool:
+        return field_name in self._positions
+
+    def lookup(self, field_name: str, value) -> np.ndarray:
+        """
+        Return the sorted row positions whose `field_name` column matches `value`.
+
+        An exact (normalized) match wins. Otherwise all values starting with
+        `value` match, and only if there are none does it fall back to
+        substring matching over the distinct values of the column.
+        """
+        positions = self._positions[field_name]
+        key = normalize_key(value)
+        if key in positions:
+            return positions[key]
+
+        keys = self._keys[field_name]
+        matched = keys[bisect_left(keys, key):bisect_right(keys, key + "\U0010ffff")]
+        if not matched:
+            matched = [candidate for candidate in keys if key in candidate]
+        if not matched:
+            return _EMPTY
+        return np.sort(np.concatenate([positions[candidate] for candidate in matched]))
@@ -0,0 +1,221 @@
+"""
+Arrow IPC snapshots of the crop price table.
+
+The snapshot is written uncompressed with every text column dictionary-encoded,
+so loading it is a memory map plus a small dictionary decode instead of a full
+CSV parse. Price columns are stored without a validity bitmap (missing prices
+are NaN) and come back as views of the mapped file, as do the category codes
+of text columns without nulls, so worker processes on the same host share
+those pages through the OS page cache. Only the dictionaries, and the codes of
+columns that do contain nulls, are copied into each process; `bench` reports
+both the shared and the private memory of a loaded snapshot.
+
+Usage:
+    python -m cropprice_agent.price_snapshot convert crop_price.csv crop_price.arrow
+    python -m cropprice_agent.price_snapshot bench crop_price.csv crop_price.arrow
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+from .price_table import read_price_table
+
+
+SNAPSHOT_EXTENSION = "arrow"
+
+# Columns stored as numbers even if the source file has them as text
+NUMERIC_COLUMNS = ("min_price", "max_price", "modal_price")
+
+
+def is_snapshot(file_name: str) -> bool:
+    return file_name.lower().split('.')[-1] == SNAPSHOT_EXTENSION
+
+
+def snapshot_path_for(file_name: str) -> str:
+    """Return the snapshot file name that sits next to a CSV/Excel price file."""
+    return os.path.splitext(file_name)[0] + "." + SNAPSHOT_EXTENSION
+
+
+def snapshots_supported() -> bool:
+    return pa is not None
+
+
+def to_snapshot_table(df: pd.DataFrame):
+    """
+    Convert a parsed price table into a typed, dictionary-encoded Arrow table.
+
+    Args:
+        df: The crop price table as read from CSV/Excel.
+
+    Returns:
+        A pyarrow.Table ready to be written as a snapshot.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in NUMERIC_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        elif pd.api.types.is_string_dtype(df[column].dtype):
+            df[column] = df[column].astype('category')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for column in NUMERIC_COLUMNS:
+        if column in table.column_names:
+            # Keep NaN as NaN: a column without nulls can be read back without a copy
+            values = pa.array(df[column].to_numpy(dtype="float64"), from_pandas=False)
+            table = table.set_column(table.column_names.index(column), column, values)
+    return table
+
+
+def write_snapshot(df: pd.DataFrame, path: str):
+    """
+    Write a price table as an Arrow IPC snapshot.
+
+    The file is written next to `path` and renamed into place, so readers
+    never map a partially written snapshot.
+    """
+    table = to_snapshot_table(df)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _mapped_values(column):
+    """
+    Return the values of `column` as arrays viewing its Arrow buffers, or None if that needs a copy.
+
+    Table.to_pandas() copies dictionary indices and any column with a
+    validity bitmap, which would give every process a private copy of pages
+    it could share.
+    """
+    if column.num_chunks != 1 or column.null_count:
+        return None
+    array = column.chunk(0)
+    if pa.types.is_dictionary(array.type):
+        categories = pd.Index(array.dictionary.to_pandas())
+        # pandas keeps the codes as they are when their width matches what it would pick
+        return pd.Categorical.from_codes(
+            array.indices.to_numpy(zero_copy_only=True), dtype=pd.CategoricalDtype(categories), validate=False
+        )
+    if pa.types.is_floating(array.type) or pa.types.is_integer(array.type):
+        return array.to_numpy(zero_copy_only=True)
+    return None
+
+
+def read_snapshot(path: str) -> pd.DataFrame:
+    """
+    Memory-map an Arrow IPC snapshot and expose it as a DataFrame.
+
+    Dictionary-encoded columns come back as pandas categoricals, so only the
+    distinct values are turned into Python strings. Numeric columns and
+    category codes without nulls are read-only views of the mapped file.
+    """
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        values = _mapped_values(column)
+        columns[name] = column.to_pandas() if values is None else values
+    # copy=False also keeps same-typed columns out of a freshly allocated 2D block
+    return pd.DataFrame(columns, copy=False)
+
+
+def convert(source_path: str, snapshot_path: str) -> int:
+    """
+    Convert a CSV/XLSX crop price file into a snapshot.
+
+    Returns:
+        The number of records written.
+    """
+    with open(source_path, "rb") as source_file:
+        df = read_price_table(source_file.read(), os.path.basename(source_path))
+    write_snapshot(df, snapshot_path)
+    return len(df)
+
+
+# Each loader runs in a fresh interpreter so its peak RSS is not polluted by the other.
+# "private_mb" is anonymous memory (never shared between workers); the rest of the
+# RSS growth of a snapshot load is mapped file pages that other workers share.
+_BENCH_SCRIPT = """
+import io, json, os, resource, sys, time
+import pandas as pd
+from cropprice_agent.price_snapshot import read_snapshot
+
+def private_kb():
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        return 0
+    with open("/proc/self/smaps_rollup") as rollup:
+        return sum(int(line.split()[1]) for line in rollup if line.startswith("Anonymous:"))
+
+mode, path = sys.argv[1], sys.argv[2]
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+private_baseline = private_kb()
+start = time.perf_counter()
+if mode == "csv":
+    with open(path, "rb") as f:
+        df = pd.read_csv(io.BytesIO(f.read()))
+else:
+    df = read_snapshot(path)
+elapsed = time.perf_counter() - start
+# Fault in every column the way lookups and summaries would
+for name in df.columns:
+    column = df[name]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column.array.codes.sum()
+    elif column.dtype.kind in "if":
+        column.to_numpy().sum()
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "rows": len(df), "load_ms": elapsed * 1000,
+    "rss_mb": (peak - baseline) / 1024, "private_mb": (private_kb() - private_baseline) / 1024,
+}))
+"""
+
+
+def bench(csv_path: str, snapshot_path: str, repeat: int = 5):
+    """Compare load time, RSS growth and private (unshared) memory of the CSV path and the snapshot."""
+    if not os.path.exists(snapshot_path):
+        convert(csv_path, snapshot_path)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for mode, path in (("csv", csv_path), ("snapshot", snapshot_path)):
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", _BENCH_SCRIPT, mode, path],
+                cwd=repo_root, check=True, capture_output=True, text=True,
+            ).stdout
+            runs.append(json.loads(output))
+        load_ms = sorted(run["load_ms"] for run in runs)[len(runs) // 2]
+        rss_mb = sorted(run["rss_mb"] for run in runs)[len(runs) // 2]
+        private_mb = sorted(run["private_mb"] for run in runs)[len(runs) // 2]
+        print(f"{mode:>8}: {runs[0]['rows']} rows, median load {load_ms:.1f} ms, "
+              f"RSS growth {rss_mb:.1f} MB, private {private_mb:.1f} MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("convert", "bench"):
+        print(__doc__)
+        sys.exit(1)
+    if not snapshots_supported():
+        print("pyarrow is required for price snapshots")
+        sys.exit(1)
+    if sys.argv[1] == "convert":
+        count = convert(sys.argv[2], sys.argv[3])
+        print(f"Wrote {count} records to {sys.argv[3]}")
+    else:
+        bench(sys.argv[2], sys.argv[3])
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+
+# Columns kept in budgeted tool output, in this order
+COMPACT_COLUMNS = (
+    "state", "district", "market", "commodity", "variety", "grade",
+    "arrival_date", "min_price", "max_price", "modal_price",
+)
+GROUP_FIELDS = ("variety", "market")
+PRICE_FIELDS = ("min_price", "max_price", "modal_price")
+
+
+class PriceSummary:
+    """
+    Per variety/market price aggregates for a price table.
+
+    Group ids and numeric price arrays are computed once when the table
+    loads, so summarizing a filtered subset is a groupby over a few numeric
+    columns of the matched rows. The summary of the whole table is
+    precomputed as well.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.compact_columns = [column for column in COMPACT_COLUMNS if column in frame.columns]
+        group_fields = [field for field in GROUP_FIELDS if field in frame.columns]
+
+        if group_fields:
+            grouped = frame.groupby(group_fields, sort=False, dropna=False, observed=True)
+            self._codes = grouped.ngroup().to_numpy()
+            self._first_rows = np.unique(self._codes, return_index=True)[1]
+            self._labels = frame[group_fields].iloc[self._first_rows].reset_index(drop=True)
+        else:
+            self._codes = None
+            self._labels = None
+        # Built on first use: only a LayeredSummary needs the rows of single groups
+        self._group_order = None
+        self._group_bounds = None
+
+        self._prices = pd.DataFrame({
+            field: pd.to_numeric(frame[field], errors='coerce').to_numpy()
+            for field in PRICE_FIELDS if field in frame.columns
+        })
+        self._by_code = _aggregate_by_code(self._prices, self._codes) if self._codes is not None else None
+        self._all = _rank(self._by_code, self._labels) if self._by_code is not None else None
+
+    def summarize(self, positions=None, max_groups: int = 20) -> list:
+        """
+        Aggregate min/max/modal price and record count per variety and market.
+
+        Args:
+            positions: Row positions to summarize, or None for the whole table.
+            max_groups: Maximum number of groups returned, largest first.
+
+        Returns:
+            A list of dictionaries, one per group.
+        """
+        aggregates = self._all if positions is None else self._aggregate(positions)
+        if aggregates is None:
+            return []
+        return aggregates.head(max_groups).to_dict('records')
+
+    def group_rows(self, codes) -> np.ndarray:
+        """Return the sorted row positions of every row in the groups `codes`."""
+        if self._group_order is None:
+            order = np.argsort(self._codes, kind="stable")
+            self._group_bounds = np.searchsorted(self._codes[order], np.arange(len(self._labels) + 1))
+            self._group_order = order
+        parts = [self._group_order[self._group_bounds[code]:self._group_bounds[code + 1]] for code in codes]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+
+    def _aggregate(self, positions):
+        if self._codes is None:
+            return None
+        codes = self._codes if positions is None else self._codes[positions]
+        prices = self._prices if positions is None else self._prices.iloc[positions]
+        return _rank(_aggregate_by_code(prices, codes), self._labels)
+
+
+class LayeredSummary:
+    """
+    Aggregates of a base PriceSummary with a delta table layered on top.
+
+    Groups the delta touches (those with delta rows or superseded base rows)
+    are recomputed from their rows; every other group keeps the base
+    aggregates. Summarizing the whole layered table therefore costs time
+    proportional to the delta and the groups it touches, and groups rank as
+    they would in the compacted table.
+
+    Args:
+        base: Summary of the base table.
+        delta: Summary of the delta table, aligned to the base columns.
+        superseded: Base row positions replaced by delta rows.
+    """
+
+    def __init__(self, base: PriceSummary, delta: PriceSummary, superseded: np.ndarray):
+        self.base = base
+        self.delta = delta
+        self.compact_columns = base.compact_columns
+        self._n_base = len(base._codes) if base._codes is not None else 0
+        self._all = None
+        if base._codes is None:
+            return
+
+        # Delta groups reuse the base id of the same variety/market and are numbered after the base groups otherwise
+        base_groups = len(base._labels)
+        labels = pd.concat([base._labels, delta._labels], ignore_index=True)
+        ids = labels.groupby(list(labels.columns), sort=False, dropna=False, observed=True).ngroup().to_numpy()
+        self._labels = labels.iloc[np.unique(ids, return_index=True)[1]].reset_index(drop=True)
+        self._delta_codes = ids[base_groups:][delta._codes]
+
+        touched = np.union1d(base._codes[superseded], self._delta_codes)
+        touched_base = touched[touched < base_groups]
+        live_rows = base.group_rows(touched_base)
+        live_rows = live_rows[~np.isin(live_rows, superseded)]
+
+        # Position of each group's first row in the compacted table (live base rows, then delta rows)
+        self._first_seen = np.full(len(self._labels), np.iinfo(np.int64).max, dtype=np.int64)
+        self._first_seen[:base_groups] = base._first_rows
+        self._first_seen[touched_base] = np.iinfo(np.int64).max
+        np.minimum.at(self._first_seen, base._codes[live_rows], live_rows)
+        np.minimum.at(self._first_seen, self._delta_codes, self._n_base + np.arange(len(self._delta_codes)))
+
+        recomputed = _aggregate_by_code(
+            pd.concat([base._prices.iloc[live_rows], delta._prices], ignore_index=True),
+            np.concatenate([base._codes[live_rows], self._delta_codes]),
+        )
+        self._all = _rank(pd.concat([base._by_code.drop(index=touched_base), recomputed]), self._labels, self._first_seen)
+
+    def summarize(self, positions=None, max_groups: int = 20) -> list:
+        """
+        Aggregate min/max/modal price and record count per variety and market.
+
+        Args:
+            positions: Sorted layered row positions (base rows, then delta rows offset by
+                the base length), or None for every live row.
+            max_groups: Maximum number of groups returned, largest first.
+
+        Returns:
+            A list of dictionaries, one per group.
+        """
+        if self._all is None:
+            return []
+        if positions is None:
+            aggregates = self._all
+        else:
+            split = np.searchsorted(positions, self._n_base)
+            base_positions, delta_positions = positions[:split], positions[split:] - self._n_base
+            prices = pd.concat(
+                [self.base._prices.iloc[base_positions], self.delta._prices.iloc[delta_positions]], ignore_index=True
+            )
+            codes = np.concatenate([self.base._codes[base_positions], self._delta_codes[delta_positions]])
+            aggregates = _rank(_aggregate_by_code(prices, codes), self._labels, self._first_seen)
+        return aggregates.head(max_groups).to_dict('records')
+
+
+def _aggregate_by_code(prices: pd.DataFrame, codes: np.ndarray) -> pd.DataFrame:
+    """Record count and min/max/median price per group code, indexed by code."""
+    grouped = prices.groupby(codes)
+    aggregates = pd.DataFrame({"count": grouped.size()})
+    if "min_price" in prices.columns:
+        aggregates["min_price"] = grouped["min_price"].min()
+    if "max_price" in prices.columns:
+        aggregates["max_price"] = grouped["max_price"].max()
+    if "modal_price" in prices.columns:
+        aggregates["modal_price"] = grouped["modal_price"].median().round(2)
+    return aggregates
+
+
+def _rank(aggregates: pd.DataFrame, labels: pd.DataFrame, first_seen: np.ndarray = None) -> pd.DataFrame:
+    """Largest groups first, ties in table order, with the group labels in front."""
+    codes = aggregates.index.to_numpy()
+    tie_order = codes if first_seen is None else first_seen[codes]
+    aggregates = aggregates.iloc[np.lexsort((tie_order, -aggregates["count"].to_numpy()))]
+    labels = labels.iloc[aggregates.index.to_numpy()].reset_index(drop=True)
+    return pd.concat([labels, aggregates.reset_index(drop=True)], axis=1)
@@ -0,0 +1,187 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from telemetry import get_logger
+
+from .price_index import PriceIndex, normalize_key
+from .price_summary import LayeredSummary, PriceSummary
+
+log = get_logger(__name__)
+
+
+# Columns that identify one price observation; a newer row with the same key replaces the older one
+RECORD_KEY_FIELDS = ("state", "district", "market", "commodity", "variety", "grade", "arrival_date")
+
+
+def read_price_table(file_content: bytes, file_name: str) -> pd.DataFrame:
+    """
+    Parse the raw bytes of a crop price file into a DataFrame.
+
+    Args:
+        file_content: The raw file bytes.
+        file_name: The file name, used to pick the parser from its extension.
+
+    Returns:
+        The parsed crop price table.
+    """
+    file_extension = file_name.lower().split('.')[-1]
+
+    if file_extension == 'csv':
+        return pd.read_csv(io.BytesIO(file_content))
+    if file_extension in ['xlsx', 'xls']:
+        return pd.read_excel(io.BytesIO(file_content))
+    raise ValueError(f"Unsupported file format: {file_extension}. Supported formats: csv, xlsx, xls")
+
+
+def _normalize_key_part(value):
+    if isinstance(value, str):
+        return normalize_key(value)
+    # NaN never equals itself, so missing values would never match as dict keys
+    return None if pd.isna(value) else value
+
+
+def record_keys(frame: pd.DataFrame) -> pd.Series:
+    """Return the normalized record key of every row as a Series of tuples."""
+    key_fields = [field for field in RECORD_KEY_FIELDS if field in frame.columns]
+    normalized = [
+        frame[field].map(_normalize_key_part).to_numpy()
+        for field in key_fields
+    ]
+    return pd.Series(list(zip(*normalized)), index=frame.index, dtype=object)
+
+
+class PriceSnapshot:
+    """A loaded price table together with its lookup indexes, aggregates and source version."""
+
+    def __init__(self, frame: pd.DataFrame, version: str):
+        self.frame = frame
+        self.index = PriceIndex(frame)
+        self.summary = PriceSummary(frame)
+        self.version = version
+        self._key_positions = None
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def compact_columns(self) -> list:
+        return self.summary.compact_columns
+
+    def select(self, filter_dict: dict):
+        """
+        Find the rows matching every filter.
+
+        Args:
+            filter_dict: Column name to filter value.
+
+        Returns:
+            The sorted row positions, or None if no filter applied (all rows).
+        """
+        positions = None
+        for field_name, field_value in filter_dict.items():
+            if self.index.has(field_name):
+                # Exact/prefix match from the prebuilt index, substring only as a fallback
+                matched = self.index.lookup(field_name, field_value)
+            elif field_name in self.frame.columns:
+                matched = np.flatnonzero((self.frame[field_name] == field_value).to_numpy())
+            else:
+                log.warning("price_table.unknown_column", column=field_name)
+                continue
+
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        return positions
+
+    def count(self, positions) -> int:
+        return len(self.frame) if positions is None else len(positions)
+
+    def rows(self, positions, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """Materialize one page of the selected rows without copying the rest of the table."""
+        if positions is None:
+            return self.frame.iloc[start:stop]
+        return self.frame.iloc[positions[start:stop]]
+
+    def summarize(self, positions, max_groups: int = 20) -> list:
+        return self.summary.summarize(positions, max_groups=max_groups)
+
+    def key_positions(self) -> dict:
+        """Map every record key to its row position, built on first use and kept for the snapshot's lifetime."""
+        if self._key_positions is None:
+            self._key_positions = {key: position for position, key in enumerate(record_keys(self.frame))}
+        return self._key_positions
+
+
+class LayeredSnapshot:
+    """
+    A base snapshot with a small, de-duplicated delta table layered on top.
+
+    Delta rows replace base rows with the same record key. Row positions
+    below len(base) refer to the base table and the rest to the delta, so
+    queries, paging and summaries work like on a single PriceSnapshot while
+    applying a delta only costs time proportional to the delta.
+    """
+
+    def __init__(self, base: PriceSnapshot, delta_frame: pd.DataFrame):
+        self.base = base
+        # Align the delta to the base columns so pages from both layers concatenate cleanly
+        delta_frame = delta_frame.reindex(columns=base.frame.columns)
+        self.delta = PriceSnapshot(delta_frame, base.version)
+        self.version = base.version
+
+        key_positions = base.key_positions()
+        superseded = np.array(
+            [key_positions[key] for key in record_keys(delta_frame) if key in key_positions], dtype=np.intp
+        )
+        live = np.ones(len(base), dtype=bool)
+        live[superseded] = False
+        self._live_base = np.flatnonzero(live)
+        self._has_superseded = len(superseded) > 0
+        self.summary = LayeredSummary(base.summary, self.delta.summary, superseded)
+
+    def __len__(self):
+        return len(self._live_base) + len(self.delta)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The merged table; this copies both layers, so prefer select/rows on hot paths."""
+        return self.rows(self.select({}))
+
+    @property
+    def compact_columns(self) -> list:
+        return self.base.compact_columns
+
+    def select(self, filter_dict: dict):
+        """
+        Find the rows matching every filter in both layers.
+
+        Returns:
+            The sorted row positions across both layers.
+        """
+        base_positions = self.base.select(filter_dict)
+        if base_positions is None:
+            base_positions = self._live_base
+        elif self._has_superseded:
+            base_positions = np.intersect1d(base_positions, self._live_base, assume_unique=True)
+
+        delta_positions = self.delta.select(filter_dict)
+        if delta_positions is None:
+            delta_positions = np.arange(len(self.delta), dtype=np.intp)
+        return np.concatenate([base_positions, delta_positions + len(self.base)])
+
+    def count(self, positions) -> int:
+        return len(positions)
+
+    def rows(self, positions, start: int = 0, stop: int = None) -> pd.DataFrame:
+        page = positions[start:stop]
+        split = np.searchsorted(page, len(self.base))
+        return pd.concat(
+            [self.base.frame.iloc[page[:split]], self.delta.frame.iloc[page[split:] - len(self.base)]],
+            ignore_index=True,
+        )
+
+    def summarize(self, positions, max_groups: int = 20) -> list:
+        # Every live row matched: serve the precomputed aggregates
+        if len(positions) == len(self):
+            positions = None
+        return self.summary.summarize(positions, max_groups=max_groups)
@@ -9,9 +9,10 @@ STEPS TO FOLLOW
     - `market`: The name of the market or mandi (e.g., Khanna, Vashi).
     - `variety`: The name of the crop (e.g., Wheat, Onion, Cotton).
     - `grade`: The quality grade of the commodity (e.g., Grade A, FAQ).
-2. Call the call_price_api_data tool and pass it appropriate arguments based on available parameters
-3. Analyse the Response from the tool and summarise it in such a way that a farmer with less knowledge can understand.
-4. Return your response in a helpful and conversational manner
+2. Call the call_price_api_data_async tool and pass it appropriate arguments based on available parameters
+3. The tool returns a `summary` of prices per variety and market for all matching records, one page of `records`, and a `next_cursor`. Base your answer on the summary; only pass `next_cursor` back as `cursor` if the user needs more individual records.
+4. Analyse the Response from the tool and summarise it in such a way that a farmer with less knowledge can understand.
+5. Return your response in a helpful and conversational manner
 
 **Your Instructions:**
 
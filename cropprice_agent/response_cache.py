@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from telemetry import get_logger
+
+from .price_index import normalize_key
+
+log = get_logger(__name__)
+
+
+DEFAULT_TTL_SEC = 600.0
+DEFAULT_STALE_TTL_SEC = 24 * 3600.0
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def cache_key(filters) -> str:
+    """
+    Build a cache key from CropPriceFilters so equivalent queries share an entry.
+
+    Text filters are casefolded and whitespace-collapsed; unset fields are dropped.
+    """
+    normalized = {}
+    for field_name, field_value in filters.model_dump(exclude_none=True).items():
+        normalized[field_name] = normalize_key(field_value) if isinstance(field_value, str) else field_value
+    return "crop_price:" + json.dumps(normalized, sort_keys=True)
+
+
+class MemoryCacheBackend:
+    """In-process LRU store of (value, stored_at) entries."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value, stored_at: float):
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """
+    Store entries in Redis (or any client with a compatible get/set API) so they are shared across processes.
+
+    Keys expire after `expire_sec`; eviction beyond that is left to the server's maxmemory policy.
+    """
+
+    def __init__(self, client, expire_sec: float):
+        self.client = client
+        self.expire_sec = int(expire_sec)
+
+    def get(self, key: str):
+        raw = self.client.get(key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["value"], entry["stored_at"]
+
+    def set(self, key: str, value, stored_at: float):
+        self.client.set(key, json.dumps({"value": value, "stored_at": stored_at}), ex=self.expire_sec)
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class ResponseCache:
+    """
+    TTL cache for upstream price responses with request coalescing and stale-while-revalidate.
+
+    Entries younger than `ttl_sec` are served directly. Entries up to
+    `ttl_sec + stale_ttl_sec` old are served immediately too, while a single
+    background call per key refreshes them; if that call fails the stale entry
+    keeps being served. Concurrent misses for the same key wait for a single
+    upstream call. Wall-clock timestamps are used so entries stay comparable
+    across processes.
+    """
+
+    def __init__(self, backend, ttl_sec: float = DEFAULT_TTL_SEC, stale_ttl_sec: float = DEFAULT_STALE_TTL_SEC):
+        self.backend = backend
+        self.ttl_sec = ttl_sec
+        self.stale_ttl_sec = stale_ttl_sec
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def get_or_fetch(self, key: str, fetch):
+        """
+        Return the cached value for `key`, calling `fetch()` at most once per key at a time.
+
+        Args:
+            key: The cache key, see cache_key().
+            fetch: Callable returning the fresh value, or None on failure.
+
+        Returns:
+            The fresh, coalesced or stale value, or None if none is available.
+        """
+        entry = self._get_entry(key)
+        if entry is not None:
+            age = time.time() - entry[1]
+            if age < self.ttl_sec:
+                return entry[0]
+            if age < self.ttl_sec + self.stale_ttl_sec:
+                self._refresh_in_background(key, fetch)
+                return entry[0]
+
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                in_flight = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            in_flight.done.wait()
+            return in_flight.result
+        return self._fetch(key, fetch, in_flight)
+
+    def _refresh_in_background(self, key: str, fetch):
+        with self._lock:
+            if key in self._in_flight:
+                # A refresh or a miss for this key is already calling upstream
+                return
+            in_flight = self._in_flight[key] = _InFlight()
+        threading.Thread(
+            target=self._fetch, args=(key, fetch, in_flight), name="price-response-refresh", daemon=True
+        ).start()
+
+    def _fetch(self, key: str, fetch, in_flight: _InFlight):
+        try:
+            value = fetch()
+            if value is not None:
+                self._set_entry(key, value)
+            else:
+                log.warning("price_cache.refresh_skipped", key=key, reason="upstream_unavailable")
+            in_flight.result = value
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+
+    def _get_entry(self, key: str):
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            # A broken cache must never take the price tool down with it
+            log.error("price_cache.read_failed", key=key, error=str(e))
+            return None
+
+    def _set_entry(self, key: str, value):
+        try:
+            self.backend.set(key, value, time.time())
+        except Exception as e:
+            log.error("price_cache.write_failed", key=key, error=str(e))
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Return the process-wide cache for data.gov.in price responses.
+
+    PRICE_RESPONSE_CACHE_TTL, PRICE_RESPONSE_STALE_TTL and PRICE_RESPONSE_CACHE_SIZE
+    tune the cache. Set PRICE_RESPONSE_REDIS_URL to share it through Redis.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                ttl_sec = float(os.getenv("PRICE_RESPONSE_CACHE_TTL", DEFAULT_TTL_SEC))
+                stale_ttl_sec = float(os.getenv("PRICE_RESPONSE_STALE_TTL", DEFAULT_STALE_TTL_SEC))
+                redis_url = os.getenv("PRICE_RESPONSE_REDIS_URL")
+                if redis_url:
+                    import redis
+                    backend = RedisCacheBackend(redis.Redis.from_url(redis_url), expire_sec=ttl_sec + stale_ttl_sec)
+                else:
+                    backend = MemoryCacheBackend(int(os.getenv("PRICE_RESPONSE_CACHE_SIZE", DEFAULT_MAX_ENTRIES)))
+                _response_cache = ResponseCache(backend, ttl_sec=ttl_sec, stale_ttl_sec=stale_ttl_sec)
+    return _response_cache
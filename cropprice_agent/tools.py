@@ -1,9 +1,11 @@
 from pydantic import BaseModel
+import asyncio
 import requests
-import pandas as pd
 import os
-from google.cloud import storage
-import io
+from telemetry import get_logger, timed
+from .http_client import CircuitOpenError, get_price_api_client
+from .price_cache import get_price_cache
+from .response_cache import cache_key, get_response_cache
 
 
 class CropPriceFilters(BaseModel):
@@ -14,10 +16,55 @@ class CropPriceFilters(BaseModel):
     grade: str = None
     offset: int = None
     limit: int = None
+    cursor: str = None
+    raw_records: bool = None
 
 
+# Fields that control paging and output shape rather than filter rows
+PAGINATION_FIELDS = ['offset', 'limit', 'cursor', 'raw_records']
+
+# Page size and summary size used when the caller does not pass a limit
+DEFAULT_RESULT_LIMIT = int(os.getenv("PRICE_RESULT_LIMIT", 20))
+SUMMARY_MAX_GROUPS = int(os.getenv("PRICE_SUMMARY_MAX_GROUPS", 20))
+
+log = get_logger(__name__)
+
+
+def _page_start(filters: CropPriceFilters) -> int:
+    """
+    First row of the requested page, from `cursor` or else `offset`.
+
+    Raises:
+        ValueError: If the cursor is not a row number returned as next_cursor.
+    """
+    if not filters.cursor:
+        return filters.offset or 0
+    cursor = str(filters.cursor).strip()
+    if not cursor.isdigit():
+        raise ValueError(f"Invalid cursor {filters.cursor!r}; pass back the next_cursor of the previous page.")
+    return int(cursor)
+
 
 def call_price_api(filters: CropPriceFilters):
+    """
+    Fetch crop price records from the data.gov.in API, served from the response cache when possible.
+    Identical concurrent queries share one upstream call, and an expired response
+    is returned at once while it is refreshed in the background, so a slow or
+    failing API only delays queries that were never cached.
+
+    Args:
+        filters: An instance of CropPriceFilters containing the desired filter values.
+
+    Returns:
+        The list of price records, or None if the request failed and nothing is cached.
+    """
+    if isinstance(filters, dict):
+        filters = CropPriceFilters(**filters)
+
+    return get_response_cache().get_or_fetch(cache_key(filters), lambda: _fetch_price_records(filters))
+
+
+def _fetch_price_records(filters: CropPriceFilters):
     """
     Simulate a call to a crop price API with the provided filters.
     Constructs a URL for a crop price API call based on the provided filters.
@@ -30,9 +77,6 @@ def call_price_api(filters: CropPriceFilters):
     Returns:
         A string representing the constructed API URL.
     """
-    if isinstance(filters, dict):
-        filters = CropPriceFilters(**filters)
-
     base_url = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
     params = {}
 
@@ -51,132 +95,152 @@ def call_price_api(filters: CropPriceFilters):
     else:
         # If any filter is present, add it as a parameter
         # model_dump(exclude_none=True) will only include fields that are not None
-        for field_name, field_value in filters.model_dump(exclude_none=True).items():
+        for field_name, field_value in filters.model_dump(exclude_none=True, exclude={'cursor', 'raw_records'}).items():
             params["filters[" + field_name + "]"] = field_value
 
     # Construct the query string from the parameters
     query_string = "&".join([f"{key}={value}" for key, value in params.items()])
-    print(query_string)
 
     # Combine the base URL with the query string
     if query_string:
         try:
-            print(f"Attempting to send GET request to: {base_url} with params: {params}")
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
-            print("Request successful!")
-            # print(response.json())
-            json_response = response.json()
+            # params carries the API key; the logger redacts it
+            log.debug("price_api.request", url=base_url, params=params)
+            # Pooled session with connect/read timeouts, jittered retries and a circuit breaker
+            with timed("price_api_fetch"):
+                json_response = get_price_api_client().get_json(base_url, params=params)
             response_list = json_response['records']
-            print(response_list)
+            log.info("price_api.response", records=len(response_list))
+            log.debug("price_api.records", sample=response_list[:2])
             return response_list # Return the JSON response
+        except CircuitOpenError as circuit_err:
+            log.warning("price_api.unavailable", error=str(circuit_err))
         except requests.exceptions.HTTPError as http_err:
-            print(f"HTTP error occurred: {http_err} - Response text: {response.text}")
+            log.error(
+                "price_api.http_error", error=str(http_err),
+                response=http_err.response.text if http_err.response is not None else "",
+            )
         except requests.exceptions.ConnectionError as conn_err:
-            print(f"Connection error occurred: {conn_err}")
+            log.error("price_api.connection_error", error=str(conn_err))
         except requests.exceptions.Timeout as timeout_err:
-            print(f"Timeout error occurred: {timeout_err}")
+            log.error("price_api.timeout", error=str(timeout_err))
         except requests.exceptions.RequestException as req_err:
-            print(f"An unexpected error occurred: {req_err}")
-        except ValueError: # Catches JSONDecodeError if response.json() fails
-            print(f"Failed to decode JSON from response. Response text: {response.text}")
+            log.error("price_api.request_error", error=str(req_err))
+        except (ValueError, KeyError) as parse_err: # JSONDecodeError or a body without 'records'
+            log.error("price_api.bad_response", error=str(parse_err))
     else:
         return base_url
 
 
 def call_price_api_data(filters: CropPriceFilters):
     """
-    Read crop price data from a CSV/Excel file in Google Cloud Storage and apply filters.
+    Read crop price data from the cached copy of the CSV/Excel file in Google Cloud Storage and apply filters.
     If cloud storage access fails, fallback to API call.
     
+    Unless `raw_records` is set, the result is budgeted for the model context:
+    per variety/market aggregates (min/max/modal price, count) over all matching
+    rows, one page of records with a compact set of columns (at most `limit`,
+    PRICE_RESULT_LIMIT by default) and a `next_cursor` to pass back as `cursor`
+    for the following page.
+    
     Args:
         filters: An instance of CropPriceFilters containing the desired filter values.
     
     Returns:
-        A list of dictionaries representing the filtered crop price data.
+        A dictionary with total_records, summary, records and next_cursor, or with
+        raw_records a list of dictionaries representing the filtered crop price data.
+        A malformed cursor returns {"error": ...} instead of falling back to the API.
     """
-    bucket_name="crop_price"
-    file_name="crop_price.csv"
-    print("inside call_price_api_data")
     if isinstance(filters, dict):
         filters = CropPriceFilters(**filters)
     
     try:
-        # Initialize Google Cloud Storage client
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(file_name)
+        start = _page_start(filters)
+    except ValueError as e:
+        log.warning("price_data.bad_cursor", cursor=filters.cursor)
+        return {"error": str(e)}
+    
+    try:
+        # Serve from the process-wide snapshot instead of downloading on every call
+        snapshot = get_price_cache().get_snapshot()
         
-        # Check if file exists in bucket
-        if not blob.exists():
-            print(f"File not found in bucket: {bucket_name}/{file_name}")
-            print("Falling back to API call...")
+        if snapshot is None:
+            log.warning("price_data.unavailable", fallback="api")
             return call_price_api(filters)
         
-        # Download file content as bytes
-        print(f"Reading file from GCS bucket: {bucket_name}/{file_name}")
-        file_content = blob.download_as_bytes()
+        # Get the filter values, excluding None values and paging controls
+        filter_dict = filters.model_dump(exclude_none=True, exclude=set(PAGINATION_FIELDS))
         
-        # Read file based on extension
-        file_extension = file_name.lower().split('.')[-1]
-        
-        if file_extension == 'csv':
-            df = pd.read_csv(io.BytesIO(file_content))
-        elif file_extension in ['xlsx', 'xls']:
-            df = pd.read_excel(io.BytesIO(file_content))
-        else:
-            print(f"Unsupported file format: {file_extension}. Supported formats: csv, xlsx, xls")
-            print("Falling back to API call...")
-            return call_price_api(filters)
+        # Sorted row positions matching every filter; None means all rows
+        with timed("price_filter", filters=len(filter_dict)) as span:
+            positions = snapshot.select(filter_dict)
+            
+            # Handle offset and limit for pagination
+            total_records = snapshot.count(positions)
+            if span is not None:
+                span.set_attribute("price.total_records", total_records)
         
-        # Apply filters
-        filtered_df = df.copy()
+        limit = filters.limit
+        if limit is None and not filters.raw_records:
+            limit = DEFAULT_RESULT_LIMIT
+        stop = start + limit if limit is not None else None
         
-        # Get the filter values, excluding None values
-        filter_dict = filters.model_dump(exclude_none=True)
+        # Slice the positions before touching the frame so only the requested page is materialized
+        filtered_df = snapshot.rows(positions, start, stop)
         
-        if filter_dict:
-            print(f"Applying filters: {filter_dict}")
+        if filters.raw_records:
+            # Convert to list of dictionaries
+            result = filtered_df.to_dict('records')
             
-            # Apply each filter
-            for field_name, field_value in filter_dict.items():
-                if field_name in ['offset', 'limit']:
-                    continue  # Handle these separately
-                
-                if field_name in filtered_df.columns:
-                    # Case-insensitive filtering for string columns
-                    if filtered_df[field_name].dtype == 'object':
-                        filtered_df = filtered_df[
-                            filtered_df[field_name].str.contains(
-                                str(field_value), 
-                                case=False, 
-                                na=False
-                            )
-                        ]
-                    else:
-                        filtered_df = filtered_df[filtered_df[field_name] == field_value]
-                else:
-                    print(f"Warning: Column '{field_name}' not found in Excel data")
-        
-        # Handle offset and limit for pagination
-        total_records = len(filtered_df)
-        
-        if filters.offset is not None:
-            filtered_df = filtered_df.iloc[filters.offset:]
+            log.info("price_data.query", filters=filter_dict, records=len(result), total_records=total_records, raw=True)
+            log.debug("price_data.records", sample=result[:2])
+            
+            return result
         
-        if filters.limit is not None:
-            filtered_df = filtered_df.head(filters.limit)
+        records = filtered_df[snapshot.compact_columns].to_dict('records')
+        next_start = start + len(records)
         
-        # Convert to list of dictionaries
-        result = filtered_df.to_dict('records')
+        log.info("price_data.query", filters=filter_dict, records=len(records), total_records=total_records)
         
-        print(f"Found {len(result)} records out of {total_records} total filtered records from cloud storage")
-        print(f"Sample of filtered data: {result[:2] if result else 'No data found'}")
+        with timed("price_summary"):
+            summary = snapshot.summarize(positions, max_groups=SUMMARY_MAX_GROUPS)
         
-        return result
+        return {
+            "total_records": total_records,
+            "summary": summary,
+            "records": records,
+            "next_cursor": str(next_start) if next_start < total_records else None,
+        }
         
-    except Exception as e:
-        print(f"Error reading file from cloud bucket: {e}")
-        print("Falling back to API call...")
+    except Exception:
+        log.exception("price_data.error", fallback="api")
         return call_price_api(filters)
-        
\ No newline at end of file
+        
+
+
+async def call_price_api_async(filters: CropPriceFilters):
+    """
+    Async variant of call_price_api that runs the blocking request in a worker thread.
+
+    Args:
+        filters: An instance of CropPriceFilters containing the desired filter values.
+
+    Returns:
+        The list of price records, or None if the request failed.
+    """
+    return await asyncio.to_thread(call_price_api, filters)
+
+
+async def call_price_api_data_async(filters: CropPriceFilters):
+    """
+    Read crop price data from the cached copy of the CSV/Excel file in Google Cloud Storage and apply filters.
+    If cloud storage access fails, fallback to API call.
+    Runs in a worker thread so the agent's event loop is never blocked by storage or network I/O.
+
+    Args:
+        filters: An instance of CropPriceFilters containing the desired filter values.
+
+    Returns:
+        A list of dictionaries representing the filtered crop price data.
+    """
+    return await asyncio.to_thread(call_price_api_data, filters)
@@ -37,7 +37,10 @@ remote_agent = agent_engines.create(
         "cropprice_agent", 
         "greetor",
         "crop_doctor",
-        "farmer_mood"
+        "farmer_mood",
+        "reply_pool",
+        "image_pipeline",
+        "telemetry"
     ],
     gcs_dir_name = None,
     display_name="Farming Coordinator Agent",
@@ -1,4 +1,5 @@
 from google.adk.agents import LlmAgent
+from reply_pool import mood_reply
 
 farmer_agent = LlmAgent(
     name="farmer_agent",
@@ -12,5 +13,7 @@ Rules:
 - hopeful → reply with a quick, upbeat pick-me-up.  
 - neutral → reply with a light, friendly check-in question.
 
-Keep responses short and neighborly, never clinical."""
+Keep responses short and neighborly, never clinical.""",
+    # One-word moods are answered from the pre-generated pool without a model call
+    before_agent_callback=mood_reply
 )
\ No newline at end of file
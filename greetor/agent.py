@@ -1,9 +1,12 @@
 from google.adk.agents import LlmAgent
+from reply_pool import greeting_reply
 
 
 greetor_agent = LlmAgent(
     name="greetor",
     description="Greetor",
     instruction="Greet the users",
-    model="gemini-2.0-flash"
+    model="gemini-2.0-flash",
+    # Serve a pre-generated greeting when the pool has one for the user's language
+    before_agent_callback=greeting_reply
 )
\ No newline at end of file
@@ -0,0 +1,29 @@
+# Production serving: gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+import tempfile
+
+# Load main:app (agents, price snapshot) once in the master and fork workers from it,
+# so the loaded data is shared copy-on-write instead of being loaded per worker
+preload_app = True
+os.environ.setdefault("WARM_UP_BLOCKING", "1")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+# Each worker has its own metrics registry; they meet in this directory so /metrics covers all of them
+os.environ.setdefault(
+    "TELEMETRY_METRICS_DIR", os.path.join(tempfile.gettempdir(), f"farming-metrics-{os.environ.get('PORT', 8080)}")
+)
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Model calls can take tens of seconds; keep the worker timeout well above that
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 300))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # Runs once in the master before any worker is forked: drop the files of a previous run
+    from telemetry.multiprocess import clear
+
+    clear(os.environ["TELEMETRY_METRICS_DIR"])
@@ -0,0 +1,9 @@
+from .preprocess import PreparedImage, prepare_image, prepare_image_async, prepare_image_sync, sniff_mime
+
+__all__ = [
+    "PreparedImage",
+    "prepare_image",
+    "prepare_image_async",
+    "prepare_image_sync",
+    "sniff_mime",
+]
@@ -0,0 +1,75 @@
+"""
+Benchmark image preprocessing on sample photos.
+
+Reports per image the upload size before and after, the preprocessing time,
+and, with GEMINI_BENCH_MODEL set, the model round trip for both versions so the
+milliseconds saved can be weighed against the preprocessing cost.
+
+Usage:
+    python -m image_pipeline.bench <image> [<image> ...]
+"""
+import os
+import sys
+import time
+
+from .preprocess import prepare_image, sniff_mime
+
+
+_PROMPT = "Describe any crop disease or wild animal visible in this image in one sentence."
+
+
+def _model_ms(client, model: str, data: bytes, mime_type: str) -> float:
+    from google.genai import types
+
+    started = time.perf_counter()
+    client.models.generate_content(
+        model=model,
+        contents=types.Content(role="user", parts=[
+            types.Part(inline_data=types.Blob(mime_type=mime_type, data=data)),
+            types.Part(text=_PROMPT),
+        ]),
+    )
+    return (time.perf_counter() - started) * 1000
+
+
+def bench(paths: list, model: str = None):
+    client = None
+    if model:
+        from google import genai
+        client = genai.Client()
+
+    total_before = total_after = total_prep_ms = total_saved_ms = 0
+    for path in paths:
+        with open(path, "rb") as image_file:
+            data = image_file.read()
+        prepared = prepare_image(data)
+        total_before += len(data)
+        total_after += len(prepared.data)
+        total_prep_ms += prepared.elapsed_ms
+
+        line = (
+            f"{os.path.basename(path)}: {len(data) / 1024:.0f} KiB -> {len(prepared.data) / 1024:.0f} KiB "
+            f"{prepared.mime_type} {prepared.width}x{prepared.height}, prep {prepared.elapsed_ms:.1f} ms"
+        )
+        if client is not None:
+            original_ms = _model_ms(client, model, data, sniff_mime(data) or "image/jpeg")
+            prepared_ms = _model_ms(client, model, prepared.data, prepared.mime_type)
+            total_saved_ms += original_ms - prepared_ms - prepared.elapsed_ms
+            line += f", model {original_ms:.0f} -> {prepared_ms:.0f} ms"
+        print(line)
+
+    if paths:
+        print(
+            f"total: {total_before / 1024:.0f} KiB -> {total_after / 1024:.0f} KiB "
+            f"({(1 - total_after / total_before) * 100 if total_before else 0:.0f}% fewer bytes), "
+            f"mean prep {total_prep_ms / len(paths):.1f} ms"
+        )
+        if client is not None:
+            print(f"mean end-to-end saving after prep cost: {total_saved_ms / len(paths):.0f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    bench(sys.argv[1:], model=os.getenv("GEMINI_BENCH_MODEL"))
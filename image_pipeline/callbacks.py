@@ -0,0 +1,36 @@
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+from telemetry import get_logger
+
+from .preprocess import prepare_image_async
+
+log = get_logger(__name__)
+
+
+async def shrink_request_images(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """
+    before_model_callback that replaces uploaded images with preprocessed copies.
+
+    Only the request sent to the model changes; the session keeps the
+    original upload, so hashing and storage still see the user's bytes.
+    """
+    for content in llm_request.contents:
+        for index, part in enumerate(content.parts or []):
+            blob = part.inline_data
+            if blob is None or not (blob.mime_type or "").startswith("image/") or not blob.data:
+                continue
+            try:
+                prepared = await prepare_image_async(blob.data)
+            except Exception as e:
+                # Send the original rather than fail the turn on an image Pillow cannot read
+                log.warning("image.preprocess_failed", error=str(e))
+                continue
+            content.parts[index] = types.Part(inline_data=types.Blob(mime_type=prepared.mime_type, data=prepared.data))
+            log.info(
+                "image.preprocessed", original_bytes=prepared.original_size, bytes=len(prepared.data),
+                width=prepared.width, height=prepared.height, elapsed_ms=round(prepared.elapsed_ms),
+            )
+    return None
@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+
+# Gemini tiles images at 768px, so detail beyond ~2 tiles per side is mostly wasted upload
+DEFAULT_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", 1536))
+DEFAULT_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 85))
+
+# Magic numbers of the formats Gemini accepts
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+PreparedImage = namedtuple("PreparedImage", ["data", "mime_type", "original_size", "width", "height", "elapsed_ms"])
+
+
+def sniff_mime(data: bytes):
+    """Return the image MIME type from the file's magic bytes, or None if unrecognised."""
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic"
+    return None
+
+
+def prepare_image(data: bytes, max_side: int = DEFAULT_MAX_SIDE, quality: int = DEFAULT_JPEG_QUALITY) -> PreparedImage:
+    """
+    Shrink an image to what the vision model can use before uploading it.
+
+    Applies the EXIF orientation, downsizes the longest side to `max_side`
+    and re-encodes as JPEG at `quality`. If that does not make the upload
+    smaller, the original bytes are kept with their real MIME type.
+    """
+    started = time.perf_counter()
+    original_mime = sniff_mime(data)
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            # JPEG has no alpha: flatten onto white instead of letting transparent areas turn black
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        width, height = image.size
+
+    encoded = output.getvalue()
+    if original_mime is not None and len(encoded) >= len(data):
+        encoded, mime_type = data, original_mime
+    else:
+        mime_type = "image/jpeg"
+    return PreparedImage(encoded, mime_type, len(data), width, height, (time.perf_counter() - started) * 1000)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # One pool per process; created lazily so preforked server workers each get their own
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=int(os.getenv("IMAGE_PREP_WORKERS", 2)))
+    return _executor
+
+
+# Recently prepared images by content hash: an agent turn can send the same upload to the model several times
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+RECENT_MAX_ENTRIES = 32
+
+
+def _remember(key: str, prepared: PreparedImage) -> PreparedImage:
+    with _recent_lock:
+        _recent[key] = prepared
+        _recent.move_to_end(key)
+        while len(_recent) > RECENT_MAX_ENTRIES:
+            _recent.popitem(last=False)
+    return prepared
+
+
+def _recall(key: str):
+    with _recent_lock:
+        return _recent.get(key)
+
+
+def prepare_image_sync(data: bytes) -> PreparedImage:
+    """Prepare an image in the process pool, blocking the calling thread only."""
+    key = hashlib.sha1(data).hexdigest()
+    return _recall(key) or _remember(key, _get_executor().submit(prepare_image, data).result())
+
+
+async def prepare_image_async(data: bytes) -> PreparedImage:
+    """Prepare an image in the process pool without blocking the event loop."""
+    key = hashlib.sha1(data).hexdigest()
+    cached = _recall(key)
+    if cached is not None:
+        return cached
+    prepared = await asyncio.get_running_loop().run_in_executor(_get_executor(), prepare_image, data)
+    return _remember(key, prepared)
@@ -2,13 +2,17 @@
 
 import asyncio
 import os
-from google.adk.agents import LoopAgent, LlmAgent, BaseAgent, SequentialAgent
+from google.adk.agents import LlmAgent, BaseAgent, SequentialAgent
 from google.genai import types
 from google.adk.runners import InMemoryRunner
 from google.adk.agents.invocation_context import InvocationContext
-from google.adk.tools.tool_context import ToolContext
 from typing import AsyncGenerator, Optional
 from google.adk.events import Event, EventActions
+from google.adk.agents.readonly_context import ReadonlyContext
+from telemetry import instrument_agents
+from .controller import RefinementController, controller_settings
+from .dialogue_cache import DialogueCacheAgent, cache_from_env
+from .patching import EditPlan, numbered
 
 # --- Constants ---
 APP_NAME = "conversation_agent" # New App Name
@@ -22,14 +26,9 @@ STATE_CURRENT_DOC = "current_document"
 STATE_CRITICISM = "criticism"
 # Define the exact phrase the Critic should use to signal completion
 COMPLETION_PHRASE = "No major issues found."
-
-# --- Tool Definition ---
-def exit_loop(tool_context: ToolContext):
-  """Call this function ONLY when the critique indicates no further changes are needed, signaling the iterative process should end."""
-  print(f"  [Tool Call] exit_loop triggered by {tool_context.agent_name}")
-  tool_context.actions.escalate = True
-  # Return empty dict as tools should typically return JSON-serializable output
-  return {}
+STATE_PATCH = "refinement_patch"
+# "patch": the refiner returns line edits applied locally; "rewrite": it returns the whole dialogue
+REFINE_MODE = os.getenv("LOOP_REFINE_MODE", "patch")
 
 # --- Agent Definitions ---
 
@@ -94,53 +93,96 @@ critic_agent_in_loop = LlmAgent(
 )
 
 
-# STEP 2b: Refiner/Exiter Agent (Inside the Refinement Loop)
+# STEP 2b: Refiner Agent (Inside the Refinement Loop)
+# Only runs when the critique has actionable feedback; the controller handles completion locally
 refiner_agent_in_loop = LlmAgent(
     name="RefinerAgent",
     model=GEMINI_MODEL,
     # Relies solely on state via placeholders
     include_contents='none',
-    instruction=f"""You are a Creative Writing Assistant refining a document based on feedback OR exiting the process.
+    instruction="""You are a Creative Writing Assistant refining a document based on feedback.
     **Current Document:**
     ```
-    {{current_document}}
+    {current_document}
     ```
     **Critique/Suggestions:**
-    {{criticism}}
+    {criticism}
 
     **Task:**
-    Analyze the 'Critique/Suggestions'.
-    IF the critique is *exactly* "{COMPLETION_PHRASE}":
-    You MUST call the 'exit_loop' function. Do not output any text.
-    ELSE (the critique contains actionable feedback):
     Carefully apply the suggestions to improve the 'Current Document'. Output *only* the refined document text.
 
-    Do not add explanations. Either output the refined document OR call the exit_loop function.
+    Do not add explanations.
 """,
-    description="Refines the document based on critique, or calls exit_loop if critique indicates completion.",
-    tools=[exit_loop], # Provide the exit_loop tool
+    description="Refines the document based on critique.",
     output_key=STATE_CURRENT_DOC # Overwrites state['current_document'] with the refined version
 )
 
 
+# STEP 2c: Patch Refiner Agent (Inside the Refinement Loop, LOOP_REFINE_MODE=patch)
+# Emits only the edits, so output tokens scale with the critique instead of the dialogue length
+def patch_refiner_instruction(context: ReadonlyContext) -> str:
+  return f"""You are a Creative Writing Assistant refining a document based on feedback.
+    **Current Document (line numbers are not part of the text):**
+    ```
+    {numbered(context.state.get(STATE_CURRENT_DOC, ""))}
+    ```
+    **Critique/Suggestions:**
+    {context.state.get(STATE_CRITICISM, "")}
+
+    **Task:**
+    Apply the suggestions as line edits against the numbered document:
+    - "replace": replace lines start..end with text
+    - "insert": insert text after line start (0 inserts at the top)
+    - "delete": remove lines start..end
+    Use the original line numbers for every edit, do not overlap edits, and do not include line numbers in text.
+    Change only what the critique asks for.
+"""
+
+patch_refiner_agent_in_loop = LlmAgent(
+    name="PatchRefinerAgent",
+    model=GEMINI_MODEL,
+    include_contents='none',
+    instruction=patch_refiner_instruction,
+    description="Refines the document based on critique by returning line edits.",
+    output_schema=EditPlan,
+    output_key=STATE_PATCH
+)
+
+
 # STEP 2: Refinement Loop Agent
-refinement_loop = LoopAgent(
+# Stops on the completion phrase without a refiner call, on convergence, or on the token/time budget
+refinement_loop = RefinementController(
     name="RefinementLoop",
-    # Agent order is crucial: Critique first, then Refine/Exit
-    sub_agents=[
-        critic_agent_in_loop,
-        refiner_agent_in_loop,
-    ],
-    max_iterations=5 # Limit loops
+    critic=critic_agent_in_loop,
+    refiner=refiner_agent_in_loop,
+    # Falls back to refiner_agent_in_loop when the edits do not apply
+    patch_refiner=patch_refiner_agent_in_loop if REFINE_MODE == "patch" else None,
+    patch_key=STATE_PATCH,
+    document_key=STATE_CURRENT_DOC,
+    criticism_key=STATE_CRITICISM,
+    completion_phrase=COMPLETION_PHRASE,
+    **controller_settings()
 )
 
 # STEP 3: Overall Sequential Pipeline
-# For ADK tools compatibility, the root agent must be named `root_agent`
-root_agent = SequentialAgent(
+writing_pipeline = SequentialAgent(
     name="IterativeWritingPipeline",
     sub_agents=[
         initial_writer_agent, # Run first to create initial doc
         refinement_loop       # Then run the critique/refine loop
     ],
-    description="Writes an initial document and then iteratively refines it with critique using an exit tool."
-)
\ No newline at end of file
+    description="Writes an initial document and then iteratively refines it with critique until it is complete or converges."
+)
+
+# STEP 4: Dialogue cache in front of the pipeline
+# Requests in an already generated produce x quantity band x price band bucket skip the model entirely
+# For ADK tools compatibility, the root agent must be named `root_agent`
+root_agent = DialogueCacheAgent(
+    name="CachedWritingPipeline",
+    pipeline=writing_pipeline,
+    cache=cache_from_env(),
+    document_key=STATE_CURRENT_DOC
+)
+
+# Model latency/token histograms for the writer, critic and refiners, served at /metrics
+instrument_agents(root_agent)
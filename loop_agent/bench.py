@@ -0,0 +1,85 @@
+"""
+Compare full-rewrite and patch refinement on the same draft and critique.
+
+Generates one dialogue and its critique, then runs RefinerAgent and
+PatchRefinerAgent on them `repeat` times each and reports output tokens and
+wall time per refinement, plus how often the patch failed to apply.
+
+Usage:
+    python -m loop_agent.bench ["<produce, quantity, price request>"] [repeat]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from .agent import (
+    APP_NAME, STATE_CRITICISM, STATE_CURRENT_DOC, STATE_PATCH, USER_ID,
+    critic_agent_in_loop, initial_writer_agent, patch_refiner_agent_in_loop, refiner_agent_in_loop,
+)
+from .patching import EditPlan, apply_edits
+
+DEFAULT_REQUEST = "I want to sell 500 kg of onions; the mandi price today is Rs 22 per kg."
+
+
+def _standalone(agent):
+    # Agents can only have one parent, so run copies detached from the pipeline
+    return agent.model_copy(update={"parent_agent": None})
+
+
+async def _run(agent, state: dict, text: str):
+    runner = InMemoryRunner(agent=agent, app_name=APP_NAME)
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=USER_ID, state=state)
+    output_tokens = 0
+    started = time.perf_counter()
+    async for event in runner.run_async(
+        user_id=USER_ID, session_id=session.id, new_message=types.Content(role="user", parts=[types.Part(text=text)])
+    ):
+        if event.usage_metadata is not None:
+            output_tokens += event.usage_metadata.candidates_token_count or 0
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    session = await runner.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+    return session.state, output_tokens, elapsed_ms
+
+
+async def bench(request: str, repeat: int):
+    state, _, _ = await _run(_standalone(initial_writer_agent), {}, request)
+    state, _, _ = await _run(_standalone(critic_agent_in_loop), dict(state), request)
+    document, criticism = state[STATE_CURRENT_DOC], state[STATE_CRITICISM]
+    print(f"draft: {len(document.splitlines())} lines; critique: {criticism[:120]!r}")
+
+    results = {"rewrite": [], "patch": []}
+    patch_failures = 0
+    for _ in range(repeat):
+        _, tokens, elapsed_ms = await _run(_standalone(refiner_agent_in_loop), dict(state), request)
+        results["rewrite"].append((tokens, elapsed_ms))
+        try:
+            patched_state, tokens, elapsed_ms = await _run(_standalone(patch_refiner_agent_in_loop), dict(state), request)
+        except ValueError:
+            # The model's JSON did not match EditPlan
+            patch_failures += 1
+            continue
+        results["patch"].append((tokens, elapsed_ms))
+        try:
+            apply_edits(document, EditPlan.model_validate(patched_state.get(STATE_PATCH) or {}).edits)
+        except ValueError:
+            patch_failures += 1
+
+    for mode, runs in results.items():
+        if not runs:
+            continue
+        print(
+            f"{mode:>8}: median {statistics.median(t for t, _ in runs):.0f} output tokens, "
+            f"median {statistics.median(ms for _, ms in runs):.0f} ms per refinement"
+        )
+    print(f"patches that did not apply (would fall back to a rewrite): {patch_failures}/{repeat}")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(
+        sys.argv[1] if len(sys.argv) > 1 else DEFAULT_REQUEST,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+    ))
@@ -0,0 +1,192 @@
+import difflib
+import os
+import time
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from telemetry import get_logger
+
+from .patching import EditPlan, apply_edits
+
+log = get_logger(__name__)
+
+DEFAULT_MAX_ITERATIONS = 5
+# Fraction of lines changed by a refinement below which the draft counts as converged
+DEFAULT_CONVERGENCE_THRESHOLD = 0.05
+DEFAULT_TOKEN_BUDGET = 60000
+DEFAULT_TIME_BUDGET_SEC = 120.0
+# State key holding the per-run report (iterations, latencies, tokens, stop reason)
+STATE_REFINEMENT_REPORT = "refinement_report"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.strip().strip("`'\"*").casefold().split())
+
+
+def is_complete(criticism: str, completion_phrase: str) -> bool:
+    """True if the critique is the completion phrase, allowing for quotes, case and stray whitespace."""
+    return _normalize(criticism or "") == _normalize(completion_phrase)
+
+
+def change_ratio(previous: str, current: str) -> float:
+    """Fraction of lines that differ between two versions of the document (0.0 = identical)."""
+    matcher = difflib.SequenceMatcher(None, (previous or "").splitlines(), (current or "").splitlines(), autojunk=False)
+    return 1.0 - matcher.ratio()
+
+
+def _tokens(event: Event) -> tuple:
+    """(total, output) tokens billed for an event."""
+    usage = event.usage_metadata
+    if usage is None:
+        return 0, 0
+    output = usage.candidates_token_count or 0
+    return (usage.prompt_token_count or 0) + output, output
+
+
+class RefinementController(BaseAgent):
+    """
+    Critique/refine loop that decides locally when to stop.
+
+    Replaces LoopAgent + exit_loop: the critic's output is compared with the
+    completion phrase here, so finishing costs no refiner call. The loop also
+    stops when a refinement changes less than `convergence_threshold` of the
+    document's lines, or when the run has used `token_budget` tokens or
+    `time_budget_sec` seconds. Latency and tokens per iteration are logged and
+    stored in state under STATE_REFINEMENT_REPORT.
+
+    With a `patch_refiner`, refinements are line edits (an EditPlan stored
+    under `patch_key`) applied here to the document, so the model writes only
+    what changes. If the plan is invalid or does not apply, that iteration
+    falls back to the full-rewrite `refiner`.
+    """
+
+    critic: LlmAgent
+    refiner: LlmAgent
+    patch_refiner: Optional[LlmAgent] = None
+    patch_key: str = "refinement_patch"
+    document_key: str
+    criticism_key: str
+    completion_phrase: str
+    max_iterations: int = DEFAULT_MAX_ITERATIONS
+    convergence_threshold: float = DEFAULT_CONVERGENCE_THRESHOLD
+    token_budget: int = DEFAULT_TOKEN_BUDGET
+    time_budget_sec: float = DEFAULT_TIME_BUDGET_SEC
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name: str, critic: LlmAgent, refiner: LlmAgent, patch_refiner: LlmAgent = None, **kwargs):
+        sub_agents = [critic, refiner] + ([patch_refiner] if patch_refiner is not None else [])
+        super().__init__(
+            name=name, critic=critic, refiner=refiner, patch_refiner=patch_refiner, sub_agents=sub_agents, **kwargs
+        )
+
+    async def _patch(self, ctx: InvocationContext, document: str, usage: list) -> AsyncGenerator[Event, None]:
+        """Run the patch refiner and apply its edits; sets usage[2] to whether it succeeded."""
+        try:
+            async for event in self.patch_refiner.run_async(ctx):
+                total, output = _tokens(event)
+                usage[0] += total
+                usage[1] += output
+                yield event
+            plan = EditPlan.model_validate(ctx.session.state.get(self.patch_key) or {})
+            patched = apply_edits(document, plan.edits)
+        except ValueError as e:
+            # Covers unparsable JSON, schema violations and edits that do not apply
+            log.warning("refinement.patch_rejected", agent=self.name, error=str(e))
+            return
+        usage[2] = True
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            actions=EventActions(state_delta={self.document_key: patched}),
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        started = time.perf_counter()
+        tokens_used = 0
+        output_tokens = 0
+        iterations = []
+        stop_reason = "max_iterations"
+        previous = ctx.session.state.get(self.document_key, "")
+
+        for iteration in range(1, self.max_iterations + 1):
+            report = {"iteration": iteration}
+            iteration_started = time.perf_counter()
+
+            async for event in self.critic.run_async(ctx):
+                total, output = _tokens(event)
+                tokens_used += total
+                output_tokens += output
+                yield event
+            report["critic_ms"] = round((time.perf_counter() - iteration_started) * 1000)
+
+            if is_complete(ctx.session.state.get(self.criticism_key, ""), self.completion_phrase):
+                iterations.append(report)
+                stop_reason = "critic_complete"
+                break
+            if tokens_used >= self.token_budget or time.perf_counter() - started >= self.time_budget_sec:
+                iterations.append(report)
+                stop_reason = "budget"
+                break
+
+            refiner_started = time.perf_counter()
+            usage = [0, 0, False]
+            if self.patch_refiner is not None:
+                async for event in self._patch(ctx, previous, usage):
+                    yield event
+            if not usage[2]:
+                async for event in self.refiner.run_async(ctx):
+                    total, output = _tokens(event)
+                    usage[0] += total
+                    usage[1] += output
+                    yield event
+            tokens_used += usage[0]
+            output_tokens += usage[1]
+            report["refiner_ms"] = round((time.perf_counter() - refiner_started) * 1000)
+            report["refine_mode"] = "patch" if usage[2] else ("rewrite_fallback" if self.patch_refiner else "rewrite")
+            report["refiner_output_tokens"] = usage[1]
+
+            current = ctx.session.state.get(self.document_key, "")
+            report["change"] = round(change_ratio(previous, current), 4)
+            report["tokens"] = tokens_used
+            iterations.append(report)
+            log.info("refinement.iteration", agent=self.name, **report)
+            previous = current
+
+            if report["change"] < self.convergence_threshold:
+                stop_reason = "converged"
+                break
+            if tokens_used >= self.token_budget or time.perf_counter() - started >= self.time_budget_sec:
+                stop_reason = "budget"
+                break
+
+        summary = {
+            "stop_reason": stop_reason,
+            "iterations": iterations,
+            "tokens": tokens_used,
+            "output_tokens": output_tokens,
+            "total_ms": round((time.perf_counter() - started) * 1000),
+        }
+        log.info(
+            "refinement.stopped", agent=self.name, stop_reason=stop_reason, iterations=len(iterations),
+            total_ms=summary["total_ms"], tokens=tokens_used,
+        )
+        # Escalate like exit_loop did, so an enclosing loop stops as well
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            actions=EventActions(state_delta={STATE_REFINEMENT_REPORT: summary}, escalate=True),
+        )
+
+
+def controller_settings() -> dict:
+    """Loop limits from LOOP_MAX_ITERATIONS, LOOP_CONVERGENCE_THRESHOLD, LOOP_TOKEN_BUDGET and LOOP_TIME_BUDGET_SEC."""
+    return {
+        "max_iterations": int(os.getenv("LOOP_MAX_ITERATIONS", DEFAULT_MAX_ITERATIONS)),
+        "convergence_threshold": float(os.getenv("LOOP_CONVERGENCE_THRESHOLD", DEFAULT_CONVERGENCE_THRESHOLD)),
+        "token_budget": int(os.getenv("LOOP_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)),
+        "time_budget_sec": float(os.getenv("LOOP_TIME_BUDGET_SEC", DEFAULT_TIME_BUDGET_SEC)),
+    }
@@ -0,0 +1,309 @@
+"""
+Generation cache for bargaining dialogues.
+
+Requests are normalised into (produce, quantity band, price band) buckets. The
+first dialogue generated for a bucket is stored as a template in which every
+quantity and rupee amount is expressed relative to the request's quantity and
+price; a later request in the same bucket gets that dialogue back with its own
+numbers substituted, so the user's exact quantity and price appear and the
+middleman's offers keep the same proportions. Templates live in an in-memory
+LRU with a TTL, backed by SQLite so they survive restarts.
+"""
+import json
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SEC = 7 * 24 * 3600
+# Outside the working directory, so importing the agent (e.g. the ADK app scanning agents) writes nothing there
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "loop_dialogue_cache.db")
+
+# Canonical produce name -> spellings farmers use
+PRODUCE = {
+    "onion": ("onion", "onions", "pyaz", "pyaaz", "kanda", "eerulli"),
+    "tomato": ("tomato", "tomatoes", "tamatar", "tamata"),
+    "potato": ("potato", "potatoes", "aloo", "alu", "batata"),
+    "wheat": ("wheat", "gehun", "gehu", "godhi"),
+    "rice": ("rice", "paddy", "dhan", "dhaan", "chawal", "bhatta"),
+    "maize": ("maize", "corn", "makka", "makkai", "jola"),
+    "cotton": ("cotton", "kapas", "hatti"),
+    "soybean": ("soybean", "soybeans", "soya"),
+    "sugarcane": ("sugarcane", "ganna", "kabbu"),
+    "chilli": ("chilli", "chillies", "chili", "mirchi", "menasinakayi"),
+    "groundnut": ("groundnut", "groundnuts", "peanut", "peanuts", "moongphali", "shenga"),
+    "banana": ("banana", "bananas", "kela", "bale"),
+    "mango": ("mango", "mangoes", "aam", "mavu"),
+    "cabbage": ("cabbage", "patta gobhi", "kosu"),
+    "cauliflower": ("cauliflower", "gobhi", "gobi"),
+    "brinjal": ("brinjal", "eggplant", "baingan", "badane"),
+    "turmeric": ("turmeric", "haldi", "arishina"),
+    "garlic": ("garlic", "lahsun", "bellulli"),
+}
+_PRODUCE_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted((re.escape(name) for names in PRODUCE.values() for name in names), key=len, reverse=True)) + r")\b"
+)
+_CANONICAL = {name: canonical for canonical, names in PRODUCE.items() for name in names}
+
+_NUMBER = r"(\d[\d,]*(?:\.\d+)?)"
+_KG_PER_UNIT = {"kg": 1, "kgs": 1, "kilo": 1, "kilos": 1, "kilogram": 1, "kilograms": 1,
+                "quintal": 100, "quintals": 100, "qtl": 100, "tonne": 1000, "tonnes": 1000, "ton": 1000, "tons": 1000}
+_UNIT = r"(kgs?|kilos?|kilograms?|quintals?|qtl|tonnes?|tons?)\b"
+_QUANTITY = re.compile(_NUMBER + r"\s*" + _UNIT)
+_PRICE = re.compile(
+    r"(?:rs\.?|₹|inr)\s*" + _NUMBER + r"|" + _NUMBER + r"\s*(?:rs\b|rupees?\b|₹)"
+)
+_PER_UNIT = re.compile(r"^\s*(?:/|per|a|each)\s*" + _UNIT, re.IGNORECASE)
+
+# Quantity bands in kg: small lot, cart, tractor, truck, bulk
+QUANTITY_BANDS = (50, 200, 1000, 5000, 20000)
+# Prices in the same band differ by less than this factor
+PRICE_BAND_RATIO = 1.5
+
+DialogueRequest = namedtuple("DialogueRequest", ["produce", "quantity_kg", "price_per_kg"])
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def parse_request(text: str):
+    """
+    Extract produce, quantity (kg) and market price (Rs/kg) from a request.
+
+    Returns:
+        A DialogueRequest, or None if any of the three is missing.
+    """
+    text = (text or "").casefold()
+    produce = _PRODUCE_PATTERN.search(text)
+    quantity = _QUANTITY.search(text)
+    price = _PRICE.search(text)
+    if not (produce and quantity and price):
+        return None
+
+    quantity_kg = _number(quantity.group(1)) * _KG_PER_UNIT[quantity.group(2)]
+    price_value = _number(price.group(1) or price.group(2))
+    per_unit = _PER_UNIT.match(text[price.end():])
+    price_per_kg = price_value / _KG_PER_UNIT[per_unit.group(1)] if per_unit else price_value
+    if quantity_kg <= 0 or price_per_kg <= 0:
+        return None
+    return DialogueRequest(_CANONICAL[produce.group(1)], quantity_kg, price_per_kg)
+
+
+def bucket_key(request: DialogueRequest) -> str:
+    quantity_band = sum(request.quantity_kg >= bound for bound in QUANTITY_BANDS)
+    price_band = math.floor(math.log(request.price_per_kg) / math.log(PRICE_BAND_RATIO))
+    return f"{request.produce}|q{quantity_band}|p{price_band}"
+
+
+# Amount in a template: ⟦kind:ratio⟧ with kind q (kg), p (Rs per kg) or t (Rs total)
+_PLACEHOLDER = re.compile(r"⟦([qpt]):([0-9.]+)⟧")
+_AMOUNT = re.compile(r"(?<![\w.])" + _NUMBER + r"(?![\w])")
+_MONEY_BEFORE = re.compile(r"(?:rs\.?|₹|inr)\s*$", re.IGNORECASE)
+_MONEY_AFTER = re.compile(r"^\s*(?:rs\b|rupees?\b|₹)", re.IGNORECASE)
+_UNIT_AFTER = re.compile(r"^\s*" + _UNIT, re.IGNORECASE)
+
+
+def make_template(dialogue: str, request: DialogueRequest) -> str:
+    """
+    Replace quantities and rupee amounts in a dialogue with placeholders.
+
+    Each amount is stored as a ratio to the request's quantity, price or lot
+    total, which holds whatever unit the dialogue wrote it in (kg or quintal,
+    per kg or per quintal). Other numbers (days, percentages) stay as they are.
+    """
+    total = request.quantity_kg * request.price_per_kg
+
+    def placeholder(match):
+        value = _number(match.group(1))
+        before, after = dialogue[max(0, match.start() - 8):match.start()], dialogue[match.end():match.end() + 16]
+        money_after = _MONEY_AFTER.match(after)
+        if _MONEY_BEFORE.search(before) or money_after:
+            per_unit = _PER_UNIT.match(after[money_after.end():] if money_after else after)
+            # Unlabelled amounts near the market price are per-kg prices, larger ones are lot totals
+            if per_unit or value <= request.price_per_kg * 5:
+                return f"⟦p:{value / request.price_per_kg:.6f}⟧"
+            return f"⟦t:{value / total:.6f}⟧"
+        if _UNIT_AFTER.match(after):
+            return f"⟦q:{value / request.quantity_kg:.6f}⟧"
+        return match.group(0)
+
+    return _AMOUNT.sub(placeholder, dialogue)
+
+
+def _format(value: float) -> str:
+    value = round(value, 2)
+    if value >= 100 or value == int(value):
+        return f"{round(value):,}"
+    return f"{value:.1f}" if value >= 10 else f"{value:.2f}"
+
+
+def render(template: str, request: DialogueRequest) -> str:
+    """Fill a template's placeholders with amounts scaled to the request."""
+    bases = {"q": request.quantity_kg, "p": request.price_per_kg, "t": request.quantity_kg * request.price_per_kg}
+
+    def amount(match):
+        kind, ratio = match.group(1), float(match.group(2))
+        # Ratio 1 is the user's own number: reproduce it exactly
+        return _format(bases[kind] if abs(ratio - 1) < 1e-6 else bases[kind] * ratio)
+
+    return _PLACEHOLDER.sub(amount, template)
+
+
+class DialogueCache:
+    """
+    Bucket -> (template, source request) store: an LRU with TTL in memory, backed by SQLite.
+
+    The database is opened on first use, not when the cache is built.
+
+    Args:
+        db_path: SQLite file; entries there outlive the process and are loaded on demand.
+        max_entries: Max templates kept in memory.
+        ttl_sec: Age after which a template is regenerated.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_sec: float = DEFAULT_TTL_SEC):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"hits": 0, "misses": 0, "uncacheable": 0, "stores": 0}
+        # SQLite connections must not be shared with forked workers
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers hold self._lock
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dialogues ("
+                " bucket TEXT PRIMARY KEY, template TEXT NOT NULL, request TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, bucket: str):
+        """Return the template for a bucket, or None if absent or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(bucket)
+            if entry is None:
+                row = self._connection().execute(
+                    "SELECT template, created_at FROM dialogues WHERE bucket = ?", (bucket,)
+                ).fetchone()
+                entry = tuple(row) if row else None
+            if entry is None or now - entry[1] > self.ttl_sec:
+                self._memory.pop(bucket, None)
+                self.stats["misses"] += 1
+                return None
+            self._remember(bucket, entry)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, bucket: str, template: str, request: DialogueRequest):
+        created_at = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO dialogues (bucket, template, request, created_at) VALUES (?, ?, ?, ?)",
+                (bucket, template, json.dumps(request._asdict()), created_at),
+            )
+            # Expired rows are only ever replaced, so prune them while writing
+            conn.execute("DELETE FROM dialogues WHERE created_at < ?", (created_at - self.ttl_sec,))
+            conn.commit()
+            self._remember(bucket, (template, created_at))
+            self.stats["stores"] += 1
+
+    def _remember(self, bucket: str, entry: tuple):
+        self._memory[bucket] = entry
+        self._memory.move_to_end(bucket)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+class DialogueCacheAgent(BaseAgent):
+    """
+    Serves a cached dialogue for the request's bucket, or runs the pipeline and caches its result.
+
+    Requests without a recognisable produce, quantity and price always run the
+    pipeline and are not cached.
+    """
+
+    pipeline: BaseAgent
+    cache: DialogueCache
+    document_key: str
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name: str, pipeline: BaseAgent, cache: DialogueCache, document_key: str):
+        super().__init__(
+            name=name,
+            description=pipeline.description,
+            pipeline=pipeline,
+            cache=cache,
+            document_key=document_key,
+            sub_agents=[pipeline],
+        )
+
+    def _reply(self, ctx: InvocationContext, dialogue: str) -> Event:
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(role="model", parts=[types.Part(text=dialogue)]),
+            actions=EventActions(state_delta={self.document_key: dialogue}),
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        text = " ".join(part.text for part in (ctx.user_content.parts or []) if part.text) if ctx.user_content else ""
+        request = parse_request(text)
+        bucket = bucket_key(request) if request else None
+
+        template = self.cache.get(bucket) if bucket else None
+        if template is not None:
+            log.info("dialogue_cache.hit", agent=self.name, bucket=bucket)
+            yield self._reply(ctx, render(template, request))
+            return
+        if bucket is None:
+            self.cache.stats["uncacheable"] += 1
+
+        async for event in self.pipeline.run_async(ctx):
+            yield event
+
+        dialogue = ctx.session.state.get(self.document_key)
+        if not dialogue:
+            return
+        if bucket is not None:
+            self.cache.put(bucket, make_template(dialogue, request), request)
+            log.info("dialogue_cache.stored", agent=self.name, bucket=bucket)
+        # Patch refinements only update state, so always finish with the finished dialogue itself
+        yield self._reply(ctx, dialogue)
+
+
+def cache_from_env() -> DialogueCache:
+    """DialogueCache from LOOP_DIALOGUE_CACHE_PATH, LOOP_DIALOGUE_CACHE_SIZE and LOOP_DIALOGUE_CACHE_TTL_SEC."""
+    return DialogueCache(
+        os.getenv("LOOP_DIALOGUE_CACHE_PATH", DEFAULT_DB_PATH),
+        max_entries=int(os.getenv("LOOP_DIALOGUE_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+        ttl_sec=float(os.getenv("LOOP_DIALOGUE_CACHE_TTL_SEC", DEFAULT_TTL_SEC)),
+    )
@@ -0,0 +1,70 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class LineEdit(BaseModel):
+    op: Literal["replace", "insert", "delete"]
+    start: int = Field(
+        description="1-based line number; for insert, the line to insert after (0 = top). "
+        "Several inserts after the same line are applied in list order."
+    )
+    end: Optional[int] = Field(default=None, description="Last line of a replace/delete range; defaults to start.")
+    text: str = Field(default="", description="New lines for replace/insert, separated by newlines.")
+
+
+class EditPlan(BaseModel):
+    edits: list[LineEdit] = Field(
+        description="Edits numbered against the original document. Replace/delete ranges must not "
+        "overlap each other or cover the line an insert goes after."
+    )
+
+
+class PatchError(ValueError):
+    """The edits do not apply cleanly to the document."""
+
+
+def numbered(document: str) -> str:
+    """Render the document with 1-based line numbers for the patch refiner."""
+    return "\n".join(f"{number}: {line}" for number, line in enumerate(document.splitlines(), start=1))
+
+
+def apply_edits(document: str, edits: list) -> str:
+    """
+    Apply line edits, all numbered against the original document.
+
+    Inserts after the same line keep their order in `edits`.
+
+    Raises:
+        PatchError: If a line number is out of range or two edits overlap.
+    """
+    lines = document.splitlines()
+    spans = []
+    for edit in edits:
+        edit = edit if isinstance(edit, LineEdit) else LineEdit.model_validate(edit)
+        if edit.op == "insert":
+            if not 0 <= edit.start <= len(lines):
+                raise PatchError(f"insert after line {edit.start} is outside 0..{len(lines)}")
+            # An insert occupies the gap after `start`, which no replace/delete range covers
+            spans.append((edit.start + 0.5, edit.start + 0.5, edit))
+        else:
+            end = edit.start if edit.end is None else edit.end
+            if not 1 <= edit.start <= end <= len(lines):
+                raise PatchError(f"{edit.op} of lines {edit.start}-{end} is outside 1..{len(lines)}")
+            spans.append((edit.start, end, edit))
+
+    spans.sort(key=lambda span: (span[0], span[1]))
+    for (previous_start, previous_end, previous), (start, _, edit) in zip(spans, spans[1:]):
+        if previous.op == edit.op == "insert" and previous_start == start:
+            continue
+        if start <= previous_end:
+            raise PatchError(f"edits overlap at line {int(start)}")
+
+    # Apply bottom-up so earlier line numbers stay valid
+    for start, end, edit in reversed(spans):
+        new_lines = edit.text.splitlines() if edit.op != "delete" else []
+        if edit.op == "insert":
+            lines[int(start):int(start)] = new_lines
+        else:
+            lines[start - 1:end] = new_lines
+    return "\n".join(lines)
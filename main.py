@@ -1,8 +1,13 @@
 import os
 
+# Imported first so startup time is measured from the top of main.py
+from serving import add_health_routes, start_warm_up
+
 import uvicorn
 from google.adk.cli.fast_api import get_fast_api_app
-from google.adk.sessions import InMemorySessionService
+
+from session_service import session_service_uri, start_session_janitor
+from telemetry import add_metrics_route, configure_logging, configure_tracing
 
 # Get the directory where main.py is located
 AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,16 +16,34 @@ AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
 ALLOWED_ORIGINS = ["http://localhost", "http://localhost:8080", "*"]
 # Set web=True if you intend to serve a web interface, False otherwise
 SERVE_WEB_INTERFACE = True
+# SQLite by default; set SESSION_SERVICE_URI to a database URL in production (see session_service.py)
+SESSION_SERVICE_URI = session_service_uri()
+
+# JSON logs through a background writer (LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE_EVERY; see telemetry/logs.py)
+configure_logging()
+# Export spans per TELEMETRY_TRACE_EXPORTER; set up before the app so ADK finds the tracer provider
+configure_tracing()
 
 # Call the function to get the FastAPI app instance
 # Ensure the agent directory name ('capital_agent') matches your agent folder
 app = get_fast_api_app(
     agents_dir=AGENT_DIR,
-    session_service_uri=InMemorySessionService(),
+    session_service_uri=SESSION_SERVICE_URI,
     allow_origins=ALLOWED_ORIGINS,
     web=SERVE_WEB_INTERFACE,
 )
 
+# Evict idle sessions and bound per-session event history in the session database
+session_janitor = start_session_janitor(SESSION_SERVICE_URI)
+
+# /healthz and /readyz; readiness goes green once agents and the price cache are warm.
+# gunicorn.conf.py sets WARM_UP_BLOCKING so the master warms up before forking workers.
+add_health_routes(app)
+# Prometheus histograms for delegation, model calls, tools and price/Firestore stages;
+# ADK adds its own agent, model and tool spans around them
+add_metrics_route(app)
+start_warm_up(blocking=os.environ.get("WARM_UP_BLOCKING") == "1")
+
 # You can add more FastAPI routes or configurations below if needed
 # Example:
 # @app.get("/hello")
@@ -29,4 +52,10 @@ app = get_fast_api_app(
 
 if __name__ == "__main__":
     # Use the PORT environment variable provided by Cloud Run, defaulting to 8080
-    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
\ No newline at end of file
+    port = int(os.environ.get("PORT", 8080))
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    if workers > 1:
+        # uvicorn spawns fresh interpreters; use gunicorn.conf.py to share preloaded memory instead
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
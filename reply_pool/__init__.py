@@ -0,0 +1,8 @@
+from .pool import ReplyPool, get_reply_pool, greeting_reply, mood_reply
+
+__all__ = [
+    "ReplyPool",
+    "get_reply_pool",
+    "greeting_reply",
+    "mood_reply",
+]
@@ -0,0 +1,72 @@
+import re
+
+
+# --- Lexicons (English, Hindi and Kannada, in script and common transliterations) ---
+
+GREETINGS = {
+    "hi", "hii", "hello", "helo", "hey", "good morning", "good afternoon", "good evening",
+    "namaste", "namaskar", "namaskaar", "namaskara", "pranam", "ram ram", "jai kisan",
+    "नमस्ते", "नमस्कार", "प्रणाम", "राम राम", "जय किसान",
+    "ನಮಸ್ಕಾರ", "ನಮಸ್ತೆ", "ಹಲೋ",
+}
+
+# Longest message that can still be only greetings, e.g. "hello hello namaste ji"
+GREETING_MAX_TOKENS = 4
+
+# Politeness words that do not change the intent of a short message
+FILLERS = {"ji", "sir", "madam", "bhai", "bhaiya", "anna", "akka", "there", "जी", "भाई", "ಅಣ್ಣ", "ಸರ್"}
+
+MOODS = {
+    "stressed": "stressed", "stress": "stressed", "tension": "stressed", "pareshan": "stressed",
+    "chinta": "stressed", "ottada": "stressed", "chinte": "stressed",
+    "परेशान": "stressed", "चिंता": "stressed", "तनाव": "stressed", "ಒತ್ತಡ": "stressed", "ಚಿಂತೆ": "stressed",
+    "hopeful": "hopeful", "ummeed": "hopeful", "umeed": "hopeful", "asha": "hopeful", "bharavase": "hopeful",
+    "उम्मीद": "hopeful", "आशा": "hopeful", "ಭರವಸೆ": "hopeful", "ಆಶೆ": "hopeful",
+    "neutral": "neutral", "theek": "neutral", "thik": "neutral", "normal": "neutral", "paravagilla": "neutral",
+    "ठीक": "neutral", "ठीक हूं": "neutral", "ठीक हूँ": "neutral", "ಪರವಾಗಿಲ್ಲ": "neutral", "ಸಾಮಾನ್ಯ": "neutral",
+}
+
+# Transliterated words that tell us the user is writing Hindi or Kannada in Latin script
+TRANSLITERATED = {
+    "namaste": "hi", "namaskar": "hi", "namaskaar": "hi", "pranam": "hi", "ram": "hi", "ji": "hi", "bhai": "hi",
+    "bhaiya": "hi", "pareshan": "hi", "chinta": "hi", "ummeed": "hi", "umeed": "hi", "asha": "hi", "theek": "hi",
+    "thik": "hi", "bhav": "hi", "bhaav": "hi", "daam": "hi", "kimat": "hi", "keemat": "hi",
+    "namaskara": "kn", "anna": "kn", "akka": "kn", "ottada": "kn", "chinte": "kn", "bharavase": "kn",
+    "paravagilla": "kn", "bele": "kn", "dhara": "kn",
+}
+
+# Punctuation only; \W would also strip Devanagari and Kannada vowel signs
+_PUNCTUATION = re.compile(r"[!?.,;:।॥|'\"()\[\]{}\-_/\\*~]+")
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+_KANNADA = re.compile(r"[ಀ-೿]")
+
+
+def tokenize(text: str) -> list:
+    """Casefold a message and split it into words, dropping punctuation."""
+    return _PUNCTUATION.sub(" ", text.casefold()).split()
+
+
+def detect_language(text: str) -> str:
+    """Return "hi", "kn" or "en" from the script, or from transliterated words for Latin text."""
+    if _KANNADA.search(text):
+        return "kn"
+    if _DEVANAGARI.search(text):
+        return "hi"
+    for token in tokenize(text):
+        if token in TRANSLITERATED:
+            return TRANSLITERATED[token]
+    return "en"
+
+
+def mood_of(text: str):
+    """Return "stressed", "hopeful" or "neutral" if the message is just a mood word, else None."""
+    tokens = [token for token in tokenize(text) if token not in FILLERS]
+    return MOODS.get(" ".join(tokens))
+
+
+def is_greeting(text: str) -> bool:
+    """Return True if the message is just a greeting, e.g. "namaste ji" but not "hello, onion price?"."""
+    tokens = [token for token in tokenize(text) if token not in FILLERS]
+    if " ".join(tokens) in GREETINGS:
+        return True
+    return bool(tokens) and len(tokens) <= GREETING_MAX_TOKENS and all(token in GREETINGS for token in tokens)
@@ -0,0 +1,117 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from telemetry import get_logger
+
+from .lexicon import detect_language, is_greeting, mood_of
+
+log = get_logger(__name__)
+
+
+DEFAULT_POOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replies.json")
+# How often to look for a pool file rewritten by the offline refresh
+RELOAD_CHECK_SEC = 30
+
+
+class ReplyPool:
+    """
+    Pre-generated replies per intent and language, served without a model call.
+
+    The pool is a JSON file of {intent: {language: [reply, ...]}}. It is
+    re-read when its mtime changes, so the offline refresh (refresh.py) can
+    replace it under a running server.
+    """
+
+    def __init__(self, path: str = DEFAULT_POOL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._replies = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self.hits = {}
+        self.misses = 0
+        self._reload()
+
+    def pick(self, intent: str, language: str) -> Optional[str]:
+        """
+        Return a random reply for the intent and language, or None if the pool has none.
+        """
+        if time.monotonic() - self._checked_at >= RELOAD_CHECK_SEC:
+            self._reload()
+
+        replies = self._replies.get(intent, {}).get(language)
+        with self._lock:
+            if not replies:
+                self.misses += 1
+                return None
+            key = f"{intent}/{language}"
+            self.hits[key] = self.hits.get(key, 0) + 1
+        return random.choice(replies)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hit_count = sum(self.hits.values())
+            total = hit_count + self.misses
+            return {"hits": dict(self.hits), "misses": self.misses, "hit_rate": hit_count / total if total else 0.0}
+
+    def _reload(self):
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime:
+                return
+            with open(self.path, encoding="utf-8") as pool_file:
+                self._replies = json.load(pool_file)
+            self._mtime = mtime
+        except (OSError, ValueError) as e:
+            # Keep serving the previous pool; an empty pool just sends everything to the model
+            log.warning("reply_pool.load_failed", path=self.path, error=str(e))
+
+
+_reply_pool = None
+_reply_pool_lock = threading.Lock()
+
+
+def get_reply_pool() -> ReplyPool:
+    """Return the process-wide reply pool (REPLY_POOL_PATH overrides the bundled replies.json)."""
+    global _reply_pool
+    if _reply_pool is None:
+        with _reply_pool_lock:
+            if _reply_pool is None:
+                _reply_pool = ReplyPool(os.getenv("REPLY_POOL_PATH", DEFAULT_POOL_PATH))
+    return _reply_pool
+
+
+def _user_text(callback_context: CallbackContext) -> str:
+    content = callback_context.user_content
+    if content is None or not content.parts:
+        return ""
+    return " ".join(part.text for part in content.parts if part.text)
+
+
+def _reply(text: Optional[str]) -> Optional[types.Content]:
+    return types.Content(role="model", parts=[types.Part(text=text)]) if text else None
+
+
+def greeting_reply(callback_context: CallbackContext) -> Optional[types.Content]:
+    """before_agent_callback for greetor: answer a bare greeting from the pool, or return None to call the model."""
+    text = _user_text(callback_context)
+    if not is_greeting(text):
+        return None
+    return _reply(get_reply_pool().pick("greeting", detect_language(text)))
+
+
+def mood_reply(callback_context: CallbackContext) -> Optional[types.Content]:
+    """before_agent_callback for farmer_agent: answer a one-word mood from the pool, or return None to call the model."""
+    text = _user_text(callback_context)
+    mood = mood_of(text)
+    if mood is None:
+        return None
+    return _reply(get_reply_pool().pick(mood, detect_language(text)))
@@ -0,0 +1,84 @@
+"""
+Offline refresh of the reply pool.
+
+Generates a batch of new replies per intent and language with one model call
+each, merges them with the current pool and atomically rewrites the pool file.
+Running servers pick the new file up within RELOAD_CHECK_SEC.
+
+Usage:
+    python -m reply_pool.refresh [replies_per_bucket]
+"""
+import json
+import os
+import sys
+import tempfile
+
+from google import genai
+from google.genai import types
+
+from .pool import DEFAULT_POOL_PATH
+
+
+MODEL = "gemini-2.0-flash"
+LANGUAGES = {"en": "English", "hi": "Hindi (Devanagari script)", "kn": "Kannada (Kannada script)"}
+MAX_REPLIES_PER_BUCKET = 30
+
+# Same rules the live agents follow, so pooled replies are interchangeable with model replies
+INTENT_INSTRUCTIONS = {
+    "greeting": "Greet a farmer who just opened a farming assistant that can check mandi crop prices, "
+                "diagnose crop diseases from a photo and offer a friendly ear. Mention what it can help with.",
+    "stressed": "The farmer says they feel stressed. Reply with a single, practical mental-health resource "
+                "(for example Tele-MANAS 14416 or the Kisan Call Centre 1800-180-1551, or a short tip) "
+                "and a sentence of encouragement.",
+    "hopeful": "The farmer says they feel hopeful. Reply with a quick, upbeat pick-me-up.",
+    "neutral": "The farmer says they feel neutral. Reply with a light, friendly check-in question.",
+}
+
+
+def generate(client, intent: str, language: str, count: int) -> list:
+    """Ask the model for `count` varied replies for one intent and language."""
+    prompt = (
+        f"{INTENT_INSTRUCTIONS[intent]}\n"
+        f"Write {count} different replies in {LANGUAGES[language]}. "
+        "Keep each to one or two short sentences, warm and neighborly, never clinical. "
+        "Return a JSON array of strings only."
+    )
+    response = client.models.generate_content(
+        model=MODEL,
+        contents=prompt,
+        config=types.GenerateContentConfig(response_mime_type="application/json", temperature=1.0),
+    )
+    replies = json.loads(response.text)
+    return [reply.strip() for reply in replies if isinstance(reply, str) and reply.strip()]
+
+
+def refresh(path: str = DEFAULT_POOL_PATH, count: int = 10):
+    client = genai.Client(
+        vertexai=True,
+        project=os.getenv("GOOGLE_CLOUD_PROJECT"),
+        location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
+    )
+    with open(path, encoding="utf-8") as pool_file:
+        pool = json.load(pool_file)
+
+    for intent in INTENT_INSTRUCTIONS:
+        for language in LANGUAGES:
+            try:
+                fresh = generate(client, intent, language, count)
+            except Exception as e:
+                print(f"Skipping {intent}/{language}: {e}")
+                continue
+            current = pool.setdefault(intent, {}).get(language, [])
+            # Newest first, de-duplicated, capped so the pool keeps rotating
+            merged = list(dict.fromkeys(fresh + current))[:MAX_REPLIES_PER_BUCKET]
+            pool[intent][language] = merged
+            print(f"{intent}/{language}: {len(fresh)} generated, {len(merged)} in pool")
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+        json.dump(pool, tmp_file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    refresh(os.getenv("REPLY_POOL_PATH", DEFAULT_POOL_PATH), int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,71 @@
+"""
+Startup warm-up and health endpoints for the ADK FastAPI app.
+
+warm_up() imports the agent packages and loads the crop price snapshot. Under
+gunicorn with preload_app (see gunicorn.conf.py) it runs once in the master
+before the workers fork, so every worker starts ready and shares the loaded
+pages copy-on-write. Cloud clients (Firestore, GCS, HTTP pools) are created
+lazily and are reset in forked children.
+
+/healthz reports liveness; /readyz returns 503 until warm_up() has finished,
+together with the measured startup timings.
+"""
+import os
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+# Taken when this module is first imported, i.e. at the very start of main.py
+PROCESS_STARTED = time.perf_counter()
+
+_ready = threading.Event()
+_timings = {}
+
+
+def warm_up():
+    """Import every agent and load the crop price snapshot, then mark the app ready."""
+    started = time.perf_counter()
+    try:
+        import coordinator_agent  # noqa: F401  (imports all sub-agents)
+        _timings["agents_import_sec"] = round(time.perf_counter() - started, 3)
+
+        from cropprice_agent.price_cache import get_price_cache
+        price_started = time.perf_counter()
+        snapshot = get_price_cache().get_snapshot()
+        _timings["price_cache_sec"] = round(time.perf_counter() - price_started, 3)
+        _timings["price_records"] = len(snapshot) if snapshot is not None else 0
+    except Exception as e:
+        # The price tool falls back to the API, so a cold cache must not keep the app out of rotation
+        log.exception("app.warm_up_failed", error=str(e))
+    _timings["warm_up_sec"] = round(time.perf_counter() - started, 3)
+    _timings["startup_sec"] = round(time.perf_counter() - PROCESS_STARTED, 3)
+    _ready.set()
+    log.info("app.ready", **_timings)
+
+
+def start_warm_up(blocking: bool):
+    """Warm up in the calling thread, or in a background thread so the server can start answering /healthz."""
+    if blocking:
+        warm_up()
+    else:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def add_health_routes(app: FastAPI):
+    """Register /healthz and /readyz on the app."""
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok", "pid": os.getpid()}
+
+    @app.get("/readyz")
+    async def readyz():
+        if not _ready.is_set():
+            return JSONResponse({"status": "warming_up"}, status_code=503)
+        return {"status": "ready", "pid": os.getpid(), **_timings}
@@ -0,0 +1,217 @@
+"""
+Session storage for the ADK FastAPI app.
+
+get_fast_api_app builds its session service from a URI: a database URL gives a
+DatabaseSessionService (SQLite locally, Postgres/MySQL/Cloud SQL in production)
+so sessions survive restarts and are shared by every worker and instance,
+"agentengine://<id>" uses Vertex AI Agent Engine, and "memory" keeps the old
+per-process InMemorySessionService. A plain "sqlite:///<path>" URL is served by
+ADK's SqliteSessionService, which stores times as REAL epoch seconds; every
+other database URL goes through DatabaseSessionService and DATETIME columns.
+
+SessionJanitor keeps the database bounded: it drops sessions idle for longer
+than SESSION_TTL_SEC and trims every session to its SESSION_MAX_EVENTS most
+recent events.
+
+Load test:
+    python session_service.py [sessions] [events_per_session]
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+from sqlalchemy import create_engine, text
+
+from telemetry import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_SESSION_URI = "sqlite:///./adk_sessions.db"
+DEFAULT_SESSION_TTL_SEC = 7 * 24 * 3600
+DEFAULT_MAX_EVENTS = 200
+DEFAULT_JANITOR_INTERVAL_SEC = 300
+
+# Table names used by google.adk.sessions.DatabaseSessionService
+SESSIONS_TABLE = "sessions"
+EVENTS_TABLE = "events"
+
+
+def session_service_uri():
+    """
+    Return the session service URI for get_fast_api_app from SESSION_SERVICE_URI.
+
+    "memory" maps to "memory://", ADK's InMemorySessionService. None would not do:
+    get_fast_api_app treats it as per-agent local SQLite.
+    """
+    uri = os.getenv("SESSION_SERVICE_URI", DEFAULT_SESSION_URI)
+    return "memory://" if uri == "memory" else uri
+
+
+def _stores_epoch_seconds(uri: str) -> bool:
+    # ADK registers the bare "sqlite" scheme to SqliteSessionService (REAL update_time/timestamp);
+    # "sqlite+aiosqlite" and server databases fall back to DatabaseSessionService (DATETIME)
+    return urlparse(uri).scheme == "sqlite"
+
+
+def _sync_url(uri: str) -> str:
+    # The janitor runs in a plain thread, so swap async drivers for their sync counterparts
+    return uri.replace("+aiosqlite", "").replace("+asyncpg", "").replace("+aiomysql", "+pymysql")
+
+
+class SessionJanitor:
+    """
+    Periodically evicts idle sessions and trims per-session event history in the session database.
+
+    Args:
+        db_url: The database URL the session service uses.
+        ttl_sec: Sessions not updated for this long are deleted with their events.
+        max_events: Most recent events kept per session.
+        interval_sec: Seconds between sweeps.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        ttl_sec: float = DEFAULT_SESSION_TTL_SEC,
+        max_events: int = DEFAULT_MAX_EVENTS,
+        interval_sec: float = DEFAULT_JANITOR_INTERVAL_SEC,
+    ):
+        self.engine = create_engine(_sync_url(db_url))
+        self.epoch_seconds = _stores_epoch_seconds(db_url)
+        self.ttl_sec = ttl_sec
+        self.max_events = max_events
+        self.interval_sec = interval_sec
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep(self) -> dict:
+        """
+        Run one eviction and trimming pass.
+
+        Returns:
+            The number of deleted sessions and events.
+        """
+        # The cutoff must have the column's type: SQLite orders every REAL before every TEXT,
+        # so a datetime bound against epoch seconds would match (and delete) every session
+        if self.epoch_seconds:
+            cutoff = time.time() - self.ttl_sec
+        else:
+            cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=self.ttl_sec)
+        with self.engine.begin() as conn:
+            expired_events = conn.execute(text(
+                f"DELETE FROM {EVENTS_TABLE} WHERE EXISTS ("
+                f" SELECT 1 FROM {SESSIONS_TABLE} s WHERE s.app_name = {EVENTS_TABLE}.app_name"
+                f" AND s.user_id = {EVENTS_TABLE}.user_id AND s.id = {EVENTS_TABLE}.session_id"
+                f" AND s.update_time < :cutoff)"
+            ), {"cutoff": cutoff}).rowcount
+            expired_sessions = conn.execute(
+                text(f"DELETE FROM {SESSIONS_TABLE} WHERE update_time < :cutoff"), {"cutoff": cutoff}
+            ).rowcount
+            trimmed_events = conn.execute(text(
+                f"DELETE FROM {EVENTS_TABLE} WHERE id IN ("
+                f" SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+                f"  PARTITION BY app_name, user_id, session_id ORDER BY timestamp DESC) AS position"
+                f"  FROM {EVENTS_TABLE}) ranked"
+                f" WHERE ranked.position > :max_events)"
+            ), {"max_events": self.max_events}).rowcount
+        return {
+            "expired_sessions": expired_sessions,
+            "expired_events": expired_events,
+            "trimmed_events": trimmed_events,
+        }
+
+    def start(self):
+        """Start sweeping in a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="session-janitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            try:
+                result = self.sweep()
+                if any(result.values()):
+                    log.info("session_janitor.swept", **result)
+            except Exception as e:
+                # Tables are created lazily by ADK, so the first sweeps may find nothing to clean
+                log.warning("session_janitor.sweep_failed", error=str(e))
+
+
+def start_session_janitor(uri: str):
+    """
+    Start a SessionJanitor for database-backed session URIs.
+
+    SESSION_TTL_SEC, SESSION_MAX_EVENTS and SESSION_JANITOR_INTERVAL_SEC tune it.
+
+    Returns:
+        The running janitor, or None if the URI is not a database URL.
+    """
+    if not uri or uri.startswith(("agentengine://", "memory://")) or uri.rstrip("/") == "sqlite:":
+        return None
+    janitor = SessionJanitor(
+        uri,
+        ttl_sec=float(os.getenv("SESSION_TTL_SEC", DEFAULT_SESSION_TTL_SEC)),
+        max_events=int(os.getenv("SESSION_MAX_EVENTS", DEFAULT_MAX_EVENTS)),
+        interval_sec=float(os.getenv("SESSION_JANITOR_INTERVAL_SEC", DEFAULT_JANITOR_INTERVAL_SEC)),
+    )
+    janitor.start()
+    return janitor
+
+
+async def _load_test(session_service, sessions: int, events_per_session: int):
+    from google.adk.events import Event
+    from google.genai import types
+
+    started = time.perf_counter()
+    for _ in range(sessions):
+        session = await session_service.create_session(app_name="load_test", user_id=f"user-{uuid.uuid4().hex[:8]}")
+        for turn in range(events_per_session):
+            await session_service.append_event(session, Event(
+                author="user" if turn % 2 == 0 else "farming_coordinator",
+                invocation_id=f"e-{uuid.uuid4().hex}",
+                content=types.Content(role="user", parts=[types.Part(text="What is the onion price in Pune?")]),
+            ))
+    return time.perf_counter() - started
+
+
+def load_test(uri: str, sessions: int = 500, events_per_session: int = 10):
+    """Print sessions/sec and memory per session for the session service behind `uri`."""
+    from google.adk.sessions import DatabaseSessionService, InMemorySessionService
+    from google.adk.sessions.sqlite_session_service import SqliteSessionService
+
+    tracemalloc.start()
+    if uri.startswith("memory://"):
+        session_service = InMemorySessionService()
+    elif _stores_epoch_seconds(uri):
+        session_service = SqliteSessionService(db_path=urlparse(uri).path[1:])
+    else:
+        session_service = DatabaseSessionService(db_url=uri)
+    baseline = tracemalloc.get_traced_memory()[0]
+    elapsed = asyncio.run(_load_test(session_service, sessions, events_per_session))
+    in_process = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    print(f"backend: {uri}")
+    print(f"{sessions} sessions x {events_per_session} events in {elapsed:.2f} s: {sessions / elapsed:.1f} sessions/sec")
+    print(f"in-process memory per session: {in_process / sessions / 1024:.1f} KiB")
+    if uri.startswith("sqlite"):
+        db_path = uri.split(":///", 1)[1]
+        if os.path.exists(db_path):
+            print(f"database file size per session: {os.path.getsize(db_path) / sessions / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    load_test(
+        session_service_uri(),
+        sessions=int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        events_per_session=int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    )
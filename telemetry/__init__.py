@@ -0,0 +1,25 @@
+from .adk import instrument_agents
+from .logs import configure_logging, get_logger, redact
+from .metrics import DEFAULT_BUCKETS, REGISTRY, TOKEN_BUCKETS, Gauge, Histogram, Registry
+from .routes import add_metrics_route
+from .tracing import STAGE_METRIC, configure_tracing, get_tracer, observe_stage, timed, use_in_memory_exporter
+
+__all__ = [
+    "DEFAULT_BUCKETS",
+    "Gauge",
+    "Histogram",
+    "REGISTRY",
+    "Registry",
+    "STAGE_METRIC",
+    "TOKEN_BUCKETS",
+    "add_metrics_route",
+    "configure_logging",
+    "configure_tracing",
+    "get_logger",
+    "get_tracer",
+    "instrument_agents",
+    "observe_stage",
+    "redact",
+    "timed",
+    "use_in_memory_exporter",
+]
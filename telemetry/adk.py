@@ -0,0 +1,135 @@
+"""
+Latency and token metrics for ADK agents, attached as callbacks.
+
+ADK already emits invoke_agent, call_llm and execute_tool spans when a tracer
+provider is configured; these callbacks add the matching Prometheus
+histograms and tag the current span with the token counts, so the spans
+opened by telemetry.timed() inside tools nest under the tool call that ran
+them.
+"""
+import threading
+import time
+
+from .metrics import REGISTRY, TOKEN_BUCKETS
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+MODEL_LATENCY = REGISTRY.histogram("agent_model_call_duration_seconds", "Model call latency per agent in seconds.")
+MODEL_TOKENS = REGISTRY.histogram("agent_model_tokens", "Tokens per model call, by agent and direction.", TOKEN_BUCKETS)
+TOOL_LATENCY = REGISTRY.histogram("agent_tool_call_duration_seconds", "Tool call latency per agent and tool in seconds.")
+
+# Start times of calls in flight; bounded so calls that never complete cannot leak memory
+_MAX_IN_FLIGHT = 10000
+_started = {}
+_lock = threading.Lock()
+
+
+def _start(key):
+    with _lock:
+        if len(_started) >= _MAX_IN_FLIGHT:
+            _started.clear()
+        _started[key] = time.perf_counter()
+
+
+def _elapsed(key):
+    with _lock:
+        started = _started.pop(key, None)
+    return None if started is None else time.perf_counter() - started
+
+
+def _model_key(callback_context):
+    return "model", callback_context.invocation_id, callback_context.agent_name
+
+
+def _tool_key(tool_context):
+    return "tool", tool_context.invocation_id, tool_context.function_call_id
+
+
+def before_model(callback_context, llm_request):
+    _start(_model_key(callback_context))
+
+
+def after_model(callback_context, llm_response):
+    if llm_response.partial:
+        # Streaming chunk; the call is timed to its final response
+        return None
+    elapsed = _elapsed(_model_key(callback_context))
+    agent = callback_context.agent_name
+    if elapsed is not None:
+        MODEL_LATENCY.observe(elapsed, agent=agent, outcome="ok")
+    usage = llm_response.usage_metadata
+    if usage is not None:
+        input_tokens = usage.prompt_token_count or 0
+        output_tokens = usage.candidates_token_count or 0
+        MODEL_TOKENS.observe(input_tokens, agent=agent, direction="input")
+        MODEL_TOKENS.observe(output_tokens, agent=agent, direction="output")
+        if trace is not None:
+            span = trace.get_current_span()
+            span.set_attribute("farming.input_tokens", input_tokens)
+            span.set_attribute("farming.output_tokens", output_tokens)
+    return None
+
+
+def on_model_error(callback_context, llm_request, error):
+    elapsed = _elapsed(_model_key(callback_context))
+    if elapsed is not None:
+        MODEL_LATENCY.observe(elapsed, agent=callback_context.agent_name, outcome="error")
+    return None
+
+
+def before_tool(tool, args, tool_context):
+    _start(_tool_key(tool_context))
+
+
+def after_tool(tool, args, tool_context, tool_response):
+    elapsed = _elapsed(_tool_key(tool_context))
+    if elapsed is not None:
+        TOOL_LATENCY.observe(elapsed, agent=tool_context.agent_name, tool=tool.name, outcome="ok")
+    return None
+
+
+def on_tool_error(tool, args, tool_context, error):
+    elapsed = _elapsed(_tool_key(tool_context))
+    if elapsed is not None:
+        TOOL_LATENCY.observe(elapsed, agent=tool_context.agent_name, tool=tool.name, outcome="error")
+    return None
+
+
+def _as_list(callbacks) -> list:
+    if callbacks is None:
+        return []
+    return list(callbacks) if isinstance(callbacks, list) else [callbacks]
+
+
+def instrument_agents(root_agent):
+    """
+    Add the timing callbacks to every LlmAgent under root_agent (including itself).
+
+    Existing callbacks keep working: ADK stops a callback chain at the first
+    non-None result, so the "before" timers run last (a cached or short-circuited
+    call is never timed) and the "after"/error timers run first. Safe to call
+    more than once.
+    """
+    seen = set()
+    stack = [root_agent]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        stack.extend(agent.sub_agents)
+        if not hasattr(agent, "before_model_callback"):
+            continue
+        before_model_callbacks = _as_list(agent.before_model_callback)
+        if before_model in before_model_callbacks:
+            continue
+        agent.before_model_callback = before_model_callbacks + [before_model]
+        agent.after_model_callback = [after_model] + _as_list(agent.after_model_callback)
+        agent.on_model_error_callback = [on_model_error] + _as_list(agent.on_model_error_callback)
+        agent.before_tool_callback = _as_list(agent.before_tool_callback) + [before_tool]
+        agent.after_tool_callback = [after_tool] + _as_list(agent.after_tool_callback)
+        agent.on_tool_error_callback = [on_tool_error] + _as_list(agent.on_tool_error_callback)
+    return root_agent
@@ -0,0 +1,210 @@
+"""
+Structured, asynchronous logging.
+
+Loggers from get_logger() take an event name plus keyword fields:
+
+    log = get_logger(__name__)
+    log.info("price_api.response", records=len(records), sample=records[:2])
+
+The calling thread only redacts secrets and cuts every field down to a short
+repr (a 10,000-row list costs the same as a 5-row one); JSON encoding and the
+write to stdout happen on a QueueListener thread. High-frequency events can
+be sampled to one record in N, per call site or through LOG_SAMPLE_EVERY.
+
+Environment:
+    LOG_LEVEL: Root level, INFO by default.
+    LOG_LEVELS: Per-module levels, e.g. "cropprice_agent=WARNING,wildlife.agent=DEBUG".
+    LOG_FORMAT: "json" (default) or "text".
+    LOG_MAX_FIELD_CHARS: Longest rendered field or message, 500 by default.
+    LOG_SAMPLE_EVERY: Per-event sampling, e.g. "wildlife.detection=10".
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import reprlib
+import sys
+import threading
+import time
+
+DEFAULT_MAX_FIELD_CHARS = 500
+
+# Field names whose values are never logged
+_SECRET_KEY = re.compile(r"api[-_]?key|token|secret|passw(or)?d|authorization|credential", re.IGNORECASE)
+# Secrets embedded in free text, e.g. a query string carrying api-key=...
+_SECRET_IN_TEXT = re.compile(
+    r"((?:api[-_]?key|token|secret|password|authorization)['\"]?\s*[=:]\s*['\"]?)[^&'\"\s,}]+", re.IGNORECASE
+)
+_REDACTED = "***"
+
+# Keyword arguments that belong to logging itself rather than to the event
+_LOGGING_KWARGS = ("exc_info", "stack_info", "stacklevel", "extra")
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener = None
+
+
+def redact(text: str) -> str:
+    """Mask secret values inside free text."""
+    return _SECRET_IN_TEXT.sub(lambda match: match.group(1) + _REDACTED, text)
+
+
+def _parse_pairs(value: str) -> dict:
+    pairs = {}
+    for item in (value or "").split(","):
+        name, _, setting = item.partition("=")
+        if name.strip() and setting.strip():
+            pairs[name.strip()] = setting.strip()
+    return pairs
+
+
+class _FieldRepr(reprlib.Repr):
+    """Bounded repr: long containers are cut after a few items, long strings in the middle."""
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.maxlevel = 3
+        self.maxlist = self.maxtuple = self.maxset = self.maxdict = 5
+        self.maxstring = self.maxother = self.maxlong = max_chars
+
+
+class EventLogger(logging.LoggerAdapter):
+    """
+    Logger taking an event name and keyword fields, with optional 1-in-N sampling.
+
+    Records at WARNING and above are never sampled.
+    """
+
+    def __init__(self, logger: logging.Logger, sample_every: dict):
+        super().__init__(logger, {})
+        self.sample_every = sample_every
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _skip(self, event: str, every: int) -> bool:
+        with self._lock:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+        return count % every != 0
+
+    def log(self, level, event, *args, sample_every: int = None, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        every = int(self.sample_every.get(event, sample_every or 1))
+        if level < logging.WARNING and every > 1 and self._skip(event, every):
+            return
+        logging_kwargs = {key: kwargs.pop(key) for key in _LOGGING_KWARGS if key in kwargs}
+        extra = dict(logging_kwargs.pop("extra", None) or {})
+        extra["fields"] = kwargs
+        if every > 1:
+            kwargs["sampled_1_in"] = every
+        self.logger.log(level, event, *args, extra=extra, **logging_kwargs)
+
+
+class _PreparingQueueHandler(logging.handlers.QueueHandler):
+    """Does the cheap, bounded part of formatting in the caller; the listener does the rest."""
+
+    def __init__(self, log_queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self._repr = _FieldRepr(max_chars)
+
+    def _render(self, key: str, value):
+        if _SECRET_KEY.search(key):
+            return _REDACTED
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        text = value if isinstance(value, str) else self._repr.repr(value)
+        if len(text) > self.max_chars:
+            text = text[:self.max_chars] + f"...(+{len(text) - self.max_chars} chars)"
+        return redact(text)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            message = message[:self.max_chars] + f"...(+{len(message) - self.max_chars} chars)"
+        fields = getattr(record, "fields", None) or {}
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg = redact(message)
+        prepared.args = None
+        prepared.fields = {key: self._render(key, value) for key, value in fields.items()}
+        if record.exc_info:
+            # Tracebacks cannot cross to the listener thread, so render them here
+            prepared.exc_text = redact(logging.Formatter().formatException(record.exc_info))
+        prepared.exc_info = None
+        return prepared
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.msg,
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {record.msg} {fields}".rstrip()
+        return line + ("\n" + record.exc_text if record.exc_text else "")
+
+
+def _start_listener(log_queue, handler: logging.Handler):
+    global _listener
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def configure_logging():
+    """
+    Route all logging through a queue to a background writer. Idempotent.
+
+    Called by get_logger(), so whichever entry point imports an agent or the
+    wildlife app first sets it up. Pending records are flushed at exit, and a
+    forked child (gunicorn worker) starts its own writer thread.
+    """
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        log_queue = queue.SimpleQueue()
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(TextFormatter() if os.getenv("LOG_FORMAT", "json") == "text" else JsonFormatter())
+
+        root = logging.getLogger()
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root.addHandler(_PreparingQueueHandler(
+            log_queue, int(os.getenv("LOG_MAX_FIELD_CHARS", DEFAULT_MAX_FIELD_CHARS))
+        ))
+        for name, level in _parse_pairs(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level.upper())
+
+        _start_listener(log_queue, output)
+        atexit.register(lambda: _listener.stop())
+        os.register_at_fork(after_in_child=lambda: _start_listener(log_queue, output))
+        _configured = True
+
+
+_sample_every = None
+
+
+def get_logger(name: str) -> EventLogger:
+    """Structured logger for a module, configuring logging on first use."""
+    global _sample_every
+    configure_logging()
+    if _sample_every is None:
+        _sample_every = {event: int(every) for event, every in _parse_pairs(os.getenv("LOG_SAMPLE_EVERY", "")).items()}
+    return EventLogger(logging.getLogger(name), _sample_every)
@@ -0,0 +1,171 @@
+import bisect
+import os
+import threading
+
+# Seconds; covers cache hits (ms) through multi-second model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: tuple, extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Prometheus-style histogram with labels: cumulative buckets, sum and count per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def merge(self, series: list):
+        """Add exported series (see export()) from another process into this histogram."""
+        with self._lock:
+            for labels, counts, total, count in series:
+                key = tuple((key, value) for key, value in labels)
+                current = self._series.get(key)
+                if current is None:
+                    current = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+                current[2] += count
+
+    def export(self) -> list:
+        """JSON-serialisable [labels, bucket counts, sum, count] per label set."""
+        with self._lock:
+            return [[list(key), list(counts), total, count] for key, (counts, total, count) in self._series.items()]
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> dict:
+        """{label tuple: {"count", "sum"}} for tests and /status-style endpoints."""
+        with self._lock:
+            return {key: {"count": series[2], "sum": series[1]} for key, series in self._series.items()}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bound_label = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_label_text(key, bound_label)} {cumulative}")
+                inf_label = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_text(key, inf_label)} {count}")
+                lines.append(f"{self.name}_sum{_label_text(key)} {total}")
+                lines.append(f"{self.name}_count{_label_text(key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time, e.g. a queue depth."""
+
+    def __init__(self, name: str, help_text: str, read):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def values(self) -> dict:
+        """{label tuple: number}, empty if the callback fails."""
+        try:
+            value = self.read()
+        except Exception:
+            return {}
+        values = value.items() if isinstance(value, dict) else [((), value)]
+        return {key: number for key, number in values if number is not None}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for key, number in self.values().items():
+            lines.append(f"{self.name}{_label_text(key)} {number}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram called `name`, creating it on first use."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, help_text, buckets)
+            return metric
+
+    def gauge(self, name: str, help_text: str, read) -> Gauge:
+        """Register (or replace) a gauge; `read` returns a number or {label tuple: number}."""
+        with self._lock:
+            metric = self._metrics[name] = Gauge(name, help_text, read)
+            return metric
+
+    def get(self, name: str):
+        with self._lock:
+            return self._metrics.get(name)
+
+    def export(self, gauges: bool = True) -> dict:
+        """JSON-serialisable state of every metric, for merging across processes (see multiprocess.py)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        exported = {"histograms": {}, "gauges": {}}
+        for metric in metrics:
+            if isinstance(metric, Histogram):
+                exported["histograms"][metric.name] = {
+                    "help": metric.help_text, "buckets": list(metric.buckets), "series": metric.export(),
+                }
+            elif gauges:
+                exported["gauges"][metric.name] = {
+                    "help": metric.help_text,
+                    "values": [[list(key), number] for key, number in metric.values().items()],
+                }
+        return exported
+
+    def reset(self):
+        """Zero every histogram; gauges read live state and stay registered."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            if isinstance(metric, Histogram):
+                metric.reset()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+REGISTRY = Registry()
+# A forked worker starts from zero: whatever the preloading master observed is its own
+os.register_at_fork(after_in_child=REGISTRY.reset)
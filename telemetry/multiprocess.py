@@ -0,0 +1,129 @@
+"""
+/metrics across worker processes.
+
+REGISTRY lives in process memory, so under gunicorn a scrape only sees the
+worker that accepted it. With TELEMETRY_METRICS_DIR set, every process writes
+its registry to <dir>/<pid>.json every TELEMETRY_METRICS_FLUSH_SEC seconds,
+and collect() serves the merge of all files:
+
+- histograms are summed across processes, including workers that have
+  exited, so counts never go backwards;
+- gauges read per-process state (queue depths, cache hit rates), so they get
+  a "worker" label and are dropped once their process is gone.
+
+The preloading master runs no exporter thread (a thread holding a registry
+lock at fork time would deadlock the child); it writes its histograms
+(warm-up stages) just before each fork, and workers start from an empty
+registry (see metrics.py).
+gunicorn.conf.py empties the directory when the server starts.
+"""
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .logs import get_logger
+from .metrics import Registry, REGISTRY
+
+log = get_logger("telemetry.multiprocess")
+
+DEFAULT_FLUSH_SEC = 5.0
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def metrics_dir() -> str:
+    return os.getenv("TELEMETRY_METRICS_DIR", "")
+
+
+def clear(directory: str):
+    """Create `directory` and remove the files of a previous server run."""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.unlink(path)
+
+
+def write_snapshot(directory: str, registry: Registry = REGISTRY, gauges: bool = True):
+    """Atomically replace this process's file in `directory` with the registry's current state."""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as sink:
+            json.dump(registry.export(gauges=gauges), sink)
+        os.replace(tmp_path, os.path.join(directory, f"{os.getpid()}.json"))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(directory: str, registry: Registry = REGISTRY) -> str:
+    """Prometheus text for the merged registries of every process writing to `directory`."""
+    write_snapshot(directory, registry)
+    merged = Registry()
+    gauges = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            pid = int(os.path.splitext(os.path.basename(path))[0])
+            with open(path) as source:
+                exported = json.load(source)
+        except (ValueError, OSError):
+            continue
+        for name, histogram in exported["histograms"].items():
+            merged.histogram(name, histogram["help"], tuple(histogram["buckets"])).merge(histogram["series"])
+        if not _alive(pid):
+            continue
+        for name, gauge in exported["gauges"].items():
+            help_text, values = gauges.setdefault(name, (gauge["help"], {}))
+            for labels, number in gauge["values"]:
+                values[tuple((key, value) for key, value in labels) + (("worker", str(pid)),)] = number
+    for name, (help_text, values) in gauges.items():
+        merged.gauge(name, help_text, lambda values=values: values)
+    return merged.render()
+
+
+def _run_exporter(directory: str, interval_sec: float):
+    while True:
+        time.sleep(interval_sec)
+        try:
+            write_snapshot(directory)
+        except OSError as e:
+            log.warning("metrics.snapshot_failed", directory=directory, error=str(e))
+
+
+def _start_exporter_thread(directory: str):
+    interval_sec = float(os.getenv("TELEMETRY_METRICS_FLUSH_SEC", DEFAULT_FLUSH_SEC))
+    threading.Thread(
+        target=_run_exporter, args=(directory, interval_sec), name="metrics-exporter", daemon=True
+    ).start()
+
+
+def install(directory: str):
+    """
+    Share this process's metrics through `directory`. Idempotent.
+
+    Writes the histograms before every fork and starts a snapshot thread in
+    every forked child; collect() writes this process's own file on demand.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        os.makedirs(directory, exist_ok=True)
+        os.register_at_fork(
+            # Histograms only: the master serves no requests, so its gauges would be noise
+            before=lambda: write_snapshot(directory, gauges=False),
+            after_in_child=lambda: _start_exporter_thread(directory),
+        )
+        _installed = True
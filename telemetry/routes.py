@@ -0,0 +1,26 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from . import multiprocess
+from .metrics import REGISTRY
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def add_metrics_route(app: FastAPI, registry=REGISTRY):
+    """
+    Register /metrics on the app, serving every registered histogram and gauge.
+
+    With TELEMETRY_METRICS_DIR set (gunicorn.conf.py sets it), the response
+    merges the metrics of every worker process instead of only the one that
+    accepted the scrape.
+    """
+    directory = multiprocess.metrics_dir()
+    if directory:
+        multiprocess.install(directory)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        text = multiprocess.collect(directory, registry) if directory else registry.render()
+        return PlainTextResponse(text, media_type=CONTENT_TYPE)
@@ -0,0 +1,112 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+from .metrics import DEFAULT_BUCKETS, REGISTRY
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+
+TRACER_NAME = "farming_agents"
+# Duration of every timed() block, labelled by stage and outcome
+STAGE_METRIC = "pipeline_stage_duration_seconds"
+
+_tracer = None
+
+
+def get_tracer():
+    """The shared tracer, or None when opentelemetry is not installed (spans become no-ops)."""
+    global _tracer
+    if _tracer is None and trace is not None:
+        _tracer = trace.get_tracer(TRACER_NAME)
+    return _tracer
+
+
+def _provider():
+    """The SDK TracerProvider in use, installing one if only the default no-op provider is set."""
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider()
+        trace.set_tracer_provider(provider)
+    return provider
+
+
+def configure_tracing(exporter: str = None):
+    """
+    Export spans according to TELEMETRY_TRACE_EXPORTER ("none", "console" or "otlp").
+
+    Leaves tracing alone when set to "none" (the default) or when the
+    opentelemetry SDK is not installed. "otlp" needs opentelemetry-exporter-otlp
+    and reads the standard OTEL_EXPORTER_OTLP_* variables.
+    """
+    exporter = exporter or os.getenv("TELEMETRY_TRACE_EXPORTER", "none")
+    if exporter == "none" or TracerProvider is None:
+        return
+    if exporter == "console":
+        span_exporter = ConsoleSpanExporter()
+    elif exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("TELEMETRY_TRACE_EXPORTER=otlp needs opentelemetry-exporter-otlp; tracing disabled")
+            return
+        span_exporter = OTLPSpanExporter()
+    else:
+        print(f"Unknown TELEMETRY_TRACE_EXPORTER {exporter!r}; tracing disabled")
+        return
+    _provider().add_span_processor(BatchSpanProcessor(span_exporter))
+
+
+def use_in_memory_exporter():
+    """
+    Record finished spans in memory, for tests.
+
+    Returns:
+        The InMemorySpanExporter; call get_finished_spans() on it and clear() between tests.
+    """
+    if TracerProvider is None:
+        raise RuntimeError("opentelemetry-sdk is not installed")
+    exporter = InMemorySpanExporter()
+    _provider().add_span_processor(SimpleSpanProcessor(exporter))
+    return exporter
+
+
+def observe_stage(stage: str, seconds: float, outcome: str = "ok", metric: str = STAGE_METRIC,
+                  buckets: tuple = DEFAULT_BUCKETS, **labels):
+    """Record a stage duration measured elsewhere, e.g. time spent waiting in a queue."""
+    REGISTRY.histogram(metric, "Duration of pipeline stages in seconds.", buckets).observe(
+        seconds, stage=stage, outcome=outcome, **labels
+    )
+
+
+@contextmanager
+def timed(stage: str, metric: str = STAGE_METRIC, buckets: tuple = DEFAULT_BUCKETS, **labels):
+    """
+    Trace a block as span `stage` and observe its duration in histogram `metric`.
+
+    The histogram is labelled with stage, outcome ("ok" or "error") and
+    **labels, which are also set as span attributes. Yields the span (None
+    without opentelemetry) so callers can add attributes such as row counts.
+    """
+    tracer = get_tracer()
+    outcome = "ok"
+    started = time.perf_counter()
+    # start_as_current_span records the exception and sets the error status itself
+    with tracer.start_as_current_span(stage, attributes=labels) if tracer is not None else nullcontext() as span:
+        try:
+            yield span
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            observe_stage(stage, time.perf_counter() - started, outcome, metric, buckets, **labels)
+
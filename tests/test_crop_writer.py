@@ -0,0 +1,127 @@
+import threading
+from types import SimpleNamespace
+
+from google.api_core.exceptions import AlreadyExists
+from google.rpc import code_pb2
+
+from crop_doctor.writer import CropAnalysisWriter
+
+
+class _FakeFirestore:
+    """In-memory stand-in for the Firestore client: create() semantics, BulkWriter error callbacks."""
+
+    def __init__(self, docs=None):
+        self.docs = dict(docs or {})
+        self.batches = []
+        # Cleared to hold BulkWriter flushes, as a slow backend would
+        self.flush_gate = threading.Event()
+        self.flush_gate.set()
+        self.flushing = threading.Event()
+
+    def collection(self, name):
+        return SimpleNamespace(document=lambda doc_id: _FakeDocument(self, doc_id))
+
+    def bulk_writer(self):
+        return _FakeBulkWriter(self)
+
+
+class _FakeDocument:
+    def __init__(self, db, doc_id):
+        self.db = db
+        self.id = doc_id
+
+    def create(self, record):
+        if self.id in self.db.docs:
+            raise AlreadyExists(f"Document {self.id} already exists")
+        self.db.docs[self.id] = record
+
+
+class _FakeBulkWriter:
+    def __init__(self, db):
+        self.db = db
+        self.on_error = None
+        self.creates = []
+
+    def on_write_error(self, callback):
+        self.on_error = callback
+
+    def create(self, document, record):
+        self.creates.append((document, record))
+
+    def close(self):
+        self.db.flushing.set()
+        self.db.flush_gate.wait(5)
+        self.db.batches.append([document.id for document, _ in self.creates])
+        for document, record in self.creates:
+            if document.id in self.db.docs:
+                self.on_error(SimpleNamespace(code=code_pb2.ALREADY_EXISTS, attempts=1), self)
+            else:
+                self.db.docs[document.id] = record
+
+
+def _writer(db, **kwargs):
+    options = {"queue_size": 10, "batch_size": 50, "flush_interval_sec": 0.01, "put_timeout_sec": 0.01}
+    options.update(kwargs)
+    return CropAnalysisWriter(lambda: db, **options)
+
+
+def test_existing_documents_count_as_duplicates():
+    db = _FakeFirestore({"known": {"analysis": "Rust."}})
+    writer = _writer(db)
+
+    writer.submit("known", {"analysis": "Rust, again."})
+    writer.submit("new", {"analysis": "Blight."})
+    writer.close()
+
+    assert db.docs["known"] == {"analysis": "Rust."}
+    assert db.docs["new"] == {"analysis": "Blight."}
+    assert writer.stats["duplicates"] == 1
+    assert writer.stats["written"] == 1
+    assert writer.stats["failed"] == 0
+
+
+def test_inline_duplicate_is_not_a_failure():
+    db = _FakeFirestore({"known": {"analysis": "Rust."}})
+    writer = _writer(db)
+    writer.close()
+
+    # After close() submit() writes inline
+    writer.submit("known", {"analysis": "Rust, again."})
+
+    assert writer.stats["inline_writes"] == 1
+    assert writer.stats["duplicates"] == 1
+    assert writer.stats["failed"] == 0
+
+
+def test_full_queue_writes_inline():
+    db = _FakeFirestore()
+    db.flush_gate.clear()
+    writer = _writer(db, queue_size=1)
+
+    writer.submit("first", {"analysis": "A"})
+    assert db.flushing.wait(5)
+    # "first" is stuck in a flush, "second" fills the queue, "third" cannot wait
+    writer.submit("second", {"analysis": "B"})
+    writer.submit("third", {"analysis": "C"})
+
+    assert writer.stats["inline_writes"] == 1
+    assert "third" in db.docs and "first" not in db.docs
+
+    db.flush_gate.set()
+    writer.close()
+    assert set(db.docs) == {"first", "second", "third"}
+    assert writer.stats["written"] == 3
+
+
+def test_close_flushes_pending_writes():
+    db = _FakeFirestore()
+    writer = _writer(db, flush_interval_sec=60)
+
+    for doc_id in ("a", "b", "c"):
+        writer.submit(doc_id, {"analysis": doc_id})
+    writer.close()
+
+    assert set(db.docs) == {"a", "b", "c"}
+    assert db.batches == [["a", "b", "c"]]
+    assert writer.stats["written"] == 3
+    assert writer.depth() == 0
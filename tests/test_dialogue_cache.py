@@ -0,0 +1,89 @@
+import os
+import time
+
+import pytest
+
+from loop_agent.dialogue_cache import (
+    DialogueCache, DialogueRequest, bucket_key, cache_from_env, make_template, parse_request, render,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I have 20 quintals of onion, market price Rs 2500 per quintal", ("onion", 2000, 25)),
+    ("Selling 500 kg Tomatoes at ₹12/kg", ("tomato", 500, 12)),
+    ("pyaz 2 tonnes, 30 rupees a kg", ("onion", 2000, 30)),
+    ("1,200 kgs aloo, rs. 18", ("potato", 1200, 18)),
+])
+def test_parse_request_normalizes_to_kg_and_rupees_per_kg(text, expected):
+    assert parse_request(text) == DialogueRequest(*expected)
+
+
+@pytest.mark.parametrize("text", ["onion please", "20 quintals at Rs 2500", "onion Rs 25 per kg", "onion 0 kg rs 5", None])
+def test_parse_request_needs_produce_quantity_and_price(text):
+    assert parse_request(text) is None
+
+
+def test_bucket_key_groups_nearby_requests():
+    base = bucket_key(DialogueRequest("onion", 2000, 25))
+
+    assert bucket_key(DialogueRequest("onion", 3000, 20)) == base
+    assert bucket_key(DialogueRequest("onion", 2000, 45)) != base
+    assert bucket_key(DialogueRequest("onion", 100, 25)) != base
+    assert bucket_key(DialogueRequest("tomato", 2000, 25)) != base
+    # Same request whether the price was quoted per kg or per quintal
+    assert bucket_key(parse_request("20 quintal onion Rs 2500 per quintal")) == bucket_key(
+        parse_request("2000 kg onion Rs 25 per kg")
+    )
+
+
+def test_per_quintal_amounts_scale_with_the_new_request():
+    first = parse_request("I have 20 quintals of onion, market price Rs 2500 per quintal")
+    dialogue = "You have 20 quintals at Rs 2500 per quintal. I offer Rs 2000 per quintal, so Rs 40,000 for 2000 kg. Pay in 3 days."
+    template = make_template(dialogue, first)
+
+    assert render(template, first) == dialogue.replace("2500", "2,500").replace("2000", "2,000")
+    assert render(template, parse_request("I have 10 quintals of onion at Rs 3000 per quintal")) == (
+        "You have 10 quintals at Rs 3,000 per quintal. I offer Rs 2,400 per quintal, so Rs 24,000 for 1,000 kg. "
+        "Pay in 3 days."
+    )
+
+
+def test_per_kg_amounts_scale_with_the_new_request():
+    first = parse_request("2000 kg onion, market Rs 25/kg")
+    template = make_template("Market is Rs 25/kg. I pay Rs 20 a kg for your 2000 kg, total 40000 rupees.", first)
+
+    assert render(template, parse_request("1000 kg onion at rs 30 per kg")) == (
+        "Market is Rs 30/kg. I pay Rs 24 a kg for your 1,000 kg, total 24,000 rupees."
+    )
+
+
+def test_cache_opens_its_database_on_first_use(tmp_path):
+    path = str(tmp_path / "dialogues.db")
+    cache = DialogueCache(path)
+    assert not os.path.exists(path)
+
+    assert cache.get("onion|q3|p7") is None
+    cache.put("onion|q3|p7", "template", DialogueRequest("onion", 2000, 25))
+    assert os.path.exists(path)
+
+    # A new process reads the template back from disk
+    assert DialogueCache(path).get("onion|q3|p7") == "template"
+
+
+def test_expired_templates_are_misses(tmp_path):
+    cache = DialogueCache(str(tmp_path / "dialogues.db"), ttl_sec=0.05)
+    cache.put("bucket", "template", DialogueRequest("onion", 2000, 25))
+    time.sleep(0.1)
+
+    assert cache.get("bucket") is None
+    assert cache.stats["misses"] == 1
+
+
+def test_default_path_is_outside_the_working_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv("LOOP_DIALOGUE_CACHE_PATH", raising=False)
+    monkeypatch.chdir(tmp_path)
+
+    cache = cache_from_env()
+
+    assert os.path.dirname(cache.db_path) != str(tmp_path)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from cropprice_agent.http_client import CircuitBreaker, CircuitOpenError, PooledHttpClient
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            status, delay = server.replies.pop(0) if server.replies else (200, 0)
+        if delay:
+            time.sleep(delay)
+        body = json.dumps({"status": status}).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on a slow reply
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    """Local HTTP server answering each GET with the next (status, delay) from `replies`, then 200."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.replies = []
+    server.requests = 0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/prices"
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(**kwargs):
+    options = {"read_timeout": 0.2, "max_retries": 2, "backoff_base": 0}
+    options.update(kwargs)
+    return PooledHttpClient(**options)
+
+
+def test_retries_transient_statuses(stub):
+    stub.replies = [(503, 0), (429, 0)]
+    client = _client()
+
+    assert client.get_json(stub.url) == {"status": 200}
+    assert stub.requests == 3
+    assert client.breaker.state == "closed"
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.replies = [(502, 0)] * 3
+    client = _client()
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(stub.url)
+    assert stub.requests == 3
+
+
+def test_retries_read_timeouts(stub):
+    stub.replies = [(200, 0.5)]
+    client = _client()
+
+    assert client.get_json(stub.url) == {"status": 200}
+    assert stub.requests == 2
+
+
+def test_read_timeout_without_retries_counts_as_failure(stub):
+    stub.replies = [(200, 0.5)]
+    client = _client(max_retries=0, breaker=CircuitBreaker(failure_threshold=1))
+
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get_json(stub.url)
+    assert client.breaker.state == "open"
+
+
+def test_client_errors_do_not_open_the_breaker(stub):
+    stub.replies = [(404, 0)] * 3
+    client = _client(breaker=CircuitBreaker(failure_threshold=1))
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.get_json(stub.url)
+    assert client.breaker.state == "closed"
+    assert stub.requests == 3
+
+
+def test_open_breaker_short_circuits(stub):
+    stub.replies = [(500, 0)] * 2
+    client = _client(max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout_sec=60))
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.get_json(stub.url)
+    assert client.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        client.get_json(stub.url)
+    assert stub.requests == 2
+
+
+def test_half_open_trial_success_closes_the_breaker(stub):
+    stub.replies = [(500, 0)]
+    client = _client(max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout_sec=0.1))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(stub.url)
+    assert client.breaker.state == "open"
+
+    time.sleep(0.15)
+    assert client.breaker.state == "half-open"
+    assert client.get_json(stub.url) == {"status": 200}
+    assert client.breaker.state == "closed"
+
+
+def test_half_open_trial_failure_reopens_the_breaker(stub):
+    stub.replies = [(500, 0), (503, 0)]
+    client = _client(max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout_sec=0.1))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(stub.url)
+    time.sleep(0.15)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(stub.url)
+
+    assert client.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.get_json(stub.url)
+    assert stub.requests == 2
+
+
+def test_half_open_lets_a_single_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_sec=0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
@@ -0,0 +1,77 @@
+import asyncio
+import io
+import threading
+from types import SimpleNamespace
+
+from google.genai import types
+from PIL import Image
+
+from crop_doctor import image_cache
+from crop_doctor.image_cache import IMAGE_HASH_STATE_KEY, DiagnosisCache, cached_diagnosis, dhash
+
+
+def _photo(shade: int) -> bytes:
+    image = Image.new("RGB", (64, 64), (shade, 120, 40))
+    for x in range(32):
+        image.putpixel((x, x), (255, 255, 255))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _FakeFirestore:
+    """Just enough of the Firestore client to stream crop_analysis, recording the streaming thread."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.stream_threads = []
+
+    def collection(self, name):
+        return self
+
+    def select(self, fields):
+        return self
+
+    def stream(self):
+        self.stream_threads.append(threading.get_ident())
+        for doc_id, data in self.docs.items():
+            yield SimpleNamespace(id=doc_id, to_dict=lambda data=data: dict(data))
+
+
+def _context(image_bytes):
+    content = types.Content(role="user", parts=[types.Part.from_bytes(data=image_bytes, mime_type="image/png")])
+    return SimpleNamespace(user_content=content, state={})
+
+
+def test_cached_diagnosis_loads_off_the_event_loop(monkeypatch):
+    photo = _photo(30)
+    db = _FakeFirestore({"doc-1": {"analysis": "Early blight.", "image_hash": f"{dhash(photo):016x}"}})
+    monkeypatch.setattr(image_cache, "get_diagnosis_cache", lambda cache=DiagnosisCache(lambda: db): cache)
+
+    async def run():
+        return threading.get_ident(), await cached_diagnosis(_context(photo))
+
+    loop_thread, reply = asyncio.run(run())
+
+    assert reply.parts[0].text == "Early blight."
+    assert db.stream_threads and loop_thread not in db.stream_threads
+
+
+def test_miss_leaves_the_hash_for_store_crop_analysis(monkeypatch):
+    cache = DiagnosisCache(lambda: _FakeFirestore({}))
+    monkeypatch.setattr(image_cache, "get_diagnosis_cache", lambda: cache)
+    context = _context(_photo(200))
+
+    assert asyncio.run(cached_diagnosis(context)) is None
+    assert context.state[IMAGE_HASH_STATE_KEY] == f"{dhash(_photo(200)):016x}"
+    assert cache.stats()["misses"] == 1
+
+
+def test_add_before_load_is_kept():
+    cache = DiagnosisCache(lambda: _FakeFirestore({"doc-1": {"analysis": "Rust.", "image_hash": f"{1:016x}"}}))
+    cache.add(2, "doc-2", "Blight.")
+
+    cache.load()
+
+    assert cache.stats()["indexed_images"] == 2
+    assert cache.lookup(2)["doc_id"] == "doc-2"
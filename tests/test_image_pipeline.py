@@ -0,0 +1,111 @@
+import asyncio
+import io
+
+import numpy as np
+from google.adk.models import LlmRequest
+from google.genai import types
+from PIL import Image
+
+from image_pipeline import prepare_image, sniff_mime
+from image_pipeline.callbacks import shrink_request_images
+
+
+def _noise(width, height, seed=0):
+    # Noise does not compress well, so sizes behave like a real photo's
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def _encode(image, image_format, **options):
+    output = io.BytesIO()
+    image.save(output, format=image_format, **options)
+    return output.getvalue()
+
+
+def _size_of(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.size
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    # 6: the camera was rotated, the pixels must turn 90 degrees clockwise to display upright
+    exif[0x0112] = 6
+    data = _encode(_noise(300, 200), "PNG", exif=exif)
+
+    prepared = prepare_image(data)
+
+    assert (prepared.width, prepared.height) == (200, 300)
+    assert prepared.mime_type == "image/jpeg"
+    assert _size_of(prepared.data) == (200, 300)
+
+
+def test_oversized_image_is_thumbnailed():
+    data = _encode(_noise(3000, 2000), "PNG")
+
+    prepared = prepare_image(data, max_side=1536)
+
+    assert (prepared.width, prepared.height) == (1536, 1024)
+    assert _size_of(prepared.data) == (1536, 1024)
+    assert len(prepared.data) < prepared.original_size == len(data)
+
+
+def test_original_is_kept_when_the_reencode_is_not_smaller():
+    data = _encode(_noise(64, 64), "JPEG", quality=20)
+
+    prepared = prepare_image(data, quality=95)
+
+    assert prepared.data == data
+    assert prepared.mime_type == "image/jpeg"
+
+
+def test_kept_original_keeps_its_mime_type():
+    data = _encode(Image.new("RGB", (8, 8), (30, 120, 40)), "WEBP")
+
+    prepared = prepare_image(data)
+
+    assert prepared.data == data
+    assert prepared.mime_type == "image/webp"
+
+
+def test_transparency_is_flattened_onto_white():
+    image = _noise(256, 256).convert("RGBA")
+    image.paste((0, 0, 0, 0), (64, 64, 192, 192))
+    prepared = prepare_image(_encode(image, "PNG"), quality=95)
+
+    assert prepared.mime_type == "image/jpeg"
+    with Image.open(io.BytesIO(prepared.data)) as decoded:
+        assert min(decoded.getpixel((128, 128))) >= 250
+
+
+def test_sniff_mime_reads_magic_bytes():
+    image = Image.new("RGB", (4, 4))
+
+    assert sniff_mime(_encode(image, "PNG")) == "image/png"
+    assert sniff_mime(_encode(image, "JPEG")) == "image/jpeg"
+    assert sniff_mime(_encode(image, "WEBP")) == "image/webp"
+    assert sniff_mime(b"RIFF\x00\x00\x00\x00WAVEfmt ") is None
+    assert sniff_mime(b"plain text") is None
+
+
+def test_shrink_request_images_replaces_only_images():
+    large = _encode(_noise(2000, 1500), "PNG")
+    request = LlmRequest(contents=[
+        types.Content(role="user", parts=[
+            types.Part(text="What is wrong with this leaf?"),
+            types.Part(inline_data=types.Blob(mime_type="image/png", data=large)),
+            types.Part(inline_data=types.Blob(mime_type="image/jpeg", data=b"\xff\xd8\xff not really a jpeg")),
+            types.Part(inline_data=types.Blob(mime_type="application/pdf", data=b"%PDF-1.4")),
+        ]),
+    ])
+
+    assert asyncio.run(shrink_request_images(None, request)) is None
+
+    text, image, unreadable, document = request.contents[0].parts
+    assert text.text == "What is wrong with this leaf?"
+    assert image.inline_data.mime_type == "image/jpeg"
+    assert max(_size_of(image.inline_data.data)) <= 1536
+    assert len(image.inline_data.data) < len(large)
+    # Unreadable images and other files go to the model untouched
+    assert unreadable.inline_data.data == b"\xff\xd8\xff not really a jpeg"
+    assert document.inline_data.data == b"%PDF-1.4"
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# The wildlife app imports its modules flat, from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wildlife_alert"))
+
+import incidents  # noqa: E402
+from incidents import IncidentTracker  # noqa: E402
+
+
+def test_other_cameras_do_not_close_an_incident():
+    tracker = IncidentTracker(window_sec=120)
+    first = tracker.observe("north", "boar", 0.9, None, "north_1.jpg", seen_at=1000)["incident"]
+
+    # A camera whose frames are far ahead in time, e.g. catching up on a different backlog
+    tracker.observe("south", "boar", 0.9, None, "south_1.jpg", seen_at=5000)
+    tracked = tracker.observe("north", "boar", 0.9, None, "north_2.jpg", seen_at=1060)
+
+    assert not tracked["new"]
+    assert tracked["incident"] is first
+    assert tracker.open_incidents() == 2
+
+
+def test_gap_on_the_same_camera_starts_a_new_incident():
+    tracker = IncidentTracker(window_sec=120)
+    first = tracker.observe("north", "boar", 0.9, None, "north_1.jpg", seen_at=1000)["incident"]
+
+    tracked = tracker.observe("north", "boar", 0.9, None, "north_2.jpg", seen_at=1200)
+
+    assert tracked["new"]
+    assert tracked["incident"] is not first
+    assert tracker.open_incidents() == 1
+
+
+def test_open_incidents_expire_by_wall_clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(incidents, "time", SimpleNamespace(time=time.time, monotonic=lambda: now[0]))
+    tracker = IncidentTracker(window_sec=120)
+    tracker.observe("north", "boar", 0.9, None, "north_1.jpg", seen_at=1000)
+    assert tracker.open_incidents() == 1
+
+    now[0] += 121
+
+    assert tracker.open_incidents() == 0
@@ -0,0 +1,124 @@
+import os
+import sys
+import threading
+import time
+
+# The wildlife app imports its modules flat, from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wildlife_alert"))
+
+from ingest import ImageIngestor  # noqa: E402
+from ledger import ProcessedLedger  # noqa: E402
+
+
+class _Handler:
+    """Detection handler that records the size of every image it was given, failing while `fail` is set."""
+
+    def __init__(self):
+        self.seen = []
+        self.fail = False
+
+    def __call__(self, path):
+        self.seen.append((os.path.basename(path), os.path.getsize(path)))
+        if self.fail:
+            raise OSError("image file is truncated")
+        return 1
+
+
+def _write(path, data, age_sec=60):
+    with open(path, "wb") as image_file:
+        image_file.write(data)
+    # Old enough that catch-up does not wait for the file to settle
+    mtime = time.time() - age_sec
+    os.utime(path, (mtime, mtime))
+
+
+def _catch_up(folder, ledger_path, handler):
+    """Run one restart's catch-up scan and return the ingestor."""
+    ledger = ProcessedLedger(ledger_path)
+    ingestor = ImageIngestor(str(folder), ledger, handler, mode="poll", poll_interval_sec=60)
+    ingestor.stop()
+    ingestor.run()
+    ledger.close()
+    return ingestor
+
+
+def test_restart_skips_files_already_in_the_ledger(tmp_path):
+    folder = tmp_path / "images"
+    folder.mkdir()
+    _write(folder / "north_1.jpg", b"frame one")
+    _write(folder / "north_2.jpg", b"frame two")
+    ledger_path = str(tmp_path / "ledger.db")
+    handler = _Handler()
+
+    first = _catch_up(folder, ledger_path, handler)
+    assert sorted(handler.seen) == [("north_1.jpg", 9), ("north_2.jpg", 9)]
+    assert first.stats["ingested"] == 2
+
+    _write(folder / "north_3.jpg", b"frame three")
+    handler.seen.clear()
+    _catch_up(folder, ledger_path, handler)
+
+    assert handler.seen == [("north_3.jpg", 11)]
+
+
+def test_copy_of_an_analysed_image_is_not_analysed_again(tmp_path):
+    folder = tmp_path / "images"
+    folder.mkdir()
+    _write(folder / "north_1.jpg", b"frame one")
+    ledger_path = str(tmp_path / "ledger.db")
+    handler = _Handler()
+    _catch_up(folder, ledger_path, handler)
+
+    _write(folder / "north_1_copy.jpg", b"frame one")
+    restarted = _catch_up(folder, ledger_path, handler)
+
+    assert handler.seen == [("north_1.jpg", 9)]
+    assert restarted.stats["skipped"] == 1
+
+
+def test_failed_partial_file_is_retried_on_restart(tmp_path):
+    folder = tmp_path / "images"
+    folder.mkdir()
+    _write(folder / "north_1.jpg", b"half a fr")
+    ledger_path = str(tmp_path / "ledger.db")
+    handler = _Handler()
+    handler.fail = True
+
+    crashed = _catch_up(folder, ledger_path, handler)
+    assert crashed.stats["errors"] == 1
+    assert ProcessedLedger(ledger_path).count() == 0
+
+    # The uploader finishes the file; the next start analyses it and records it
+    _write(folder / "north_1.jpg", b"half a frame, now whole", age_sec=30)
+    handler.fail = False
+    restarted = _catch_up(folder, ledger_path, handler)
+
+    assert handler.seen[-1] == ("north_1.jpg", 23)
+    assert restarted.stats["ingested"] == 1
+    assert ProcessedLedger(ledger_path).count() == 1
+
+
+def test_growing_file_is_analysed_once_it_stops_changing(tmp_path):
+    folder = tmp_path / "images"
+    folder.mkdir()
+    path = folder / "north_1.jpg"
+    path.write_bytes(b"x" * 10)
+    handler = _Handler()
+    ledger = ProcessedLedger(str(tmp_path / "ledger.db"))
+    ingestor = ImageIngestor(str(folder), ledger, handler, mode="poll", poll_interval_sec=0.05)
+    runner = threading.Thread(target=ingestor.run, daemon=True)
+    runner.start()
+
+    # Keep appending faster than the settle check, as a slow upload would
+    for _ in range(10):
+        time.sleep(0.05)
+        with open(path, "ab") as image_file:
+            image_file.write(b"x" * 10)
+    deadline = time.monotonic() + 5
+    while not handler.seen and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.2)
+    ingestor.stop()
+    runner.join(5)
+
+    assert handler.seen == [("north_1.jpg", 110)]
@@ -0,0 +1,47 @@
+import json
+import os
+
+from telemetry import multiprocess
+from telemetry.metrics import Registry
+
+
+def _registry(observations, depth):
+    registry = Registry()
+    histogram = registry.histogram("stage_seconds", "Stage latency.", buckets=(0.1, 1.0))
+    for value in observations:
+        histogram.observe(value, stage="model")
+    registry.gauge("queue_depth", "Pending writes.", lambda: depth)
+    return registry
+
+
+def test_export_merges_into_another_registry():
+    merged = _registry([0.05], depth=1)
+    exported = _registry([0.5, 5.0], depth=2).export()
+
+    merged.histogram("stage_seconds", "Stage latency.", (0.1, 1.0)).merge(exported["histograms"]["stage_seconds"]["series"])
+
+    assert merged.get("stage_seconds").snapshot()[(("stage", "model"),)] == {"count": 3, "sum": 5.55}
+    assert exported["gauges"]["queue_depth"]["values"] == [[[], 2]]
+
+
+def test_reset_keeps_gauges():
+    registry = _registry([0.5], depth=3)
+
+    registry.reset()
+
+    assert registry.get("stage_seconds").snapshot() == {}
+    assert "queue_depth 3" in registry.render()
+
+
+def test_collect_sums_histograms_and_labels_gauges_by_worker(tmp_path):
+    # A live worker (this process' parent) and an exited one, as left behind by gunicorn
+    live, gone = os.getppid(), 2 ** 22 + 1
+    for pid, registry in ((live, _registry([0.5], depth=4)), (gone, _registry([0.5], depth=9))):
+        (tmp_path / f"{pid}.json").write_text(json.dumps(registry.export()))
+
+    text = multiprocess.collect(str(tmp_path), _registry([0.05], depth=1))
+
+    assert 'stage_seconds_count{stage="model"} 3' in text
+    assert f'queue_depth{{worker="{os.getpid()}"}} 1' in text
+    assert f'queue_depth{{worker="{live}"}} 4' in text
+    assert f'worker="{gone}"' not in text
@@ -0,0 +1,85 @@
+import pytest
+
+from loop_agent.patching import EditPlan, PatchError, apply_edits, numbered
+
+DOCUMENT = "one\ntwo\nthree\nfour"
+
+
+def _apply(*edits):
+    return apply_edits(DOCUMENT, list(edits))
+
+
+def test_replace_a_range():
+    assert _apply({"op": "replace", "start": 2, "end": 3, "text": "TWO\nTHREE\nTHREE AND A HALF"}) == (
+        "one\nTWO\nTHREE\nTHREE AND A HALF\nfour"
+    )
+
+
+def test_replace_defaults_to_one_line():
+    assert _apply({"op": "replace", "start": 4, "text": "FOUR"}) == "one\ntwo\nthree\nFOUR"
+
+
+def test_insert_at_top_and_after_the_last_line():
+    assert _apply({"op": "insert", "start": 0, "text": "zero"}, {"op": "insert", "start": 4, "text": "five"}) == (
+        "zero\none\ntwo\nthree\nfour\nfive"
+    )
+
+
+def test_delete_a_range():
+    assert _apply({"op": "delete", "start": 2, "end": 3}) == "one\nfour"
+
+
+def test_edits_are_numbered_against_the_original():
+    result = _apply(
+        {"op": "insert", "start": 1, "text": "one and a half\none and three quarters"},
+        {"op": "delete", "start": 2},
+        {"op": "replace", "start": 4, "text": "FOUR"},
+    )
+
+    assert result == "one\none and a half\none and three quarters\nthree\nFOUR"
+    assert len(result.splitlines()) == 4 + 2 - 1
+
+
+def test_inserts_after_the_same_line_keep_their_order():
+    assert _apply({"op": "insert", "start": 2, "text": "a"}, {"op": "insert", "start": 2, "text": "b"}) == (
+        "one\ntwo\na\nb\nthree\nfour"
+    )
+
+
+def test_insert_next_to_a_replaced_line_is_allowed():
+    assert _apply({"op": "replace", "start": 2, "text": "TWO"}, {"op": "insert", "start": 2, "text": "2.5"}) == (
+        "one\nTWO\n2.5\nthree\nfour"
+    )
+
+
+@pytest.mark.parametrize("edit", [
+    {"op": "replace", "start": 0},
+    {"op": "replace", "start": 5},
+    {"op": "delete", "start": 3, "end": 5},
+    {"op": "delete", "start": 3, "end": 2},
+    {"op": "insert", "start": -1, "text": "x"},
+    {"op": "insert", "start": 5, "text": "x"},
+])
+def test_out_of_range_lines_are_rejected(edit):
+    with pytest.raises(PatchError):
+        _apply(edit)
+
+
+@pytest.mark.parametrize("edits", [
+    [{"op": "replace", "start": 1, "end": 2, "text": "x"}, {"op": "delete", "start": 2}],
+    [{"op": "delete", "start": 2, "end": 4}, {"op": "replace", "start": 3, "text": "x"}],
+    [{"op": "delete", "start": 2, "end": 3}, {"op": "insert", "start": 2, "text": "x"}],
+])
+def test_overlapping_edits_are_rejected(edits):
+    with pytest.raises(PatchError):
+        _apply(*edits)
+
+
+def test_plan_from_model_json():
+    plan = EditPlan.model_validate_json('{"edits": [{"op": "delete", "start": 1}]}')
+
+    assert apply_edits(DOCUMENT, plan.edits) == "two\nthree\nfour"
+
+
+def test_numbered_lines_start_at_one():
+    assert numbered("a\nb") == "1: a\n2: b"
@@ -0,0 +1,50 @@
+import os
+import sys
+
+# The wildlife app imports its modules flat, from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wildlife_alert"))
+
+from prefilter import MotionPrefilter, _synthetic_frames  # noqa: E402
+
+
+def test_static_frames_are_dropped():
+    prefilter = MotionPrefilter(sample_every=0)
+    # Sensor noise and lighting drift, but never an animal
+    frames = list(_synthetic_frames(count=40, animal_every=1000))
+
+    passed = [prefilter.should_analyse(name, image_bytes) for name, image_bytes, _ in frames]
+
+    # The first frame only seeds the camera's background
+    assert passed[0]
+    assert not any(passed[1:])
+    assert prefilter.snapshot()["dropped"] == 39
+
+
+def test_moving_blob_passes():
+    prefilter = MotionPrefilter(sample_every=0)
+    frames = list(_synthetic_frames(count=75, animal_every=25))
+
+    results = [(prefilter.should_analyse(name, image_bytes), has_animal) for name, image_bytes, has_animal in frames[1:]]
+
+    assert sum(has_animal for _, has_animal in results) == 6
+    assert all(passed for passed, has_animal in results if has_animal)
+    # Nearly every frame without an animal is still dropped
+    assert sum(passed for passed, has_animal in results if not has_animal) <= 2
+
+
+def test_static_frames_are_sampled():
+    prefilter = MotionPrefilter(sample_every=10)
+
+    for name, image_bytes, _ in _synthetic_frames(count=31, animal_every=1000):
+        prefilter.should_analyse(name, image_bytes)
+
+    stats = prefilter.snapshot()
+    assert stats["sampled"] == 3
+    assert stats["dropped"] == 27
+
+
+def test_unreadable_frame_is_sent_to_the_model():
+    prefilter = MotionPrefilter()
+
+    assert prefilter.should_analyse("cam1_0001.jpg", b"not an image")
+    assert prefilter.snapshot()["errors"] == 1
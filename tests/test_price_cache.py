@@ -0,0 +1,104 @@
+import os
+
+import pandas as pd
+import pytest
+
+from cropprice_agent.price_cache import FallbackPriceSource, LocalFilePriceSource, PriceTableCache
+from cropprice_agent.price_snapshot import snapshot_path_for, write_snapshot
+
+
+def _write(path, modal_prices):
+    pd.DataFrame({
+        "market": [f"Market {index}" for index in range(len(modal_prices))],
+        "commodity": "Onion",
+        "modal_price": modal_prices,
+    }).to_csv(path, index=False)
+
+
+class _CountingSource(LocalFilePriceSource):
+    loads = 0
+
+    def load(self):
+        self.loads += 1
+        return super().load()
+
+
+def _touch(path, seconds_later):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds_later * 1_000_000_000))
+
+
+def test_first_call_loads_the_table(tmp_path):
+    _write(tmp_path / "prices.csv", [1500, 1600])
+    cache = PriceTableCache(LocalFilePriceSource(str(tmp_path / "prices.csv")), ttl_sec=0)
+
+    snapshot = cache.get_snapshot()
+
+    assert len(snapshot) == 2
+    assert snapshot.version == LocalFilePriceSource(str(tmp_path / "prices.csv")).version()
+
+
+def test_unchanged_version_skips_the_reload(tmp_path):
+    _write(tmp_path / "prices.csv", [1500])
+    source = _CountingSource(str(tmp_path / "prices.csv"))
+    cache = PriceTableCache(source, ttl_sec=0)
+    snapshot = cache.get_snapshot()
+
+    assert not cache.refresh()
+    assert cache.get_snapshot() is snapshot
+    assert source.loads == 1
+
+
+@pytest.mark.parametrize("rewrite", [False, True])
+def test_changed_file_is_reloaded(tmp_path, rewrite):
+    path = tmp_path / "prices.csv"
+    _write(path, [1500])
+    cache = PriceTableCache(LocalFilePriceSource(str(path)), ttl_sec=0)
+    cache.get_snapshot()
+
+    if rewrite:
+        # New size: the version changes even within the filesystem's mtime resolution
+        _write(path, [1500, 1600, 1700])
+    else:
+        _touch(path, 5)
+
+    assert cache.refresh()
+    assert len(cache.get_snapshot()) == (3 if rewrite else 1)
+
+
+def test_missing_file_serves_nothing_until_it_appears(tmp_path):
+    path = tmp_path / "prices.csv"
+    cache = PriceTableCache(LocalFilePriceSource(str(path)), ttl_sec=0)
+
+    assert cache.get_snapshot() is None
+
+    _write(path, [1500])
+    assert cache.refresh()
+    assert len(cache.get_snapshot()) == 1
+
+
+def test_missing_snapshot_falls_back_to_the_csv(tmp_path):
+    path = str(tmp_path / "prices.csv")
+    _write(path, [1500, 1600])
+    source = FallbackPriceSource(LocalFilePriceSource(snapshot_path_for(path)), LocalFilePriceSource(path))
+    cache = PriceTableCache(source, ttl_sec=0)
+
+    snapshot = cache.get_snapshot()
+
+    assert len(snapshot) == 2
+    assert snapshot.version.startswith("prices.csv@")
+
+
+def test_snapshot_is_preferred_once_written(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "prices.csv")
+    _write(path, [1500, 1600])
+    source = FallbackPriceSource(LocalFilePriceSource(snapshot_path_for(path)), LocalFilePriceSource(path))
+    cache = PriceTableCache(source, ttl_sec=0)
+    cache.get_snapshot()
+
+    write_snapshot(pd.read_csv(path).head(1), snapshot_path_for(path))
+
+    assert cache.refresh()
+    assert len(cache.get_snapshot()) == 1
+    assert cache.get_snapshot().version.startswith(os.path.basename(snapshot_path_for(path)) + "@")
@@ -0,0 +1,76 @@
+import pandas as pd
+
+from cropprice_agent.price_cache import LocalFilePriceSource, PriceTableCache
+from cropprice_agent.price_deltas import DeltaIngestor, LocalDeltaSource
+from cropprice_agent.price_table import LayeredSnapshot, PriceSnapshot
+
+COLUMNS = ["state", "district", "market", "commodity", "variety", "grade", "arrival_date", "min_price", "max_price", "modal_price"]
+
+
+def _write(path, rows):
+    pd.DataFrame(
+        [["Karnataka", "Kolar", market, "Onion", "Red", "FAQ", day, modal - 100, modal + 100, modal] for market, day, modal in rows],
+        columns=COLUMNS,
+    ).to_csv(path, index=False)
+
+
+def _cache(tmp_path, compact_rows=100):
+    _write(tmp_path / "prices.csv", [("Kolar", "01/06/2025", 1500), ("Malur", "01/06/2025", 1400)])
+    (tmp_path / "deltas").mkdir()
+    deltas = DeltaIngestor(LocalDeltaSource(str(tmp_path / "deltas")), compact_rows=compact_rows)
+    return PriceTableCache(LocalFilePriceSource(str(tmp_path / "prices.csv")), ttl_sec=0, deltas=deltas)
+
+
+def test_duplicate_deltas_keep_the_last_row(tmp_path):
+    _write(tmp_path / "2025-06-02.csv", [("Kolar", "02/06/2025", 1600), ("Malur", "02/06/2025", 1300)])
+    _write(tmp_path / "2025-06-03.csv", [("kolar", "02/06/2025", 1650)])
+    ingestor = DeltaIngestor(LocalDeltaSource(str(tmp_path)))
+
+    assert ingestor.ingest()
+    assert not ingestor.ingest()
+
+    assert len(ingestor.frame) == 2
+    assert sorted(ingestor.frame["modal_price"]) == [1300, 1650]
+
+
+def test_changed_delta_file_is_read_again(tmp_path):
+    _write(tmp_path / "2025-06-02.csv", [("Kolar", "02/06/2025", 1600)])
+    ingestor = DeltaIngestor(LocalDeltaSource(str(tmp_path)))
+    ingestor.ingest()
+
+    _write(tmp_path / "2025-06-02.csv", [("Kolar", "02/06/2025", 1700), ("Malur", "02/06/2025", 1300)])
+
+    assert ingestor.ingest()
+    assert sorted(ingestor.frame["modal_price"]) == [1300, 1700]
+
+
+def test_refresh_layers_new_deltas_over_the_base(tmp_path):
+    cache = _cache(tmp_path)
+    assert isinstance(cache.get_snapshot(), PriceSnapshot)
+
+    _write(tmp_path / "deltas" / "2025-06-02.csv", [("Kolar", "01/06/2025", 1550), ("Kolar", "02/06/2025", 1600)])
+    assert cache.refresh()
+
+    snapshot = cache.get_snapshot()
+    assert isinstance(snapshot, LayeredSnapshot)
+    assert len(snapshot) == 3
+    assert sorted(snapshot.frame["modal_price"]) == [1400, 1550, 1600]
+    assert not cache.refresh()
+
+
+def test_compaction_matches_the_layered_view(tmp_path):
+    cache = _cache(tmp_path, compact_rows=2)
+    cache.get_snapshot()
+    _write(tmp_path / "deltas" / "2025-06-02.csv", [("Kolar", "01/06/2025", 1550), ("Malur", "02/06/2025", 1300)])
+
+    assert cache.refresh()
+    layered = cache.get_snapshot()
+    cache._compactor.join(5)
+
+    compacted = cache.get_snapshot()
+    assert isinstance(compacted, PriceSnapshot)
+    pd.testing.assert_frame_equal(compacted.frame, layered.frame)
+    assert compacted.summarize(None) == layered.summarize(layered.select({}))
+    assert cache.deltas.frame is None
+    # Compacted deltas are not applied a second time
+    assert not cache.refresh()
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from cropprice_agent.price_index import PriceIndex, normalize_key
+
+
+def _index(categorical=False):
+    frame = pd.DataFrame({
+        "market": ["Aluva", "Aluva City", "North Paravur", "Aluva", "Kolar", None],
+        "modal_price": [1500, 1600, 1700, 1800, 1900, 2000],
+    })
+    if categorical:
+        frame["market"] = frame["market"].astype("category")
+    return PriceIndex(frame)
+
+
+@pytest.fixture(params=[False, True], ids=["str", "category"])
+def index(request):
+    return _index(request.param)
+
+
+def test_exact_match_excludes_superstrings(index):
+    assert index.lookup("market", "aluva").tolist() == [0, 3]
+
+
+def test_prefix_match_when_nothing_is_exact(index):
+    assert index.lookup("market", "alu").tolist() == [0, 1, 3]
+    assert index.lookup("market", "aluva c").tolist() == [1]
+
+
+def test_substring_match_only_without_a_prefix_match(index):
+    assert index.lookup("market", "paravur").tolist() == [2]
+    assert index.lookup("market", "city").tolist() == [1]
+
+
+def test_no_match_is_empty(index):
+    assert index.lookup("market", "Mysuru").tolist() == []
+
+
+@pytest.mark.parametrize("value", ["ALUVA", "  Aluva ", "aLuVa"])
+def test_lookup_ignores_case_and_spacing(index, value):
+    assert index.lookup("market", value).tolist() == [0, 3]
+
+
+def test_mixed_case_prefix_and_substring(index):
+    assert index.lookup("market", "ALUVA  ci").tolist() == [1]
+    assert index.lookup("market", "North PARAVUR").tolist() == [2]
+    assert index.lookup("market", "PaRaV").tolist() == [2]
+
+
+def test_non_text_columns_are_not_indexed(index):
+    assert index.has("market")
+    assert not index.has("modal_price")
+    assert not index.has("district")
+
+
+def test_normalize_key_casefolds_and_collapses_whitespace():
+    assert normalize_key("  Straße\tNorth ") == "strasse north"
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from cropprice_agent.price_snapshot import read_snapshot, write_snapshot
+
+
+def _prices():
+    return pd.DataFrame({
+        "state": ["Kerala", "Punjab", "Kerala"],
+        "variety": ["Local", None, "Hybrid"],
+        "modal_price": ["2100", "n/a", "1900"],
+    })
+
+
+def _in_mapped_file(array, path) -> bool:
+    """Whether the data of `array` lies inside a memory mapping of `path`."""
+    address = array.__array_interface__["data"][0]
+    with open("/proc/self/maps") as maps:
+        for line in maps:
+            fields = line.split()
+            if fields[-1] == path:
+                start, end = (int(bound, 16) for bound in fields[0].split("-"))
+                if start <= address < end:
+                    return True
+    return False
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "prices.arrow")
+    write_snapshot(_prices(), path)
+
+    df = read_snapshot(path)
+
+    assert list(df["state"]) == ["Kerala", "Punjab", "Kerala"]
+    assert isinstance(df["variety"].dtype, pd.CategoricalDtype)
+    assert df["variety"].isna().tolist() == [False, True, False]
+    assert df["modal_price"].tolist()[::2] == [2100.0, 1900.0]
+    assert np.isnan(df["modal_price"].iloc[1])
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc/self/maps")
+def test_snapshot_columns_without_nulls_view_the_mapped_file(tmp_path):
+    path = str(tmp_path / "prices.arrow")
+    write_snapshot(_prices(), path)
+
+    df = read_snapshot(path)
+
+    assert _in_mapped_file(df["modal_price"].to_numpy(), path)
+    assert _in_mapped_file(df["state"].array.codes, path)
+    # Codes of a column with nulls have to be rewritten for pandas, so they are copied
+    assert not _in_mapped_file(df["variety"].array.codes, path)
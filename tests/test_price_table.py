@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cropprice_agent.price_table import LayeredSnapshot, PriceSnapshot
+
+
+def _row(market, variety, day, modal, commodity="Onion"):
+    return {
+        "state": "Karnataka", "district": "Kolar", "market": market, "commodity": commodity, "variety": variety,
+        "grade": "FAQ", "arrival_date": day, "min_price": modal - 100, "max_price": modal + 100, "modal_price": modal,
+    }
+
+
+def _base():
+    return pd.DataFrame([
+        _row("Kolar", "Red", "01/06/2025", 1500),
+        _row("Kolar", "Red", "02/06/2025", 1600),
+        _row("Mulbagal", "Red", "01/06/2025", 1400),
+        _row("Mulbagal", "White", "01/06/2025", 1800),
+        _row("Bangarpet", "Local", "01/06/2025", 900, commodity="Tomato"),
+        _row("Bangarpet", "Local", "02/06/2025", 950, commodity="Tomato"),
+    ])
+
+
+def _delta():
+    return pd.DataFrame([
+        # Corrects the first Kolar row (same record key, different case) and the only Mulbagal White row
+        _row("kolar", "red", "01/06/2025", 1550),
+        _row("Mulbagal", "White", "01/06/2025", 1850),
+        _row("Kolar", "Red", "03/06/2025", 1700),
+        _row("Chintamani", "Red", "03/06/2025", 1200),
+    ])
+
+
+def _layered():
+    return LayeredSnapshot(PriceSnapshot(_base(), "v1"), _delta())
+
+
+def _compacted(layered):
+    return PriceSnapshot(layered.frame, layered.version)
+
+
+def test_delta_rows_replace_base_rows_with_the_same_record_key():
+    layered = _layered()
+
+    assert len(layered) == len(_base()) - 2 + len(_delta())
+    frame = layered.frame
+    assert 1500 not in frame["modal_price"].tolist()
+    assert 1800 not in frame["modal_price"].tolist()
+    assert {1550, 1850, 1700, 1200} <= set(frame["modal_price"])
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"commodity": "onion"},
+    {"market": "Kolar"},
+    {"market": "mulbagal", "variety": "white"},
+    {"commodity": "Tomato"},
+    {"market": "Nowhere"},
+])
+def test_layers_agree_with_the_compacted_table(filters):
+    layered = _layered()
+    compacted = _compacted(layered)
+
+    positions = layered.select(filters)
+    expected = compacted.select(filters)
+    assert layered.count(positions) == compacted.count(expected)
+
+    rows = layered.rows(positions)
+    expected_rows = compacted.rows(expected).reset_index(drop=True)
+    pd.testing.assert_frame_equal(rows, expected_rows)
+    pd.testing.assert_frame_equal(layered.rows(positions, 1, 3), expected_rows.iloc[1:3].reset_index(drop=True))
+
+    assert layered.summarize(positions) == compacted.summarize(expected)
+
+
+def test_unfiltered_summary_uses_the_precomputed_groups():
+    layered = _layered()
+
+    summary = layered.summarize(layered.select({}))
+
+    assert summary == _compacted(layered).summarize(None)
+    groups = {(group["market"], group["variety"]): group for group in summary}
+    # The 01/06 correction is spelled "kolar"/"red": it supersedes the base row but groups on its own
+    assert groups[("Kolar", "Red")]["count"] == 2
+    assert groups[("Kolar", "Red")]["modal_price"] == 1650
+    assert groups[("kolar", "red")]["modal_price"] == 1550
+    assert groups[("Mulbagal", "White")]["max_price"] == 1950
+
+
+def test_untouched_groups_keep_the_base_aggregates():
+    base = PriceSnapshot(_base(), "v1")
+    layered = LayeredSnapshot(base, _delta())
+
+    untouched = [group for group in layered.summarize(layered.select({})) if group["market"] == "Bangarpet"]
+
+    assert untouched == [group for group in base.summarize(None) if group["market"] == "Bangarpet"]
+
+
+def test_layered_positions_split_at_the_base_length():
+    layered = _layered()
+
+    positions = layered.select({"variety": "Red"})
+
+    assert np.all(np.diff(positions) > 0)
+    assert (positions >= len(layered.base)).sum() == 3
+
+
+def test_random_deltas_match_compaction():
+    rng = np.random.default_rng(7)
+    markets, varieties = ["Kolar", "Mulbagal", "Malur", "Bangarpet"], ["Red", "White", "Local"]
+    days = [f"{day:02d}/06/2025" for day in range(1, 11)]
+
+    def frame(size):
+        return pd.DataFrame([
+            _row(rng.choice(markets), rng.choice(varieties), rng.choice(days), int(rng.integers(5, 30)) * 100)
+            for _ in range(size)
+        ]).drop_duplicates(subset=["market", "variety", "arrival_date"], keep="last")
+
+    base = PriceSnapshot(frame(200).reset_index(drop=True), "v1")
+    layered = LayeredSnapshot(base, frame(25).reset_index(drop=True))
+    compacted = _compacted(layered)
+
+    for filters in ({}, {"market": "Kolar"}, {"variety": "white"}):
+        assert layered.summarize(layered.select(filters), max_groups=50) == compacted.summarize(
+            compacted.select(filters), max_groups=50
+        )
@@ -0,0 +1,12 @@
+import pytest
+
+from cropprice_agent import tools
+
+
+@pytest.mark.parametrize("cursor", ["abc", "-3", "1.5"])
+def test_malformed_cursor_is_an_error_not_an_api_fallback(monkeypatch, cursor):
+    monkeypatch.setattr(tools, "call_price_api", lambda filters: pytest.fail("fell back to the API"))
+
+    result = tools.call_price_api_data({"cursor": cursor})
+
+    assert "error" in result
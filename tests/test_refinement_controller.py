@@ -0,0 +1,126 @@
+import asyncio
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from loop_agent.controller import STATE_REFINEMENT_REPORT, RefinementController, change_ratio, is_complete
+
+COMPLETION_PHRASE = "No major issues found."
+
+
+class _ScriptedLlm(BaseLlm):
+    """Fake model replying with the next scripted text (the last one repeats), billing fixed tokens per call."""
+
+    replies: list
+    prompt_tokens: int = 100
+    output_tokens: int = 50
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        text = self.replies[min(self.calls, len(self.replies) - 1)]
+        self.calls += 1
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=self.prompt_tokens, candidates_token_count=self.output_tokens
+            ),
+        )
+
+
+def _run(critiques, drafts, **settings):
+    critic_model = _ScriptedLlm(model="fake-critic", replies=critiques)
+    refiner_model = _ScriptedLlm(model="fake-refiner", replies=drafts)
+    controller = RefinementController(
+        name="refinement",
+        critic=LlmAgent(name="critic", model=critic_model, output_key="criticism"),
+        refiner=LlmAgent(name="refiner", model=refiner_model, output_key="current_document"),
+        document_key="current_document",
+        criticism_key="criticism",
+        completion_phrase=COMPLETION_PHRASE,
+        **settings,
+    )
+    runner = InMemoryRunner(agent=controller, app_name="loop")
+
+    async def run():
+        session = await runner.session_service.create_session(
+            app_name="loop", user_id="farmer", state={"current_document": "line one\nline two\nline three"}
+        )
+        message = types.Content(role="user", parts=[types.Part(text="Refine the dialogue.")])
+        async for _ in runner.run_async(user_id="farmer", session_id=session.id, new_message=message):
+            pass
+        return (await runner.session_service.get_session(app_name="loop", user_id="farmer", session_id=session.id)).state
+
+    state = asyncio.run(run())
+    return state[STATE_REFINEMENT_REPORT], critic_model, refiner_model
+
+
+def _draft(number):
+    return "\n".join(f"draft {number} line {line}" for line in range(3))
+
+
+def test_completion_phrase_stops_before_refining():
+    report, critic_model, refiner_model = _run([f'"{COMPLETION_PHRASE.upper()}"'], [_draft(1)])
+
+    assert report["stop_reason"] == "critic_complete"
+    assert critic_model.calls == 1
+    assert refiner_model.calls == 0
+    assert report["tokens"] == 150
+
+
+def test_unchanged_refinement_converges():
+    report, critic_model, refiner_model = _run(["Tighten it."], ["line one\nline two\nline three"])
+
+    assert report["stop_reason"] == "converged"
+    assert refiner_model.calls == 1
+    assert report["iterations"][0]["change"] == 0.0
+
+
+def test_loop_ends_at_max_iterations():
+    report, critic_model, refiner_model = _run(
+        ["Tighten it."], [_draft(number) for number in range(5)], max_iterations=3
+    )
+
+    assert report["stop_reason"] == "max_iterations"
+    assert [iteration["iteration"] for iteration in report["iterations"]] == [1, 2, 3]
+    assert refiner_model.calls == 3
+
+
+def test_token_budget_stops_the_loop():
+    # Each critic or refiner call bills 150 tokens
+    report, critic_model, refiner_model = _run(["Tighten it."], [_draft(1), _draft(2)], token_budget=400)
+
+    assert report["stop_reason"] == "budget"
+    assert critic_model.calls == 2
+    assert refiner_model.calls == 1
+    assert report["tokens"] == 450
+    assert report["output_tokens"] == 150
+
+
+def test_time_budget_stops_the_loop():
+    report, critic_model, refiner_model = _run(["Tighten it."], [_draft(1)], time_budget_sec=0)
+
+    assert report["stop_reason"] == "budget"
+    assert refiner_model.calls == 0
+
+
+def test_report_records_each_iteration():
+    report, _, _ = _run(["Tighten it.", COMPLETION_PHRASE], [_draft(1)])
+
+    assert report["stop_reason"] == "critic_complete"
+    first, second = report["iterations"]
+    assert first["refine_mode"] == "rewrite"
+    assert first["refiner_output_tokens"] == 50
+    assert first["change"] == 1.0
+    assert first["tokens"] == 300
+    assert set(second) == {"iteration", "critic_ms"}
+    assert report["total_ms"] >= 0
+
+
+def test_helpers():
+    assert is_complete("  **no MAJOR issues found.**\n", COMPLETION_PHRASE)
+    assert not is_complete("No major issues found, but shorten line 2.", COMPLETION_PHRASE)
+    assert change_ratio("a\nb\nc\nd", "a\nb\nc\nd") == 0.0
+    assert change_ratio("a\nb\nc\nd", "a\nb\nc\nX") == 0.25
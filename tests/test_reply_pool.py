@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+from google.genai import types
+
+from reply_pool import greeting_reply, mood_reply
+from reply_pool.lexicon import is_greeting
+
+
+def _context(text):
+    return SimpleNamespace(user_content=types.Content(role="user", parts=[types.Part(text=text)]))
+
+
+def test_is_greeting():
+    assert is_greeting("Namaste ji!")
+    assert is_greeting("good morning")
+    assert is_greeting("hello hello")
+    assert not is_greeting("hello, what is the onion price today?")
+    assert not is_greeting("")
+
+
+def test_greeting_reply_answers_bare_greetings():
+    reply = greeting_reply(_context("hello"))
+
+    assert reply is not None and reply.parts[0].text
+
+
+def test_greeting_reply_leaves_other_messages_to_the_model():
+    assert greeting_reply(_context("hi, my tomato leaves have spots")) is None
+
+
+def test_mood_reply_leaves_other_messages_to_the_model():
+    assert mood_reply(_context("stressed about the loan and the rain")) is None
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from cropprice_agent.response_cache import MemoryCacheBackend, ResponseCache
+
+
+def _cache_with(value, age_sec, ttl_sec=10, stale_ttl_sec=100):
+    backend = MemoryCacheBackend()
+    backend.set("key", value, time.time() - age_sec)
+    return ResponseCache(backend, ttl_sec=ttl_sec, stale_ttl_sec=stale_ttl_sec), backend
+
+
+class _BlockingFetch:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        self.finished.set()
+        return self.value
+
+
+def test_fresh_entry_skips_upstream():
+    cache, _ = _cache_with(["fresh"], age_sec=1)
+
+    assert cache.get_or_fetch("key", lambda: ["new"]) == ["fresh"]
+
+
+def test_stale_entry_is_served_while_a_single_refresh_runs():
+    cache, backend = _cache_with(["stale"], age_sec=20)
+    fetch = _BlockingFetch(["new"])
+
+    # The upstream call is blocked, yet every caller gets the stale value at once
+    results = [cache.get_or_fetch("key", fetch) for _ in range(5)]
+    assert results == [["stale"]] * 5
+    assert fetch.calls == 1
+
+    fetch.release.set()
+    assert fetch.finished.wait(5)
+    deadline = time.time() + 5
+    while backend.get("key")[0] != ["new"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get_or_fetch("key", fetch) == ["new"]
+    assert fetch.calls == 1
+
+
+def test_failed_refresh_keeps_the_stale_entry():
+    cache, backend = _cache_with(["stale"], age_sec=20)
+    fetch = _BlockingFetch(None)
+    fetch.release.set()
+
+    assert cache.get_or_fetch("key", fetch) == ["stale"]
+    assert fetch.finished.wait(5)
+    assert backend.get("key")[0] == ["stale"]
+
+
+def test_expired_entry_is_fetched_in_the_foreground():
+    cache, _ = _cache_with(["ancient"], age_sec=500)
+
+    assert cache.get_or_fetch("key", lambda: ["new"]) == ["new"]
+
+
+def test_concurrent_misses_share_one_call():
+    cache = ResponseCache(MemoryCacheBackend())
+    fetch = _BlockingFetch(["new"])
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("key", fetch))) for _ in range(4)]
+    for caller in callers:
+        caller.start()
+    time.sleep(0.1)
+    fetch.release.set()
+    for caller in callers:
+        caller.join(5)
+
+    assert results == [["new"]] * 4
+    assert fetch.calls == 1
@@ -0,0 +1,96 @@
+import asyncio
+import importlib.util
+import os
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+# Importing the coordinator_agent package builds the production agent tree, and pytest
+# builds it again through the repository's __init__.py; ADK agents take one parent only
+_spec = importlib.util.spec_from_file_location(
+    "router_under_test", os.path.join(os.path.dirname(os.path.dirname(__file__)), "coordinator_agent", "router.py")
+)
+router_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(router_module)
+IntentRouterAgent, classify = router_module.IntentRouterAgent, router_module.classify
+
+
+class _ScriptedLlm(BaseLlm):
+    """Fake model that answers every call with the same part and counts its calls."""
+
+    part: types.Part
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        yield LlmResponse(content=types.Content(role="model", parts=[self.part]))
+
+
+def _router():
+    price_model = _ScriptedLlm(model="fake-price", part=types.Part(text="Onion is 2000 per quintal."))
+    coordinator_model = _ScriptedLlm(
+        model="fake-coordinator",
+        part=types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": "price_agent"})),
+    )
+    price_agent = LlmAgent(name="price_agent", description="Crop prices.", model=price_model)
+    coordinator = LlmAgent(
+        name="coordinator", description="Farming coordinator.", model=coordinator_model, sub_agents=[price_agent]
+    )
+    router = IntentRouterAgent(name="router", coordinator=coordinator, routes={"price": price_agent})
+    return router, coordinator_model, price_model
+
+
+def _ask(runner, session_id, text):
+    async def run():
+        events = []
+        async for event in runner.run_async(
+            user_id="farmer", session_id=session_id, new_message=types.Content(role="user", parts=[types.Part(text=text)])
+        ):
+            events.append(event)
+        return events
+
+    return asyncio.run(run())
+
+
+def _new_session(runner):
+    return asyncio.run(runner.session_service.create_session(app_name=runner.app_name, user_id="farmer")).id
+
+
+def _text(message):
+    return types.Content(role="user", parts=[types.Part(text=message)])
+
+
+def test_classify_rules():
+    assert classify(_text("hello")) == "greeting"
+    assert classify(_text("onion price in Kolar")) == "price"
+    assert classify(_text("price of spray for leaf blight")) is None
+    assert classify(_text("what should I do about it")) is None
+
+
+def test_follow_up_goes_to_the_active_sub_agent():
+    router, coordinator_model, price_model = _router()
+    runner = InMemoryRunner(agent=router, app_name="farming")
+    session_id = _new_session(runner)
+
+    _ask(runner, session_id, "what about onions")
+    assert coordinator_model.calls == 1
+    assert price_model.calls == 1
+
+    events = _ask(runner, session_id, "and in Kolar tomorrow")
+    assert coordinator_model.calls == 1
+    assert price_model.calls == 2
+    assert events[-1].author == "price_agent"
+    assert router.stats.snapshot()["hits"] == {"follow_up": 1}
+
+
+def test_new_session_starts_at_the_coordinator():
+    router, coordinator_model, _ = _router()
+    runner = InMemoryRunner(agent=router, app_name="farming")
+
+    _ask(runner, _new_session(runner), "what should I do")
+
+    assert coordinator_model.calls == 1
+    assert router.stats.snapshot()["routes"] == {"coordinator": 1}
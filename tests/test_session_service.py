@@ -0,0 +1,63 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from session_service import SessionJanitor, session_service_uri, start_session_janitor
+
+google_adk = pytest.importorskip("google.adk")
+from google.adk.events import Event  # noqa: E402
+from google.adk.sessions.sqlite_session_service import SqliteSessionService  # noqa: E402
+
+TTL_SEC = 3600
+
+
+async def _create_sessions(service, count: int) -> list:
+    sessions = []
+    for number in range(count):
+        session = await service.create_session(app_name="app", user_id=f"user-{number}")
+        await service.append_event(session, Event(author="user", invocation_id=f"e-{number}"))
+        sessions.append(session)
+    return sessions
+
+
+def _session_ids(db_path: str) -> set:
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT id FROM sessions")}
+
+
+def test_sqlite_sweep_keeps_fresh_sessions_and_expires_idle_ones(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    fresh, idle = asyncio.run(_create_sessions(SqliteSessionService(db_path=db_path), 2))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE sessions SET update_time = ? WHERE id = ?", (time.time() - 2 * TTL_SEC, idle.id))
+
+    result = SessionJanitor(f"sqlite:///{db_path}", ttl_sec=TTL_SEC).sweep()
+
+    assert _session_ids(db_path) == {fresh.id}
+    assert result["expired_sessions"] == 1
+    assert result["expired_events"] == 1
+
+
+def test_sqlite_sweep_trims_event_history(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    service = SqliteSessionService(db_path=db_path)
+
+    async def add_events():
+        session = await service.create_session(app_name="app", user_id="user")
+        for number in range(5):
+            await service.append_event(session, Event(author="user", invocation_id=f"e-{number}"))
+        return session
+
+    session = asyncio.run(add_events())
+    result = SessionJanitor(f"sqlite:///{db_path}", ttl_sec=TTL_SEC, max_events=2).sweep()
+
+    assert result == {"expired_sessions": 0, "expired_events": 0, "trimmed_events": 3}
+    assert len(asyncio.run(service.get_session(app_name="app", user_id="user", session_id=session.id)).events) == 2
+
+
+def test_memory_option_maps_to_in_memory_uri(monkeypatch):
+    monkeypatch.setenv("SESSION_SERVICE_URI", "memory")
+    assert session_service_uri() == "memory://"
+    assert start_session_janitor(session_service_uri()) is None
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+
+from google.api_core.exceptions import NotFound
+
+# The wildlife app imports its modules flat, from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wildlife_alert"))
+
+from spool import PRIORITY_ALERT, PRIORITY_LOG, FirestoreSpool  # noqa: E402
+
+SERVER_TIMESTAMP = object()
+
+
+class _FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append(("set", ref, data))
+
+    def update(self, ref, data):
+        self.writes.append(("update", ref, data))
+
+    def commit(self):
+        for op, ref, _ in self.writes:
+            if op == "update" and ref not in self.db.docs:
+                raise NotFound(f"No document to update: {ref}")
+        for op, ref, data in self.writes:
+            self.db.docs.setdefault(ref, {}).update(data)
+
+
+class _FakeFirestore:
+    def __init__(self):
+        self.docs = {}
+
+    def batch(self):
+        return _FakeBatch(self)
+
+    def collection(self, name):
+        return self._Collection(name)
+
+    class _Collection:
+        def __init__(self, name):
+            self.name = name
+
+        def document(self, doc_id):
+            return f"{self.name}/{doc_id}"
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_dropped_writes_are_not_counted_as_committed(tmp_path):
+    db = _FakeFirestore()
+    spool = FirestoreSpool(db, str(tmp_path / "spool.db"), SERVER_TIMESTAMP)
+    try:
+        spool.enqueue("alerts", "a1", "set", {"animal": "boar", "at": SERVER_TIMESTAMP}, PRIORITY_ALERT)
+        # Update of a document that was never created: permanently invalid
+        spool.enqueue("detections", "missing", "update", {"frames": 3}, PRIORITY_LOG)
+        spool.enqueue("detections", "d1", "set", {"frames": 1}, PRIORITY_LOG)
+
+        assert _wait_for(lambda: spool.depth()["alerts"] + spool.depth()["logs"] == 0)
+    finally:
+        spool.close()
+
+    assert spool.stats["dropped"] == 1
+    assert spool.stats["committed"] == 2
+    assert db.docs["alerts/a1"] == {"animal": "boar", "at": SERVER_TIMESTAMP}
+    assert "detections/missing" not in db.docs
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+# The wildlife app imports its modules flat, from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wildlife_alert"))
+
+from policy import (  # noqa: E402
+    ACTION_POLICY, ALERT_IMMEDIATELY, DETECTION_CONFIDENCE_THRESHOLD, IGNORE, MONITOR, decide_action,
+)
+
+
+@pytest.mark.parametrize("animal, confidence, expected", [
+    ("leopard", 0.95, ALERT_IMMEDIATELY),
+    ("leopard", 0.75, ALERT_IMMEDIATELY),
+    ("leopard", 0.74, MONITOR),
+    ("leopard", 0.3, MONITOR),
+    ("leopard", 0.29, IGNORE),
+    ("lion", 0.8, ALERT_IMMEDIATELY),
+    ("lion", 0.6, MONITOR),
+    ("boar", 0.75, ALERT_IMMEDIATELY),
+    ("boar", 0.6, MONITOR),
+    ("boar", 0.49, IGNORE),
+    ("deer", 0.99, MONITOR),
+    ("deer", 0.75, MONITOR),
+    ("deer", 0.7, IGNORE),
+])
+def test_decide_action(animal, confidence, expected):
+    assert decide_action(animal, confidence) == expected
+
+
+def test_no_alert_below_the_detection_threshold():
+    for alert_at, _ in ACTION_POLICY.values():
+        assert alert_at >= DETECTION_CONFIDENCE_THRESHOLD
+
+
+class _Recorder:
+    """Records every method call made on it."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+
+class _SinglePassProcessor:
+    def __init__(self, detections):
+        self.detections = detections
+
+    def process_image(self, image_path):
+        return self.detections
+
+
+def test_single_pass_detection_never_asks_gemini(monkeypatch, tmp_path):
+    pytest.importorskip("google.generativeai")
+    pytest.importorskip("firebase_admin")
+    import agent
+
+    monkeypatch.setenv("WILDLIFE_PREFILTER", "0")
+    firestore = _Recorder()
+    detector = agent.Agent(
+        _SinglePassProcessor([
+            {"label": "leopard", "confidence": 0.9, "box": None, "action": "MONITOR"},
+            {"label": "boar", "confidence": 0.8, "box": None, "action": "ALERT_IMMEDIATELY"},
+        ]),
+        firestore,
+    )
+    monkeypatch.setattr(detector, "_get_gemini_decision", lambda *args: pytest.fail("asked Gemini for a decision"))
+    image = tmp_path / "north_0001.jpg"
+    image.write_bytes(b"jpeg")
+
+    assert detector.process_image_file(str(image)) == 2
+    assert firestore.calls.count("send_realtime_alert") == 2
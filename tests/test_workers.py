@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+
+# The wildlife app imports its modules flat, from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wildlife_alert"))
+
+from workers import DetectionPool, RateLimiter, camera_of  # noqa: E402
+
+
+class _FakeDetector:
+    """Job that records when each frame starts and finishes, and how many frames per camera overlap."""
+
+    def __init__(self, delay_sec=0.01):
+        self.delay_sec = delay_sec
+        self.finished = []
+        self.max_active = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, path):
+        camera = camera_of(path)
+        with self._lock:
+            self._active[camera] = self._active.get(camera, 0) + 1
+            self.max_active[camera] = max(self.max_active.get(camera, 0), self._active[camera])
+        time.sleep(self.delay_sec)
+        with self._lock:
+            self._active[camera] -= 1
+            self.finished.append(path)
+        return 1
+
+
+def _wait_idle(pool, jobs, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        snapshot = pool.snapshot()
+        if snapshot["completed"] + snapshot["failed"] == jobs and snapshot["in_progress"] == 0:
+            return snapshot
+        time.sleep(0.01)
+    raise AssertionError(f"pool did not finish: {pool.snapshot()}")
+
+
+def test_one_camera_runs_in_submit_order_one_frame_at_a_time():
+    pool = DetectionPool(concurrency=4)
+    detector = _FakeDetector()
+    paths = [f"north_{index:03d}.jpg" for index in range(20)]
+
+    for path in paths:
+        pool.submit(path, detector)
+    _wait_idle(pool, len(paths))
+    pool.stop()
+
+    assert detector.finished == paths
+    assert detector.max_active == {"north": 1}
+
+
+def test_cameras_run_in_parallel():
+    pool = DetectionPool(concurrency=2)
+    # Both jobs must be inside the barrier at once, which a serial pool never reaches
+    barrier = threading.Barrier(2, timeout=5)
+    results = []
+
+    for path in ("north_1.jpg", "south_1.jpg"):
+        pool.submit(path, lambda path: barrier.wait(), on_done=lambda result, error: results.append(error))
+    _wait_idle(pool, 2)
+    pool.stop()
+
+    assert results == [None, None]
+
+
+def test_on_done_gets_job_errors():
+    pool = DetectionPool(concurrency=1)
+    outcomes = []
+
+    def failing(path):
+        raise RuntimeError("vision call failed")
+
+    pool.submit("north_1.jpg", failing, on_done=lambda result, error: outcomes.append(str(error)))
+    snapshot = _wait_idle(pool, 1)
+    pool.stop()
+
+    assert outcomes == ["vision call failed"]
+    assert snapshot["failed"] == 1
+
+
+def test_queue_depth_returns_to_zero():
+    pool = DetectionPool(concurrency=2, max_queue=5)
+    detector = _FakeDetector(delay_sec=0.005)
+
+    for index in range(30):
+        pool.submit(f"{('north', 'south', 'east')[index % 3]}_{index}.jpg", detector)
+        assert pool.depth() <= 5
+    snapshot = _wait_idle(pool, 30)
+    pool.stop()
+
+    assert pool.depth() == 0
+    assert snapshot["queue_depth"] == 0
+    assert snapshot["cameras_waiting"] == 0
+    assert 0 < snapshot["max_depth"] <= 5
+    assert snapshot["completed"] == 30
+
+
+def test_token_bucket_caps_the_call_rate():
+    # 10 calls a second after a burst of 2
+    limiter = RateLimiter(per_minute=600, burst=2)
+    calls = []
+
+    def caller():
+        for _ in range(4):
+            limiter.acquire()
+            calls.append(time.monotonic())
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    # 12 calls: 2 from the burst, the other 10 at least 0.1 s apart
+    assert len(calls) == 12
+    assert max(calls) - started >= 0.95
+    assert sorted(calls)[2] - started >= 0.08
+
+
+def test_camera_comes_from_the_file_name_prefix():
+    assert camera_of("/images/north_0001.jpg") == "north"
+    assert camera_of("/images/frame.jpg") == "default"
@@ -1,14 +1,26 @@
 # agent.py
 import os
-import time
 from dotenv import load_dotenv
 import google.generativeai as genai
 
 from firestore_utils import FirestoreUtils
 from image_processor import ImageProcessor
+from incidents import IncidentTracker
+from ingest import ImageIngestor
+from ledger import ProcessedLedger, default_ledger_path
+from policy import ALERT_IMMEDIATELY, DETECTION_CONFIDENCE_THRESHOLD, MONITOR, decide_action
+from prefilter import prefilter_from_env
+from workers import camera_of, pool_from_env
+
+import repo_root  # noqa: F401  (puts the shared packages on sys.path)
+from telemetry import get_logger, observe_stage, timed
 
 load_dotenv() # It's good practice to have this here too for robustness
 
+log = get_logger("wildlife.agent")
+# Per-frame events; LOG_SAMPLE_EVERY overrides these
+DETECTION_SAMPLE_EVERY = int(os.getenv("WILDLIFE_LOG_SAMPLE_EVERY", 10))
+
 class Agent:
     # --- CHANGE START ---
     # The __init__ method MUST accept image_processor and firestore_utils
@@ -24,7 +36,17 @@ class Agent:
         self.gemini_model = genai.GenerativeModel('gemini-pro')
 
         self.target_animals = ["boar", "leopard", "lion"]
-        self.detection_confidence_threshold = 0.75
+        self.detection_confidence_threshold = DETECTION_CONFIDENCE_THRESHOLD
+        self.ingestor = None
+        self.pool = None
+        # Drops static frames before they cost a vision call
+        self.prefilter = prefilter_from_env()
+        # Merges consecutive sightings per camera and species into incidents
+        self.incidents = IncidentTracker(
+            window_sec=float(os.getenv("WILDLIFE_INCIDENT_WINDOW_SEC", 120)),
+            update_interval_sec=float(os.getenv("WILDLIFE_INCIDENT_UPDATE_SEC", 60)),
+            realert_sec=float(os.getenv("WILDLIFE_REALERT_SEC", 600)),
+        )
 
     def _get_gemini_decision(self, animal_type: str, confidence: float) -> str:
         """
@@ -44,62 +66,125 @@ class Agent:
             decision = response.text.strip().upper()
             return decision
         except Exception as e:
-            print(f"Error calling Gemini API: {e}")
+            log.error("gemini.decision_failed", animal=animal_type, error=str(e))
             return "MONITOR"
 
+    def process_image_file(self, image_path: str) -> int:
+        """
+        Analyses one image, logs its detections and raises alerts for threats.
+        Returns the number of detections.
+        """
+        # One trace per frame; prefilter, preprocess, vision_call and decision are child spans
+        with timed("process_image"):
+            return self._process_image_file(image_path)
+
+    def _process_image_file(self, image_path: str) -> int:
+        filename = os.path.basename(image_path)
+        log.debug("image.processing", path=image_path)
+
+        if self.prefilter is not None:
+            with timed("prefilter") as span:
+                analyse = self.prefilter.should_analyse(image_path)
+                if span is not None:
+                    span.set_attribute("wildlife.analyse", analyse)
+            if not analyse:
+                return 0
+
+        detections = self.image_processor.process_image(image_path)
+
+        camera = camera_of(image_path)
+        # Capture time of the frame, so catch-up after a restart groups sightings correctly
+        seen_at = os.path.getmtime(image_path)
+
+        for detection in detections:
+            animal_type = detection["label"]
+            confidence = detection["confidence"]
+            bbox = detection.get("box")
+
+            with timed("decision", mode="policy" if "action" in detection else "legacy"):
+                if "action" in detection:
+                    # Single-pass vision result: decide locally instead of a second model call
+                    gemini_action = decide_action(animal_type, confidence)
+                    decided_by = "policy"
+                elif animal_type in self.target_animals and confidence >= self.detection_confidence_threshold:
+                    # Target animal with high confidence: ask Gemini for the action
+                    gemini_action = self._get_gemini_decision(animal_type, confidence)
+                    decided_by = "gemini"
+                else:
+                    # Non-target animal or below the confidence threshold: no immediate action
+                    gemini_action = None
+                    decided_by = "threshold"
+            log.info(
+                "wildlife.detection", sample_every=DETECTION_SAMPLE_EVERY,
+                image=filename, animal=animal_type, confidence=round(confidence, 2), box=bbox,
+                action=gemini_action, decided_by=decided_by, suggested=detection.get("action"),
+            )
+
+            # One detection document and at most one alert document per incident, not per frame
+            tracked = self.incidents.observe(
+                camera, animal_type, confidence, bbox, filename, seen_at=seen_at,
+                alert=gemini_action == ALERT_IMMEDIATELY,
+            )
+            incident = tracked["incident"]
+
+            if tracked["new"]:
+                self.firestore_utils.log_detection({
+                    "image_filename": filename,
+                    "animal_type": animal_type,
+                    "confidence": confidence,
+                    "bounding_box": bbox,
+                    "source": "camera_feed_simulated",
+                    **incident.summary()
+                }, doc_id=incident.id)
+            elif tracked["write"]:
+                self.firestore_utils.update_detection(incident.id, incident.summary())
+
+            alert_message = f"URGENT: {animal_type.upper()} detected in the field! Confidence: {incident.max_confidence:.2f}. Location: {image_path}"
+            if tracked["alert"]:
+                self.firestore_utils.send_realtime_alert({
+                    "type": "animal_threat",
+                    "animal": animal_type,
+                    "confidence": confidence,
+                    "message": alert_message,
+                    "image_ref": filename,
+                    "incident_id": incident.id,
+                    "alert_count": incident.alert_count
+                }, doc_id=incident.id)
+            elif tracked["realert"]:
+                self.firestore_utils.update_alert(incident.id, {
+                    "status": "new",
+                    "confidence": incident.max_confidence,
+                    "message": f"STILL PRESENT: {alert_message}",
+                    "image_ref": filename,
+                    "frames": incident.frames,
+                    "alert_count": incident.alert_count
+                })
+            elif gemini_action == ALERT_IMMEDIATELY:
+                log.info(
+                    "wildlife.alert_suppressed", sample_every=DETECTION_SAMPLE_EVERY,
+                    animal=animal_type, incident=incident.id, frames=incident.frames,
+                )
+            elif gemini_action == MONITOR:
+                log.debug("wildlife.monitoring", animal=animal_type, incident=incident.id)
+
+        return len(detections)
+
     def run_detection_loop(self, image_source_dir="sample_images", detection_interval_sec=5):
         """
-        Main detection loop. Continuously monitors for images, processes them,
-        and triggers actions based on detections.
+        Main detection loop. Catches up on images not yet in the processed-file
+        ledger, then processes new images as they arrive.
+        WILDLIFE_INGEST_MODE=poll rescans every detection_interval_sec instead of watching.
+        Images are analysed on a worker pool (see workers.pool_from_env) in per-camera order.
         """
-        print(f"Starting wildlife detection loop. Monitoring {image_source_dir}...")
-        processed_images = set()
-
-        while True:
-            for filename in os.listdir(image_source_dir):
-                if filename.lower().endswith(('.png', '.jpg', '.jpeg')) and filename not in processed_images:
-                    image_path = os.path.join(image_source_dir, filename)
-                    print(f"\nProcessing image: {image_path}")
-
-                    detections = self.image_processor.process_image(image_path)
-
-                    if detections:
-                        for detection in detections:
-                            animal_type = detection["label"]
-                            confidence = detection["confidence"]
-                            bbox = detection["box"]
-
-                            print(f"  Detected: {animal_type} (Confidence: {confidence:.2f}, Box: {bbox})")
-
-                            self.firestore_utils.log_detection({
-                                "image_filename": filename,
-                                "animal_type": animal_type,
-                                "confidence": confidence,
-                                "bounding_box": bbox,
-                                "source": "camera_feed_simulated"
-                            })
-
-                            if animal_type in self.target_animals and confidence >= self.detection_confidence_threshold:
-                                print(f"  Target animal {animal_type} detected with high confidence. Querying Gemini for action...")
-                                gemini_action = self._get_gemini_decision(animal_type, confidence)
-                                print(f"  Gemini recommends: {gemini_action}")
-
-                                if gemini_action == "ALERT_IMMEDIATELY":
-                                    alert_message = f"URGENT: {animal_type.upper()} detected in the field! Confidence: {confidence:.2f}. Location: {image_path}"
-                                    self.firestore_utils.send_realtime_alert({
-                                        "type": "animal_threat",
-                                        "animal": animal_type,
-                                        "confidence": confidence,
-                                        "message": alert_message,
-                                        "image_ref": filename
-                                    })
-                                elif gemini_action == "MONITOR":
-                                    print(f"  Monitoring {animal_type} situation.")
-                            elif animal_type not in self.target_animals and confidence >= self.detection_confidence_threshold:
-                                print(f"  Non-target animal {animal_type} detected. No immediate alert.")
-                            else:
-                                print(f"  Detection below confidence threshold or not a target animal for immediate action.")
-
-                        processed_images.add(filename)
-
-            time.sleep(detection_interval_sec)
\ No newline at end of file
+        log.info("wildlife.loop_started", image_source_dir=image_source_dir)
+        # Time each frame spent queued for a worker; the rate-limit wait is timed by ImageProcessor
+        self.pool = pool_from_env(on_wait=lambda seconds: observe_stage("queue_wait", seconds))
+        self.ingestor = ImageIngestor(
+            image_source_dir,
+            ProcessedLedger(default_ledger_path(image_source_dir)),
+            handler=self.process_image_file,
+            mode=os.getenv("WILDLIFE_INGEST_MODE", "watch"),
+            poll_interval_sec=detection_interval_sec,
+            pool=self.pool,
+        )
+        self.ingestor.run()
@@ -1,12 +1,18 @@
 # firestore_utils.py
+import time
 import firebase_admin
 from firebase_admin import credentials, firestore
 import os
 from dotenv import load_dotenv
+from spool import PRIORITY_ALERT, PRIORITY_LOG, FirestoreSpool, default_spool_path, new_doc_id
+import repo_root  # noqa: F401  (puts the shared packages on sys.path)
+from telemetry import get_logger
 
 # Load environment variables from .env file
 load_dotenv()
 
+log = get_logger("wildlife.firestore")
+
 class FirestoreUtils:
     def __init__(self):
         # Get Firestore credentials path from environment variable
@@ -20,51 +26,89 @@ class FirestoreUtils:
             try:
                 cred = credentials.Certificate(cred_path)
                 firebase_admin.initialize_app(cred)
-                print("Firebase Admin SDK initialized successfully.")
-            except Exception as e:
-                print(f"Error initializing Firebase Admin SDK: {e}")
+                log.info("firestore.initialized")
+            except Exception:
+                log.exception("firestore.init_failed")
                 raise
         self.db = firestore.client()
+        # Writes go through a durable local spool so outages on the farm's link lose nothing
+        self.spool = FirestoreSpool(self.db, default_spool_path(), firestore.SERVER_TIMESTAMP)
+
+    def close(self):
+        """Flushes pending writes if Firestore is reachable; the rest stay spooled for the next start."""
+        self.spool.close()
 
-    def log_detection(self, detection_data: dict):
+    def log_detection(self, detection_data: dict, doc_id: str = None):
         """
-        Logs a detailed wildlife detection event to the 'detections' collection in Firestore.
+        Queues a detailed wildlife detection event for the 'detections' collection in Firestore.
         
         Args:
             detection_data (dict): A dictionary containing details about the detection,
                                    e.g., {"animal_type": "boar", "confidence": 0.95, 
                                          "bounding_box": [x1, y1, x2, y2], "image_filename": "boar_001.jpg"}
+            doc_id (str): Document ID to write to, e.g. an incident ID; a new ID is generated if omitted.
         """
         try:
-            detections_ref = self.db.collection('detections')
-            detections_ref.add({
+            record = {
                 "timestamp": firestore.SERVER_TIMESTAMP, # Use server timestamp for accuracy
+                "captured_at": time.time(), # The server timestamp is when the spool delivered it
                 **detection_data # Unpack the detection_data dictionary
-            })
-            print(f"✅ Logged detection to Firestore: {detection_data.get('animal_type', 'Unknown')} at server timestamp.")
-        except Exception as e:
-            print(f"❌ Error logging detection to Firestore: {e}")
+            }
+            self.spool.enqueue('detections', doc_id or new_doc_id(), "set", record, PRIORITY_LOG)
+            log.debug("firestore.detection_queued", animal=detection_data.get('animal_type', 'Unknown'), doc_id=doc_id)
+        except Exception:
+            log.exception("firestore.detection_failed")
 
-    def send_realtime_alert(self, alert_data: dict):
+    def send_realtime_alert(self, alert_data: dict, doc_id: str = None):
         """
-        Sends a real-time alert to the 'alerts' collection in Firestore.
+        Queues a real-time alert for the 'alerts' collection in Firestore, ahead of detection logs.
         This is for immediate notifications that a listener can pick up.
 
         Args:
             alert_data (dict): A dictionary containing alert-specific information,
                                e.g., {"type": "animal_threat", "animal": "leopard",
                                      "message": "URGENT: Leopard detected!", "image_ref": "leopard_field.jpg"}
+            doc_id (str): Document ID to write to, e.g. an incident ID; a new ID is generated if omitted.
         """
         try:
-            alerts_ref = self.db.collection('alerts')
-            alerts_ref.add({
+            record = {
                 "timestamp": firestore.SERVER_TIMESTAMP, # Use server timestamp for accuracy
+                "captured_at": time.time(), # The server timestamp is when the spool delivered it
                 "status": "new", # A status field can be useful for client-side processing (e.g., mark as 'read')
                 **alert_data # Unpack the alert_data dictionary
-            })
-            print(f"🚨 Sent real-time alert to Firestore: {alert_data.get('message', 'No message')}")
-        except Exception as e:
-            print(f"❌ Error sending real-time alert to Firestore: {e}")
+            }
+            # Alerts jump ahead of any backlog of detection logs
+            self.spool.enqueue('alerts', doc_id or new_doc_id(), "set", record, PRIORITY_ALERT)
+            # Alerts are rare and operationally important, so they are logged at INFO and never sampled
+            log.info("firestore.alert_queued", message=alert_data.get('message', 'No message'), doc_id=doc_id)
+        except Exception:
+            log.exception("firestore.alert_failed")
+
+    def update_detection(self, doc_id: str, fields: dict):
+        """
+        Updates fields of an existing detection document, e.g. the frame count of an ongoing incident.
+        """
+        try:
+            self.spool.enqueue('detections', doc_id, "update", {
+                "updated": firestore.SERVER_TIMESTAMP,
+                **fields
+            }, PRIORITY_LOG)
+        except Exception:
+            log.exception("firestore.detection_update_failed", doc_id=doc_id)
+
+    def update_alert(self, doc_id: str, fields: dict):
+        """
+        Updates an existing alert document instead of adding a new one.
+        Setting status back to "new" lets listeners notify again for the same incident.
+        """
+        try:
+            self.spool.enqueue('alerts', doc_id, "update", {
+                "updated": firestore.SERVER_TIMESTAMP,
+                **fields
+            }, PRIORITY_ALERT)
+            log.info("firestore.alert_updated", message=fields.get('message', ''), doc_id=doc_id)
+        except Exception:
+            log.exception("firestore.alert_update_failed", doc_id=doc_id)
 
 # Note: The `db = init_firestore()` and `log_alert()` functions from your original
 # file are now encapsulated within the FirestoreUtils class.
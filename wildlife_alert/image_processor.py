@@ -1,11 +1,22 @@
 import os
 import re
+import time
+from typing import Literal
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
+from pydantic import BaseModel, Field
+
+import repo_root  # noqa: F401  (puts the shared packages on sys.path)
+from image_pipeline import prepare_image_sync
+from telemetry import get_logger, observe_stage, timed
+from telemetry.adk import MODEL_TOKENS
+from workers import RateLimiter
 
 load_dotenv()
 
+log = get_logger("wildlife.image_processor")
+
 # Initialize Gemini client using Vertex AI
 client = genai.Client(
     vertexai=True,
@@ -13,9 +24,91 @@ client = genai.Client(
     location='us-central1'
 )
 
+
+class AnimalDetection(BaseModel):
+    animal: str = Field(description="Lowercase common name of the animal, e.g. 'boar'.")
+    confidence: float = Field(description="Confidence in the identification, 0.0 to 1.0.")
+    box: list[int] = Field(description="Bounding box as [ymin, xmin, ymax, xmax] normalised to 0-1000.")
+    action: Literal["ALERT_IMMEDIATELY", "MONITOR", "IGNORE"]
+    recommendation: str = Field(description="One sentence of advice for the farmer.")
+
+
+class VisionResult(BaseModel):
+    detections: list[AnimalDetection]
+
+
+STRUCTURED_PROMPT = (
+    "You guard an agricultural field against boar, leopard and lion. "
+    "List every animal clearly visible in this image with its confidence and bounding box. "
+    "For each, choose ALERT_IMMEDIATELY for a clearly visible boar, leopard or lion, "
+    "MONITOR for an uncertain sighting or another large animal, and IGNORE otherwise. "
+    "Return an empty list for an empty field."
+)
+
+
+def _record_usage(span, response):
+    """Record the vision call's token counts in the token histogram and on its span."""
+    usage = response.usage_metadata
+    if usage is None:
+        return
+    input_tokens = usage.prompt_token_count or 0
+    output_tokens = usage.candidates_token_count or 0
+    MODEL_TOKENS.observe(input_tokens, agent="wildlife_vision", direction="input")
+    MODEL_TOKENS.observe(output_tokens, agent="wildlife_vision", direction="output")
+    if span is not None:
+        span.set_attribute("farming.input_tokens", input_tokens)
+        span.set_attribute("farming.output_tokens", output_tokens)
+
+
 class ImageProcessor:
-    def __init__(self):
+    def __init__(self, rate_limiter: RateLimiter = None):
         self.target_animals = ["boar", "leopard", "lion"]
+        # "single_pass" returns animal, box and action from one structured call; "legacy" parses free text
+        self.vision_mode = os.getenv("WILDLIFE_VISION_MODE", "single_pass")
+        # Shared across detection workers; a token is taken right before each Gemini call
+        self.rate_limiter = rate_limiter
+
+    def _wait_for_quota(self):
+        if self.rate_limiter is None:
+            return
+        started = time.monotonic()
+        self.rate_limiter.acquire()
+        observe_stage("rate_limit_wait", time.monotonic() - started)
+
+    def _process_structured(self, image_blob: dict) -> list[dict]:
+        """
+        Asks Gemini for a JSON VisionResult and returns one dict per detection with
+        label, confidence, box, action and recommendation.
+        """
+        self._wait_for_quota()
+        with timed("vision_call", mode="single_pass") as span:
+            response = client.models.generate_content(
+                model="gemini-2.5-pro",
+                contents=types.Content(
+                    role="user",
+                    parts=[
+                        types.Part(inline_data=image_blob),
+                        types.Part(text=STRUCTURED_PROMPT)
+                    ]
+                ),
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    response_schema=VisionResult,
+                ),
+            )
+            _record_usage(span, response)
+        result = response.parsed or VisionResult.model_validate_json(response.text)
+        log.debug("vision.response", mode="single_pass", detections=len(result.detections), result=result.model_dump())
+        return [
+            {
+                "label": detection.animal.strip().lower(),
+                "confidence": max(0.0, min(1.0, detection.confidence)),
+                "box": detection.box,
+                "action": detection.action,
+                "recommendation": detection.recommendation,
+            }
+            for detection in result.detections
+        ]
 
     def process_image(self, image_path: str) -> list[dict]:
         """
@@ -23,19 +116,29 @@ class ImageProcessor:
         - Animal name
         - Confidence level
         - Recommendation
+        In single-pass mode the same call also returns a bounding box and an action.
         Returns a list with detection info or empty if no target animal is found.
         """
         try:
             with open(image_path, "rb") as image_file:
                 image_bytes = image_file.read()
 
-            print(f"Sending image to Gemini for analysis: {image_path}")
+            # Oriented, downsized JPEG with its real MIME type instead of the raw camera file
+            with timed("preprocess"):
+                prepared = prepare_image_sync(image_bytes)
+            log.debug(
+                "vision.request", path=image_path, original_bytes=prepared.original_size,
+                sent_bytes=len(prepared.data), preprocess_ms=round(prepared.elapsed_ms),
+            )
 
             image_blob = {
-                "mimeType": "image/jpeg",
-                "data": image_bytes
+                "mimeType": prepared.mime_type,
+                "data": prepared.data
             }
 
+            if self.vision_mode == "single_pass":
+                return self._process_structured(image_blob)
+
             prompt_text = (
                 "Analyze this image for wildlife. "
                 "Specifically, is there a boar, leopard, or lion present? "
@@ -55,13 +158,16 @@ class ImageProcessor:
                 ]
             )
 
-            response = client.models.generate_content(
-                model="gemini-2.5-pro",
-                contents=payload
-            )
+            self._wait_for_quota()
+            with timed("vision_call", mode="legacy") as span:
+                response = client.models.generate_content(
+                    model="gemini-2.5-pro",
+                    contents=payload
+                )
+                _record_usage(span, response)
 
             gemini_text_response = response.text.strip()
-            print(f"Gemini Vision Raw Response: {gemini_text_response}")
+            log.debug("vision.response", mode="legacy", text=gemini_text_response)
 
             # Match response patterns
             animal_match = re.search(r"Animal:\s*(.+?)[,\n\r]+.*Confidence:\s*(\d+)%", gemini_text_response, re.IGNORECASE)
@@ -78,14 +184,9 @@ class ImageProcessor:
                     "recommendation": recommendation
                 }
 
-                if animal_type in self.target_animals and confidence >= 0.5:
-                    print(f"✅ Target animal {animal_type} detected with high confidence.")
-                else:
-                    print(f"⚠️ Non-target or low-confidence animal detected: {animal_type} ({confidence*100:.1f}%)")
                 return [result]
 
             elif "empty field" in gemini_text_response.lower():
-                print("🟢 Gemini detected an empty field.")
                 return []
 
             elif "other animal" in gemini_text_response.lower():
@@ -98,13 +199,13 @@ class ImageProcessor:
                 }]
 
             else:
-                print("❌ Could not parse a valid animal response.")
+                log.warning("vision.unparsed_response", text=gemini_text_response)
                 return []
 
         except FileNotFoundError:
-            print(f"❌ Error: Image file not found at {image_path}")
+            log.error("vision.image_missing", path=image_path)
             return []
-        except Exception as e:
-            print(f"❌ Unexpected error processing image {image_path}: {e}")
+        except Exception:
+            log.exception("vision.failed", path=image_path)
             return []
 
@@ -0,0 +1,135 @@
+# incidents.py
+import threading
+import time
+import uuid
+
+# A sighting more than this long after the previous one starts a new incident
+DEFAULT_WINDOW_SEC = 120
+# Min time between writes that refresh an open incident's documents
+DEFAULT_UPDATE_INTERVAL_SEC = 60
+# Min time between repeat notifications for the same incident
+DEFAULT_REALERT_SEC = 600
+
+
+class Incident:
+    """Consecutive sightings of one species on one camera."""
+
+    def __init__(self, camera: str, species: str, seen_at: float):
+        self.id = f"{camera}-{species}-{int(seen_at)}-{uuid.uuid4().hex[:6]}"
+        self.camera = camera
+        self.species = species
+        self.started_at = seen_at
+        self.last_seen = seen_at
+        # Monotonic time of the last observe(); frame times can lag far behind during catch-up
+        self.observed_at = time.monotonic()
+        self.frames = 0
+        self.max_confidence = 0.0
+        self.last_box = None
+        self.last_image = None
+        self.written_at = None
+        self.alerted_at = None
+        self.alert_count = 0
+
+    def summary(self) -> dict:
+        return {
+            "incident_id": self.id,
+            "camera": self.camera,
+            "frames": self.frames,
+            "max_confidence": self.max_confidence,
+            "first_seen": self.started_at,
+            "last_seen": self.last_seen,
+            "bounding_box": self.last_box,
+            "image_filename": self.last_image,
+        }
+
+
+class IncidentTracker:
+    """
+    Merges detections per (camera, species) into incidents and decides which writes are due.
+
+    observe() returns what the caller should write for a sighting, so Firestore
+    sees one detection document and at most one alert document per incident,
+    refreshed every `update_interval_sec` and re-notified every `realert_sec`.
+
+    An incident ends when its own camera and species go `window_sec` without a
+    sighting, measured in frame time, so one camera's frames never close
+    another camera's incidents. Incidents nobody has observed for `window_sec`
+    of real time are dropped as well, which keeps open_incidents() accurate
+    when cameras go quiet.
+    """
+
+    def __init__(
+        self,
+        window_sec: float = DEFAULT_WINDOW_SEC,
+        update_interval_sec: float = DEFAULT_UPDATE_INTERVAL_SEC,
+        realert_sec: float = DEFAULT_REALERT_SEC,
+    ):
+        self.window_sec = window_sec
+        self.update_interval_sec = update_interval_sec
+        self.realert_sec = realert_sec
+        self._open = {}
+        self._lock = threading.Lock()
+        self.stats = {"incidents": 0, "frames": 0, "writes": 0, "alerts": 0, "suppressed_alerts": 0}
+
+    def observe(self, camera: str, species: str, confidence: float, box, image_ref: str, seen_at: float = None, alert: bool = False) -> dict:
+        """
+        Record a sighting.
+
+        Args:
+            alert: Whether the policy wants an alert for this sighting.
+
+        Returns:
+            {"incident", "new", "write", "alert", "realert"}: "new" means create the
+            detection document, "write" means refresh it, "alert" means create the
+            alert document and "realert" means refresh it as a new notification.
+        """
+        seen_at = time.time() if seen_at is None else seen_at
+        with self._lock:
+            self._expire_idle()
+            key = (camera, species)
+            incident = self._open.get(key)
+            if incident is not None and seen_at - incident.last_seen > self.window_sec:
+                incident = None
+            new = incident is None
+            if new:
+                incident = Incident(camera, species, seen_at)
+                self._open[key] = incident
+                self.stats["incidents"] += 1
+
+            incident.frames += 1
+            incident.last_seen = max(incident.last_seen, seen_at)
+            incident.observed_at = time.monotonic()
+            incident.max_confidence = max(incident.max_confidence, confidence)
+            incident.last_box = box
+            incident.last_image = image_ref
+            self.stats["frames"] += 1
+
+            write = new or seen_at - incident.written_at >= self.update_interval_sec
+            if write:
+                incident.written_at = seen_at
+                self.stats["writes"] += 1
+
+            first_alert = realert = False
+            if alert:
+                if incident.alerted_at is None:
+                    first_alert = True
+                elif seen_at - incident.alerted_at >= self.realert_sec:
+                    realert = True
+                else:
+                    self.stats["suppressed_alerts"] += 1
+                if first_alert or realert:
+                    incident.alerted_at = seen_at
+                    incident.alert_count += 1
+                    self.stats["alerts"] += 1
+
+            return {"incident": incident, "new": new, "write": write, "alert": first_alert, "realert": realert}
+
+    def open_incidents(self) -> int:
+        with self._lock:
+            self._expire_idle()
+            return len(self._open)
+
+    def _expire_idle(self):
+        now = time.monotonic()
+        for key in [key for key, incident in self._open.items() if now - incident.observed_at > self.window_sec]:
+            del self._open[key]
@@ -0,0 +1,213 @@
+# ingest.py
+import os
+import queue
+import threading
+import time
+
+from ledger import ProcessedLedger
+import repo_root  # noqa: F401  (puts the shared packages on sys.path)
+from telemetry import get_logger
+
+log = get_logger("wildlife.ingest")
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Polling still works without watchdog, just with the scan interval as latency
+    FileSystemEventHandler = object
+    Observer = None
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# A file whose size has not changed for this long is considered fully written
+SETTLE_SEC = 0.2
+
+
+def is_image(path: str) -> bool:
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def watch_supported() -> bool:
+    return Observer is not None
+
+
+class _ImageEventHandler(FileSystemEventHandler):
+    def __init__(self, paths: queue.Queue):
+        self._paths = paths
+
+    # Queue items are (path, complete): complete files skip the settle wait
+
+    def on_created(self, event):
+        if not event.is_directory and is_image(event.src_path):
+            self._paths.put((event.src_path, False))
+
+    def on_modified(self, event):
+        if not event.is_directory and is_image(event.src_path):
+            self._paths.put((event.src_path, False))
+
+    def on_closed(self, event):
+        # inotify IN_CLOSE_WRITE: the writer is done with the file
+        if not event.is_directory and is_image(event.src_path):
+            self._paths.put((event.src_path, True))
+
+    def on_moved(self, event):
+        # Cameras and uploaders often write to a temp name and rename into place
+        if not event.is_directory and is_image(event.dest_path):
+            self._paths.put((event.dest_path, True))
+
+
+class ImageIngestor:
+    """
+    Hands every new image in a folder to `handler` exactly once, across restarts.
+
+    Startup catches up on files not yet in the ledger, then watches the folder
+    with inotify (via watchdog) so new files are picked up as they land. Without
+    watchdog, or with mode="poll", the folder is rescanned every `poll_interval_sec`.
+
+    Args:
+        image_source_dir: Folder to ingest from.
+        ledger: Durable record of processed files.
+        handler: Called with an image path; returns the number of detections.
+        mode: "watch" or "poll".
+        poll_interval_sec: Rescan interval in poll mode.
+        pool: DetectionPool to run the handler on; None runs it inline.
+    """
+
+    def __init__(
+        self,
+        image_source_dir: str,
+        ledger: ProcessedLedger,
+        handler,
+        mode: str = "watch",
+        poll_interval_sec: float = 5,
+        pool=None,
+    ):
+        self.image_source_dir = image_source_dir
+        self.ledger = ledger
+        self.handler = handler
+        self.mode = mode if mode == "poll" or watch_supported() else "poll"
+        self.poll_interval_sec = poll_interval_sec
+        self.pool = pool
+        # Files handed to the pool but not yet in the ledger, so repeat events do not queue them twice
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        self._paths = queue.Queue()
+        self._stop = threading.Event()
+        # Updated from the ingest thread and from pool workers finishing jobs
+        self._stats_lock = threading.Lock()
+        self.stats = {"ingested": 0, "skipped": 0, "errors": 0, "last_latency_ms": None}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _scan(self):
+        with os.scandir(self.image_source_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and is_image(entry.name):
+                    self._ingest(entry.path, complete=False)
+
+    def _settled_stat(self, path: str):
+        # Wait until the file stops growing so half-written images are not analysed
+        previous = None
+        while not self._stop.is_set():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            if previous is not None and (stat.st_size, stat.st_mtime_ns) == previous:
+                return stat
+            previous = (stat.st_size, stat.st_mtime_ns)
+            time.sleep(SETTLE_SEC)
+        return None
+
+    def _ingest(self, path: str, complete: bool):
+        # One file raises several events; later ones find it in the ledger without waiting or hashing
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        if self.ledger.seen_version(path, stat.st_mtime_ns):
+            return
+        # An mtime older than the settle window means nobody is still writing the file
+        if not complete and time.time() - stat.st_mtime_ns / 1e9 < SETTLE_SEC:
+            stat = self._settled_stat(path)
+            if stat is None or self.ledger.seen_version(path, stat.st_mtime_ns):
+                return
+        try:
+            sha256 = self.ledger.file_hash(path)
+        except OSError as e:
+            log.warning("wildlife.ingest.unreadable", path=path, error=str(e))
+            return
+        if self.ledger.seen_content(sha256):
+            # Same bytes under another name or re-saved: keep the record, skip the Gemini call
+            self.ledger.record(path, stat.st_mtime_ns, sha256, detections=0)
+            self._count("skipped")
+            return
+
+        if self.pool is None:
+            try:
+                detections = self.handler(path)
+            except Exception as e:
+                self._finish(path, stat.st_mtime_ns, sha256, None, e)
+                return
+            self._finish(path, stat.st_mtime_ns, sha256, detections, None)
+            return
+
+        key = (path, stat.st_mtime_ns)
+        with self._in_flight_lock:
+            if key in self._in_flight:
+                return
+            self._in_flight.add(key)
+        self.pool.submit(
+            path,
+            self.handler,
+            on_done=lambda detections, error: self._finish(path, stat.st_mtime_ns, sha256, detections, error),
+        )
+
+    def _finish(self, path: str, mtime_ns: int, sha256: str, detections, error):
+        with self._in_flight_lock:
+            self._in_flight.discard((path, mtime_ns))
+        if error is not None:
+            # Not recorded, so the image is retried on the next event or restart
+            self._count("errors")
+            log.error("wildlife.ingest.error", path=path, error=str(error))
+            return
+        self.ledger.record(path, mtime_ns, sha256, detections or 0)
+        with self._stats_lock:
+            self.stats["ingested"] += 1
+            self.stats["last_latency_ms"] = round((time.time() - mtime_ns / 1e9) * 1000, 1)
+
+    def run(self):
+        """Catch up from the ledger, then ingest new files until stop() is called."""
+        observer = None
+        if self.mode == "watch":
+            # Watch before catching up so files landing during the scan are not missed
+            observer = Observer()
+            observer.schedule(_ImageEventHandler(self._paths), self.image_source_dir, recursive=False)
+            observer.start()
+
+        started = time.perf_counter()
+        self._scan()
+        log.info(
+            "wildlife.ingest.caught_up", directory=self.image_source_dir,
+            elapsed_ms=round((time.perf_counter() - started) * 1000), ledger_images=self.ledger.count(), mode=self.mode,
+        )
+
+        if observer is None:
+            while not self._stop.wait(self.poll_interval_sec):
+                self._scan()
+            return
+
+        try:
+            while not self._stop.is_set():
+                try:
+                    path, complete = self._paths.get(timeout=1)
+                except queue.Empty:
+                    continue
+                self._ingest(path, complete)
+        finally:
+            observer.stop()
+            observer.join()
+
+    def stop(self):
+        self._stop.set()
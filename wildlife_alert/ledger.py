@@ -0,0 +1,76 @@
+# ledger.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class ProcessedLedger:
+    """
+    Durable record of the images that have already been analysed.
+
+    Each row is keyed by path, modification time (ns) and SHA-256 of the
+    content, so a file that is rewritten in place is analysed again, while a
+    restart or a copy of an already analysed image is not. Lives in SQLite
+    so memory stays flat no matter how many images have been seen.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " path TEXT NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL,"
+            " detections INTEGER NOT NULL, processed_at REAL NOT NULL,"
+            " PRIMARY KEY (path, mtime_ns, sha256))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS processed_sha256 ON processed (sha256)")
+        self._conn.commit()
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as image_file:
+            for chunk in iter(lambda: image_file.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def seen_version(self, path: str, mtime_ns: int) -> bool:
+        """Cheap check that skips hashing for files analysed at this modification time."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM processed WHERE path = ? AND mtime_ns = ? LIMIT 1", (path, mtime_ns)
+            ).fetchone()
+        return row is not None
+
+    def seen_content(self, sha256: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM processed WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone()
+        return row is not None
+
+    def record(self, path: str, mtime_ns: int, sha256: str, detections: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed (path, mtime_ns, sha256, detections, processed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (path, mtime_ns, sha256, detections, time.time()),
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def default_ledger_path(image_source_dir: str) -> str:
+    """WILDLIFE_LEDGER_PATH, or a ledger file next to the watched folder."""
+    return os.getenv("WILDLIFE_LEDGER_PATH") or os.path.join(
+        os.path.dirname(os.path.abspath(image_source_dir)), "processed_images.db"
+    )
@@ -1,6 +1,5 @@
 # main.py
 import os
-import sys
 import time
 from contextlib import asynccontextmanager
 from threading import Thread # Import Thread for running the agent in a background thread
@@ -12,6 +11,10 @@ from fastapi import FastAPI
 from agent import Agent
 from firestore_utils import FirestoreUtils
 from image_processor import ImageProcessor
+from workers import rate_limiter_from_env
+
+import repo_root  # noqa: F401  (puts the shared packages on sys.path)
+from telemetry import REGISTRY, add_metrics_route, configure_logging, configure_tracing
 
 # Import load_dotenv to ensure environment variables are loaded at startup
 from dotenv import load_dotenv
@@ -49,7 +52,8 @@ async def lifespan(app: FastAPI):
         print("✅ Firestore Utilities initialized.")
 
         # 2. Initialize Image Processor (Gemini Vision)
-        image_processor_instance = ImageProcessor()
+        # The Gemini quota is shared by every detection worker
+        image_processor_instance = ImageProcessor(rate_limiter=rate_limiter_from_env())
         print("✅ Image Processor initialized (using Gemini Pro Vision).")
 
         # 3. Initialize the Main AI Agent
@@ -60,6 +64,27 @@ async def lifespan(app: FastAPI):
         )
         print("✅ AI Agent initialized.")
 
+        # Queue gauges for /metrics; the pool only exists once the detection loop has started
+        REGISTRY.gauge(
+            "wildlife_queue_depth", "Frames waiting for a detection worker.",
+            lambda: agent_instance.pool.depth() if agent_instance.pool is not None else None,
+        )
+        REGISTRY.gauge(
+            "wildlife_spool_depth", "Firestore writes waiting in the spool, by kind.",
+            lambda: {
+                (("kind", kind),): count
+                for kind, count in firestore_client_instance.spool.depth().items() if kind != "oldest_age_sec"
+            },
+        )
+        REGISTRY.gauge(
+            "wildlife_spool_oldest_age_seconds", "Age of the oldest write waiting in the spool.",
+            lambda: firestore_client_instance.spool.depth()["oldest_age_sec"],
+        )
+        REGISTRY.gauge(
+            "wildlife_open_incidents", "Incidents still inside their merge window.",
+            agent_instance.incidents.open_incidents,
+        )
+
         # 4. Start detection loop in a background thread
         # This prevents the agent's blocking loop from freezing the FastAPI server
         def run_agent_loop_in_background():
@@ -80,7 +105,11 @@ async def lifespan(app: FastAPI):
 
         # --- Application Shutdown (code after yield will run on shutdown) ---
         print("🛑 Shutting down AI Agent and FastAPI application...")
-        # Add any cleanup logic here if necessary (e.g., stopping threads gracefully)
+        if agent_instance.ingestor is not None:
+            agent_instance.ingestor.stop()
+        if agent_instance.pool is not None:
+            agent_instance.pool.stop()
+        firestore_client_instance.close()
 
     except EnvironmentError as e:
         print(f"❌ Configuration Error: {e}")
@@ -95,6 +124,11 @@ async def lifespan(app: FastAPI):
 # Create FastAPI app instance, linking it to the lifespan context manager
 app = FastAPI(lifespan=lifespan)
 
+# Stage latency histograms and queue gauges in Prometheus format; spans go to TELEMETRY_TRACE_EXPORTER
+add_metrics_route(app)
+configure_logging()
+configure_tracing()
+
 # Example API route (you can add more here for interacting with the agent or data)
 @app.get("/")
 async def root():
@@ -104,11 +138,22 @@ async def root():
     """
     return {"message": "Wildlife Protection AI Agent is running 🐾"}
 
+@app.get("/status")
+async def get_status():
+    """
+    Detection pipeline status: worker pool queue depth and ingestion counters.
+    """
+    if agent_instance is None or agent_instance.pool is None:
+        return {"agent_status": "starting"}
+    ingestor = agent_instance.ingestor
+    return {
+        "agent_status": "running",
+        "detection_pool": agent_instance.pool.snapshot(),
+        "ingestion": dict(ingestor.stats) if ingestor is not None else None,
+        "prefilter": agent_instance.prefilter.snapshot() if agent_instance.prefilter is not None else None,
+        "firestore": firestore_client_instance.spool.snapshot(),
+        "incidents": {**agent_instance.incidents.stats, "open": agent_instance.incidents.open_incidents()},
+    }
+
 # You can add more API endpoints here, for example, to manually trigger a scan,
-# retrieve detection history, or update agent settings.
-# Example:
-# @app.get("/status")
-# async def get_status():
-#     # You can return information about the agent's current state,
-#     # like last detection time, number of alerts, etc.
-#     return {"agent_status": "running", "last_detection": "..."}
\ No newline at end of file
+# retrieve detection history, or update agent settings.
\ No newline at end of file
@@ -0,0 +1,33 @@
+# policy.py
+
+ALERT_IMMEDIATELY = "ALERT_IMMEDIATELY"
+MONITOR = "MONITOR"
+IGNORE = "IGNORE"
+
+# Minimum confidence for any alert; the legacy path only asked Gemini for an action above it
+DETECTION_CONFIDENCE_THRESHOLD = 0.75
+
+# animal -> (alert at or above this confidence, monitor at or above this confidence)
+# Alert thresholds must not go below DETECTION_CONFIDENCE_THRESHOLD
+ACTION_POLICY = {
+    "leopard": (0.75, 0.3),
+    "lion": (0.75, 0.3),
+    "boar": (0.75, 0.5),
+}
+# Any other animal is never alerted on; a confident sighting is kept under watch
+DEFAULT_POLICY = (None, 0.75)
+
+
+def decide_action(animal_type: str, confidence: float) -> str:
+    """
+    Turns a detection into ALERT_IMMEDIATELY, MONITOR or IGNORE with the local policy table.
+
+    Replaces the follow-up text model call: the decision only depends on the
+    animal and the confidence the vision call already returned.
+    """
+    alert_at, monitor_at = ACTION_POLICY.get(animal_type, DEFAULT_POLICY)
+    if alert_at is not None and confidence >= alert_at:
+        return ALERT_IMMEDIATELY
+    if confidence >= monitor_at:
+        return MONITOR
+    return IGNORE
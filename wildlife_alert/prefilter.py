@@ -0,0 +1,206 @@
+# prefilter.py
+"""
+CPU-only motion pre-filter that runs before the Gemini vision call.
+
+Each camera keeps a slowly updated background of its view (downscaled,
+blurred grayscale). A frame is sent to the model only if enough of it differs
+from that background, or if its brightness histogram moved enough to suggest
+something large entered the scene. Static frames are dropped, except for one in
+every `sample_every`, so the model still sees each camera now and then.
+
+Benchmark:
+    python prefilter.py [image_dir]
+Without a directory, a synthetic sample set (static field with sensor noise,
+lighting drift and occasional animals) is generated and used.
+"""
+import io
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+import repo_root  # noqa: F401  (puts the shared packages on sys.path)
+from telemetry import get_logger
+from workers import camera_of
+
+log = get_logger("wildlife.prefilter")
+
+# Analysis resolution: enough to see a boar at field distance, cheap to difference
+FRAME_SIZE = (96, 72)
+# Grey-level difference (0-255) for a pixel to count as changed
+PIXEL_THRESHOLD = 25
+# Fraction of changed pixels that makes a frame worth a model call
+CHANGED_FRACTION_THRESHOLD = 0.01
+# L1 distance between normalised 32-bin histograms that counts as a scene change
+HISTOGRAM_THRESHOLD = 0.25
+# Weight of each new frame in the background model
+BACKGROUND_ALPHA = 0.1
+DEFAULT_SAMPLE_EVERY = 20
+
+
+def load_frame(image_bytes: bytes) -> np.ndarray:
+    """Decode an image into a small, blurred grayscale float array."""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        # draft() lets the JPEG decoder skip most of the full-resolution work
+        image.draft("L", (FRAME_SIZE[0] * 2, FRAME_SIZE[1] * 2))
+        image = ImageOps.exif_transpose(image).convert("L").resize(FRAME_SIZE, Image.Resampling.BILINEAR)
+        image = image.filter(ImageFilter.GaussianBlur(1))
+        return np.asarray(image, dtype=np.float32)
+
+
+def _histogram(frame: np.ndarray) -> np.ndarray:
+    counts, _ = np.histogram(frame, bins=32, range=(0, 256))
+    return counts / counts.sum()
+
+
+class MotionPrefilter:
+    """
+    Decides per camera whether a frame has changed enough to analyse.
+
+    Args:
+        changed_fraction: Min fraction of changed pixels to pass a frame.
+        histogram_threshold: Min histogram L1 distance to pass a frame.
+        sample_every: Also pass every Nth dropped frame; 0 drops them all.
+    """
+
+    def __init__(
+        self,
+        changed_fraction: float = CHANGED_FRACTION_THRESHOLD,
+        histogram_threshold: float = HISTOGRAM_THRESHOLD,
+        sample_every: int = DEFAULT_SAMPLE_EVERY,
+    ):
+        self.changed_fraction = changed_fraction
+        self.histogram_threshold = histogram_threshold
+        self.sample_every = sample_every
+        self._cameras = {}
+        self._lock = threading.Lock()
+        self.stats = {"frames": 0, "passed": 0, "dropped": 0, "sampled": 0, "errors": 0, "score_ms_total": 0.0}
+
+    def score(self, camera: str, frame: np.ndarray) -> tuple:
+        """
+        Compare a frame with the camera's background and fold it into the background.
+
+        Returns:
+            (changed pixel fraction, histogram distance), or None for a camera's first frame.
+        """
+        with self._lock:
+            state = self._cameras.get(camera)
+            if state is None:
+                self._cameras[camera] = {"background": frame.copy(), "dropped_run": 0}
+                return None
+            background = state["background"]
+            # Remove global brightness shifts (clouds, dusk) before differencing
+            difference = np.abs((frame - frame.mean()) - (background - background.mean()))
+            changed = float((difference > PIXEL_THRESHOLD).mean())
+            histogram_distance = float(np.abs(_histogram(frame) - _histogram(background)).sum())
+            background += BACKGROUND_ALPHA * (frame - background)
+            return changed, histogram_distance
+
+    def should_analyse(self, image_path: str, image_bytes: bytes = None) -> bool:
+        """True if the frame at image_path should go to the vision model."""
+        started = time.perf_counter()
+        try:
+            if image_bytes is None:
+                with open(image_path, "rb") as image_file:
+                    image_bytes = image_file.read()
+            frame = load_frame(image_bytes)
+        except Exception as e:
+            # An unreadable frame is the model's problem, not a reason to miss an animal
+            self._count("errors")
+            log.warning("wildlife.prefilter.unreadable", path=image_path, error=str(e))
+            return True
+
+        camera = camera_of(image_path)
+        scores = self.score(camera, frame)
+        self._count("frames")
+        self._count("score_ms_total", (time.perf_counter() - started) * 1000)
+
+        if scores is None or scores[0] >= self.changed_fraction or scores[1] >= self.histogram_threshold:
+            with self._lock:
+                self._cameras[camera]["dropped_run"] = 0
+            self._count("passed")
+            return True
+
+        with self._lock:
+            state = self._cameras[camera]
+            state["dropped_run"] += 1
+            sampled = self.sample_every > 0 and state["dropped_run"] % self.sample_every == 0
+        if sampled:
+            self._count("sampled")
+            return True
+        self._count("dropped")
+        log.debug("wildlife.prefilter.dropped", image=os.path.basename(image_path), changed_fraction=round(float(scores[0]), 5))
+        return False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        frames = stats["frames"]
+        stats["model_calls_avoided"] = stats["dropped"] / frames if frames else 0.0
+        stats["mean_score_ms"] = round(stats.pop("score_ms_total") / frames, 2) if frames else None
+        return stats
+
+    def _count(self, key: str, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+
+def prefilter_from_env():
+    """
+    MotionPrefilter from WILDLIFE_PREFILTER_CHANGED_FRACTION, WILDLIFE_PREFILTER_HISTOGRAM
+    and WILDLIFE_PREFILTER_SAMPLE_EVERY, or None when WILDLIFE_PREFILTER=0.
+    """
+    if os.getenv("WILDLIFE_PREFILTER", "1") == "0":
+        return None
+    return MotionPrefilter(
+        changed_fraction=float(os.getenv("WILDLIFE_PREFILTER_CHANGED_FRACTION", CHANGED_FRACTION_THRESHOLD)),
+        histogram_threshold=float(os.getenv("WILDLIFE_PREFILTER_HISTOGRAM", HISTOGRAM_THRESHOLD)),
+        sample_every=int(os.getenv("WILDLIFE_PREFILTER_SAMPLE_EVERY", DEFAULT_SAMPLE_EVERY)),
+    )
+
+
+def _synthetic_frames(count: int = 200, animal_every: int = 25, seed: int = 7):
+    """Yield (name, jpeg_bytes, has_animal) for a static field with noise, lighting drift and passing animals."""
+    rng = np.random.default_rng(seed)
+    width, height = 1280, 960
+    rows = np.linspace(0, 1, height)[:, None]
+    field = 90 + 60 * rows + 20 * np.sin(np.linspace(0, 40, width))[None, :]
+    for index in range(count):
+        lighting = 15 * np.sin(index / 30)
+        frame = field + lighting + rng.normal(0, 4, field.shape)
+        has_animal = index % animal_every in (animal_every - 2, animal_every - 1)
+        if has_animal:
+            top, left = int(rng.integers(300, 700)), int(rng.integers(100, 1000))
+            frame[top:top + 120, left:left + 220] = 40
+        image = Image.fromarray(np.clip(frame, 0, 255).astype(np.uint8)).convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=85)
+        yield f"cam1_{index:04d}.jpg", output.getvalue(), has_animal
+
+
+def bench(image_dir: str = None):
+    prefilter = MotionPrefilter()
+    missed = animals = 0
+    if image_dir:
+        names = sorted(name for name in os.listdir(image_dir) if name.lower().endswith((".png", ".jpg", ".jpeg")))
+        for name in names:
+            prefilter.should_analyse(os.path.join(image_dir, name))
+    else:
+        for name, image_bytes, has_animal in _synthetic_frames():
+            passed = prefilter.should_analyse(name, image_bytes)
+            animals += has_animal
+            missed += has_animal and not passed
+
+    stats = prefilter.snapshot()
+    print(f"frames: {stats['frames']}, sent to model: {stats['passed'] + stats['sampled']} "
+          f"({stats['sampled']} sampled), dropped: {stats['dropped']}")
+    print(f"model calls avoided: {stats['model_calls_avoided']:.1%}, mean pre-filter cost: {stats['mean_score_ms']} ms/frame")
+    if animals:
+        print(f"animal frames missed: {missed}/{animals}")
+
+
+if __name__ == "__main__":
+    bench(sys.argv[1] if len(sys.argv) > 1 else None)
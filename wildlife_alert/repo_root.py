@@ -0,0 +1,13 @@
+# repo_root.py
+"""
+Puts the repository root on sys.path so the wildlife modules, which import
+each other flat from this directory, can also import the shared telemetry
+and image_pipeline packages. Import it before either of them.
+"""
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
@@ -0,0 +1,202 @@
+# spool.py
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from google.api_core.exceptions import FailedPrecondition, InvalidArgument, NotFound
+
+import repo_root  # noqa: F401  (puts the shared packages on sys.path)
+from telemetry import get_logger, timed
+
+log = get_logger("wildlife.spool")
+
+# Lower numbers are written first
+PRIORITY_ALERT = 0
+PRIORITY_LOG = 1
+
+# Firestore caps a batch at 500 writes
+DEFAULT_BATCH_SIZE = 200
+MAX_BACKOFF_SEC = 60
+# Stored in place of firestore.SERVER_TIMESTAMP, which is not JSON serialisable
+_SERVER_TIMESTAMP = "__server_timestamp__"
+# Errors that retrying the same write can never fix
+_PERMANENT_ERRORS = (NotFound, InvalidArgument, FailedPrecondition)
+
+
+def new_doc_id() -> str:
+    # Assigned when queued so that replaying an add after an outage cannot create it twice
+    return uuid.uuid4().hex[:20]
+
+
+class FirestoreSpool:
+    """
+    Durable, prioritised outbox for Firestore writes.
+
+    Writes are appended to a SQLite spool and committed by a background thread
+    in batches, alerts before detection logs, in queue order otherwise. When
+    Firestore is unreachable the spool keeps growing on disk and is replayed
+    with exponential backoff once the link returns, including after a restart.
+
+    Args:
+        db: Firestore client.
+        spool_path: SQLite file holding pending writes.
+        server_timestamp: The firestore.SERVER_TIMESTAMP sentinel to restore on replay.
+        batch_size: Max writes per commit.
+    """
+
+    def __init__(self, db, spool_path: str, server_timestamp, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.spool_path = spool_path
+        self.server_timestamp = server_timestamp
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._conn = sqlite3.connect(spool_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, priority INTEGER NOT NULL,"
+            " collection TEXT NOT NULL, doc_id TEXT NOT NULL, op TEXT NOT NULL,"
+            " payload TEXT NOT NULL, enqueued_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pending_order ON pending (priority, seq)")
+        self._conn.commit()
+        self.stats = {
+            "committed": 0, "dropped": 0, "batches": 0, "failures": 0,
+            "last_flush_ms": None, "last_delivery_lag_ms": None, "last_error": None, "link_up": None,
+        }
+        self._thread = threading.Thread(target=self._run, name="firestore-spool", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, collection: str, doc_id: str, op: str, data: dict, priority: int):
+        """Persist a "set" or "update" of collection/doc_id and wake the writer."""
+        payload = json.dumps(
+            {key: _SERVER_TIMESTAMP if value is self.server_timestamp else value for key, value in data.items()},
+            default=str,
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pending (priority, collection, doc_id, op, payload, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (priority, collection, doc_id, op, payload, time.time()),
+            )
+            self._conn.commit()
+        self._wake.set()
+
+    def depth(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT priority, COUNT(*), MIN(enqueued_at) FROM pending GROUP BY priority"
+            ).fetchall()
+        by_priority = {priority: (count, oldest) for priority, count, oldest in rows}
+        oldest = min((oldest for _, oldest in by_priority.values()), default=None)
+        return {
+            "alerts": by_priority.get(PRIORITY_ALERT, (0, None))[0],
+            "logs": by_priority.get(PRIORITY_LOG, (0, None))[0],
+            "oldest_age_sec": round(time.time() - oldest, 1) if oldest is not None else None,
+        }
+
+    def snapshot(self) -> dict:
+        return {"spool_depth": self.depth(), **self.stats}
+
+    def close(self, timeout: float = 10.0):
+        """Try to deliver what is pending, then stop; anything left is replayed on next start."""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _next_batch(self) -> list:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, collection, doc_id, op, payload, enqueued_at FROM pending ORDER BY priority, seq LIMIT ?",
+                (self.batch_size,),
+            ).fetchall()
+
+    def _delete(self, seqs: list):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending WHERE seq = ?", [(seq,) for seq in seqs])
+            self._conn.commit()
+
+    def _restore(self, payload: str) -> dict:
+        return {
+            key: self.server_timestamp if value == _SERVER_TIMESTAMP else value
+            for key, value in json.loads(payload).items()
+        }
+
+    def _apply(self, target, collection: str, doc_id: str, op: str, payload: str):
+        ref = self.db.collection(collection).document(doc_id)
+        if op == "update":
+            target.update(ref, self._restore(payload))
+        else:
+            target.set(ref, self._restore(payload))
+
+    def _commit(self, rows: list) -> int:
+        """Commit rows, returning how many were dropped as permanently invalid."""
+        started = time.perf_counter()
+        dropped = 0
+        try:
+            with timed("firestore_write", store="wildlife", mode="batch"):
+                batch = self.db.batch()
+                for _, collection, doc_id, op, payload, _ in rows:
+                    self._apply(batch, collection, doc_id, op, payload)
+                batch.commit()
+        except _PERMANENT_ERRORS:
+            # One bad write (e.g. an update whose document was never created) must not block the spool
+            dropped = self._commit_one_by_one(rows)
+        self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.stats["last_delivery_lag_ms"] = round((time.time() - rows[0][5]) * 1000, 1)
+        self.stats["batches"] += 1
+        return dropped
+
+    def _commit_one_by_one(self, rows: list) -> int:
+        dropped = 0
+        for seq, collection, doc_id, op, payload, _ in rows:
+            try:
+                batch = self.db.batch()
+                self._apply(batch, collection, doc_id, op, payload)
+                batch.commit()
+            except _PERMANENT_ERRORS as e:
+                dropped += 1
+                self.stats["dropped"] += 1
+                log.error("spool.write_dropped", op=op, collection=collection, doc_id=doc_id, error=str(e))
+            self._delete([seq])
+        return dropped
+
+    def _run(self):
+        backoff = 1
+        while True:
+            rows = self._next_batch()
+            if not rows:
+                if self._stop.is_set():
+                    return
+                self._wake.wait(1)
+                self._wake.clear()
+                continue
+            try:
+                dropped = self._commit(rows)
+            except Exception as e:
+                # Offline or throttled: keep everything in the spool and retry later
+                self.stats["failures"] += 1
+                self.stats["last_error"] = str(e)
+                self.stats["link_up"] = False
+                if self._stop.is_set():
+                    return
+                depth = self.depth()
+                log.warning(
+                    "spool.firestore_unreachable", alerts=depth['alerts'], logs=depth['logs'],
+                    retry_in_sec=backoff, error=str(e),
+                )
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SEC)
+                continue
+            self._delete([row[0] for row in rows])
+            self.stats["committed"] += len(rows) - dropped
+            self.stats["link_up"] = True
+            backoff = 1
+
+
+def default_spool_path() -> str:
+    return os.getenv("WILDLIFE_SPOOL_PATH", "firestore_spool.db")
@@ -0,0 +1,189 @@
+# workers.py
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import repo_root  # noqa: F401  (puts the shared packages on sys.path)
+from telemetry import get_logger
+
+log = get_logger("wildlife.workers")
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_QUEUE = 200
+# Requests per minute allowed against the Vertex AI Gemini quota
+DEFAULT_VISION_RPM = 60
+# Camera images are named "<camera>_<anything>.jpg"; files without a prefix share one camera
+DEFAULT_CAMERA_PATTERN = r"^([^_]+)_"
+
+
+def camera_of(path: str, pattern: str = DEFAULT_CAMERA_PATTERN) -> str:
+    match = re.match(pattern, os.path.basename(path))
+    return match.group(1) if match else "default"
+
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` acquisitions per minute with bursts up to `burst`."""
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DetectionPool:
+    """
+    Runs detection jobs on a fixed set of worker threads.
+
+    Jobs from the same camera run one at a time in arrival order, so a
+    camera's frames are analysed and alerted on in sequence; different
+    cameras run in parallel. At most `max_queue` jobs wait at once: submit()
+    blocks beyond that, which pushes back on ingestion. The model-call rate
+    limit is applied by the job itself (see ImageProcessor), so frames that
+    never reach the model do not wait for a token.
+
+    Args:
+        concurrency: Number of worker threads.
+        max_queue: Max jobs waiting across all cameras.
+        camera_pattern: Regex whose first group is the camera ID in a file name.
+        on_wait: Called with the seconds each job waited for a worker.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        camera_pattern: str = DEFAULT_CAMERA_PATTERN,
+        on_wait=None,
+    ):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.camera_pattern = camera_pattern
+        self.on_wait = on_wait
+        self._cond = threading.Condition()
+        self._per_camera = {}
+        self._ready = deque()
+        self._busy = set()
+        self._depth = 0
+        self._stopping = False
+        self.stats = {"completed": 0, "failed": 0, "max_depth": 0, "wait_ms_total": 0.0}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"detection-worker-{i}", daemon=True) for i in range(concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, path: str, job, on_done=None):
+        """
+        Queue job(path) on its camera's lane; on_done(result, error) runs after it.
+        Blocks while the pool already holds max_queue waiting jobs.
+        """
+        camera = camera_of(path, self.camera_pattern)
+        with self._cond:
+            while self._depth >= self.max_queue and not self._stopping:
+                self._cond.wait()
+            lane = self._per_camera.setdefault(camera, deque())
+            lane.append((path, job, on_done, time.monotonic()))
+            self._depth += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], self._depth)
+            if camera not in self._busy and len(lane) == 1:
+                self._ready.append(camera)
+            self._cond.notify_all()
+
+    def depth(self) -> int:
+        with self._cond:
+            return self._depth
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            completed = self.stats["completed"] + self.stats["failed"]
+            return {
+                "queue_depth": self._depth,
+                "cameras_waiting": sum(1 for lane in self._per_camera.values() if lane),
+                "in_progress": len(self._busy),
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "completed": self.stats["completed"],
+                "failed": self.stats["failed"],
+                "max_depth": self.stats["max_depth"],
+                "mean_queue_wait_ms": round(self.stats["wait_ms_total"] / completed, 1) if completed else None,
+            }
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                camera = self._ready.popleft()
+                path, job, on_done, queued_at = self._per_camera[camera].popleft()
+                self._busy.add(camera)
+                self._depth -= 1
+                self._cond.notify_all()
+
+            result, error = None, None
+            try:
+                waited_ms = (time.monotonic() - queued_at) * 1000
+                if self.on_wait is not None:
+                    self.on_wait(waited_ms / 1000)
+                result = job(path)
+            except Exception as e:
+                error = e
+                waited_ms = (time.monotonic() - queued_at) * 1000
+                log.error("wildlife.detection.failed", path=path, error=str(e))
+
+            if on_done is not None:
+                try:
+                    on_done(result, error)
+                except Exception as e:
+                    log.exception("wildlife.detection.finish_failed", path=path, error=str(e))
+
+            with self._cond:
+                self.stats["failed" if error else "completed"] += 1
+                self.stats["wait_ms_total"] += waited_ms
+                self._busy.discard(camera)
+                lane = self._per_camera[camera]
+                if lane:
+                    self._ready.append(camera)
+                else:
+                    del self._per_camera[camera]
+                self._cond.notify_all()
+
+
+def rate_limiter_from_env() -> RateLimiter:
+    """Build the model-call limiter from WILDLIFE_VISION_RPM and WILDLIFE_VISION_BURST."""
+    return RateLimiter(
+        float(os.getenv("WILDLIFE_VISION_RPM", DEFAULT_VISION_RPM)),
+        burst=int(os.getenv("WILDLIFE_VISION_BURST", DEFAULT_CONCURRENCY)),
+    )
+
+
+def pool_from_env(on_wait=None) -> DetectionPool:
+    """Build the detection pool from WILDLIFE_WORKERS, WILDLIFE_MAX_QUEUE and WILDLIFE_CAMERA_PATTERN."""
+    return DetectionPool(
+        concurrency=int(os.getenv("WILDLIFE_WORKERS", DEFAULT_CONCURRENCY)),
+        max_queue=int(os.getenv("WILDLIFE_MAX_QUEUE", DEFAULT_MAX_QUEUE)),
+        camera_pattern=os.getenv("WILDLIFE_CAMERA_PATTERN", DEFAULT_CAMERA_PATTERN),
+        on_wait=on_wait,
+    )